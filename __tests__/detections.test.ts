@@ -0,0 +1,85 @@
+import { decodeDetections, DetectionObject } from '../lib/detections';
+
+// Fixture'lar python-ai/compact_detections.py encode_detections ile üretildi:
+//   [{bbox: [10, 20, 110, 220], confidence: 0.91, track_id: 7},
+//    {bbox: [300, 40, 360, 200], confidence: 0.5, track_id: None},
+//    {bbox: [0, 0, 32767, 1], confidence: 1.0, track_id: 123456}]
+// "untracked" fixture'larda track_id alanı yok.
+// n=3 olduğu için b64 track_ids n*9=27 gibi hizasız bir ofsetten okunur.
+const COLUMNAR_TRACKED = {
+  format: 'columnar-v1',
+  n: 3,
+  boxes: [10, 20, 110, 220, 300, 40, 360, 200, 0, 0, 32767, 1],
+  conf: [232, 128, 255],
+  track_ids: [7, null, 123456],
+};
+const COLUMNAR_UNTRACKED = {
+  format: 'columnar-v1',
+  n: 3,
+  boxes: [10, 20, 110, 220, 300, 40, 360, 200, 0, 0, 32767, 1],
+  conf: [232, 128, 255],
+};
+const PACKED_TRACKED = {
+  format: 'columnar-v1-b64',
+  n: 3,
+  tracks: true,
+  data: 'CgAUAG4A3AAsASgAaAHIAAAAAAD/fwEA6ID/BwAAAP////9A4gEA',
+};
+const PACKED_UNTRACKED = {
+  format: 'columnar-v1-b64',
+  n: 3,
+  tracks: false,
+  data: 'CgAUAG4A3AAsASgAaAHIAAAAAAD/fwEA6ID/',
+};
+
+// compact_detections.decode_detections çıktısı (aynı fixture)
+const EXPECTED = [
+  { bbox: [10, 20, 110, 220], center: [60, 120], area: 20000, confidence: 0.91, track_id: 7 },
+  { bbox: [300, 40, 360, 200], center: [330, 120], area: 9600, confidence: 0.5, track_id: null },
+  { bbox: [0, 0, 32767, 1], center: [16383, 0], area: 32767, confidence: 1.0, track_id: 123456 },
+];
+
+function expectDetections(actual: DetectionObject[], tracked: boolean) {
+  expect(actual).toHaveLength(EXPECTED.length);
+  actual.forEach((detection, i) => {
+    const expected = EXPECTED[i];
+    expect(detection.label).toBe('person');
+    expect(detection.bbox).toEqual(expected.bbox);
+    expect(detection.center).toEqual(expected.center);
+    expect(detection.area).toBe(expected.area);
+    // Güven uint8 olarak saklanır: en fazla 1/255 sapma
+    expect(Math.abs(detection.confidence - expected.confidence)).toBeLessThanOrEqual(1 / 255);
+    expect(detection.track_id).toBe(tracked ? expected.track_id : null);
+  });
+}
+
+describe('decodeDetections', () => {
+  test('columnar-v1 with track ids', () => {
+    expectDetections(decodeDetections(COLUMNAR_TRACKED), true);
+  });
+
+  test('columnar-v1 without track ids', () => {
+    expectDetections(decodeDetections(COLUMNAR_UNTRACKED), false);
+  });
+
+  test('columnar-v1-b64 with track ids', () => {
+    expectDetections(decodeDetections(PACKED_TRACKED), true);
+  });
+
+  test('columnar-v1-b64 without track ids', () => {
+    expectDetections(decodeDetections(PACKED_UNTRACKED), false);
+  });
+
+  test('both formats decode to the same objects', () => {
+    expect(decodeDetections(PACKED_TRACKED)).toEqual(decodeDetections(COLUMNAR_TRACKED));
+    expect(decodeDetections(PACKED_UNTRACKED)).toEqual(decodeDetections(COLUMNAR_UNTRACKED));
+  });
+
+  test('legacy dict lists and empty values', () => {
+    const [detection] = decodeDetections([{ label: 'person', confidence: 0.8, x: 10, y: 20, width: 100, height: 200 }]);
+    expect(detection.bbox).toEqual([10, 20, 110, 220]);
+    expect(detection.area).toBe(20000);
+    expect(decodeDetections(null)).toEqual([]);
+    expect(decodeDetections({ format: 'unknown' })).toEqual([]);
+  });
+});
@@ -4,6 +4,8 @@ import { query } from '@/lib/db';
 
 // Python AI servisinin URL'i (Railway, Render vb.)
 const PYTHON_AI_URL = process.env.PYTHON_AI_URL || null;
+// detection_objects biçimi: columnar | columnar-b64 ile kompakt (lib/detections.ts okur)
+const AI_DETECTIONS_FORMAT = process.env.AI_DETECTIONS_FORMAT || null;
 
 // ESP32-CAM'den gelen fotoğrafı al ve analiz et
 export async function POST(request: NextRequest) {
@@ -71,8 +73,8 @@ export async function POST(request: NextRequest) {
     
     const analysisId = dbResult.rows[0].id;
     
-    // Entry/Exit tracking (basit algoritma - daha sonra geliştirilecek)
-    await trackEntryExit(parseInt(cameraId), locationZone, analysis.person_count, analysisId);
+    // Entry/Exit tracking (Python servisi iz tabanlı sayım döndürüyorsa o kullanılır)
+    await trackEntryExit(parseInt(cameraId), locationZone, analysis, analysisId);
     
     // Zone occupancy kaydı
     await trackZoneOccupancy(parseInt(cameraId), locationZone, analysis, analysisId);
@@ -88,6 +90,9 @@ export async function POST(request: NextRequest) {
         density_level: analysis.density_level,
         heatmap_url: analysis.heatmap_url ? `${PYTHON_AI_URL}${analysis.heatmap_url}` : null,
         detection_objects: analysis.detection_objects,
+        entry_count: analysis.entry_count ?? null,
+        exit_count: analysis.exit_count ?? null,
+        current_occupancy: analysis.current_occupancy ?? null,
         processing_time_ms: analysis.processing_time_ms
       }
     });
@@ -104,16 +109,16 @@ export async function POST(request: NextRequest) {
 // Python AI servisini çağır
 async function callPythonAIService(imageBuffer: ArrayBuffer, cameraId: string, locationZone: string) {
   try {
-    const formData = new FormData();
-    formData.append('file', new Blob([imageBuffer], { type: 'image/jpeg' }), 'image.jpg');
-    
+    // JPEG ham body olarak gönderilir (multipart sarmalama yok)
     const response = await fetch(`${PYTHON_AI_URL}/analyze`, {
       method: 'POST',
       headers: {
+        'Content-Type': 'image/jpeg',
         'X-Camera-ID': cameraId,
-        'X-Location-Zone': locationZone
+        'X-Location-Zone': locationZone,
+        ...(AI_DETECTIONS_FORMAT ? { 'X-Detections-Format': AI_DETECTIONS_FORMAT } : {})
       },
-      body: formData
+      body: imageBuffer
     });
     
     if (!response.ok) {
@@ -131,9 +136,67 @@ async function callPythonAIService(imageBuffer: ArrayBuffer, cameraId: string, l
   }
 }
 
+// Python AI servisindeki bellek içi 1m/5m/1h pencereleri (v_ai_realtime_stats yerine, DB sorgusu yok)
+async function fetchRealtimeStats() {
+  if (!PYTHON_AI_URL) return null;
+  try {
+    const response = await fetch(`${PYTHON_AI_URL}/stats/realtime`, { cache: 'no-store' });
+    if (!response.ok) return null;
+    const stats = await response.json();
+    return stats.enabled ? stats : null;
+  } catch (error) {
+    console.error('❌ Realtime stats alınamadı:', error);
+    return null;
+  }
+}
+
+// v_current_occupancy satırları (bellekteki son kare; giriş/çıkış toplamları bu kaynakta yok)
+function occupancyFromRealtime(realtime: any, cameraId: string | null) {
+  return realtime.cameras
+    .filter((camera: any) => !cameraId || camera.camera_id === cameraId)
+    .map((camera: any) => ({
+      camera_id: parseInt(camera.camera_id),
+      business_id: null,
+      location_zone: camera.location_zone,
+      current_occupancy: camera.last_person_count,
+      total_entries_today: null,
+      total_exits_today: null,
+      last_update: camera.last_update
+    }))
+    .sort((a: any, b: any) => b.last_update.localeCompare(a.last_update));
+}
+
+// v_zone_density_realtime satırları (son 5 dakikanın ortalaması)
+function zoneDensityFromRealtime(realtime: any) {
+  return realtime.zones
+    .filter((zone: any) => zone.windows['5m'].analysis_count > 0)
+    .map((zone: any) => ({
+      business_id: null,
+      zone_name: zone.location_zone,
+      person_count: zone.current_person_count,
+      crowd_density: zone.current_crowd_density,
+      density_level: null,
+      heatmap_url: null,
+      last_update: zone.last_update
+    }));
+}
+
 // Entry/Exit tracking
-async function trackEntryExit(cameraId: number, locationZone: string, currentPersonCount: number, analysisId: number) {
+async function trackEntryExit(cameraId: number, locationZone: string, analysis: any, analysisId: number) {
   try {
+    // Python servisi iz (track) tabanlı sayım döndürdüyse ek sorgu gerekmez
+    if (typeof analysis.entry_count === 'number' && typeof analysis.exit_count === 'number') {
+      await query(`
+        INSERT INTO iot_entry_exit_logs 
+        (camera_id, location_zone, entry_count, exit_count, current_occupancy, analysis_id)
+        VALUES ($1, $2, $3, $4, $5, $6)
+      `, [cameraId, locationZone, analysis.entry_count, analysis.exit_count, analysis.current_occupancy ?? analysis.person_count, analysisId]);
+      return;
+    }
+    
+    // Fallback (basit detection): kişi sayısı farkından tahmin
+    const currentPersonCount = analysis.person_count;
+    
     // Son kaydı al
     const lastRecord = await query(`
       SELECT current_occupancy FROM iot_entry_exit_logs 
@@ -232,12 +295,18 @@ export async function GET(request: NextRequest) {
     
     // İstatistikleri de ekle
     if (includeStats) {
+      // Python servisi bellekteki pencerelerden cevap verirse view taraması yapılmaz;
+      // hata veya PYTHON_AI_URL yoksa view'lara düşülür
+      const realtime = await fetchRealtimeStats();
+
       // Current occupancy
-      const occupancyResult = await query(`
-        SELECT * FROM v_current_occupancy
-        ${cameraId ? 'WHERE camera_id = $1' : ''}
-        ORDER BY last_update DESC
-      `, cameraId ? [parseInt(cameraId)] : []);
+      const currentOccupancy = realtime
+        ? occupancyFromRealtime(realtime, cameraId)
+        : (await query(`
+            SELECT * FROM v_current_occupancy
+            ${cameraId ? 'WHERE camera_id = $1' : ''}
+            ORDER BY last_update DESC
+          `, cameraId ? [parseInt(cameraId)] : [])).rows;
       
       // Hourly traffic
       const trafficResult = await query(`
@@ -246,16 +315,20 @@ export async function GET(request: NextRequest) {
         LIMIT 24
       `, businessId ? [parseInt(businessId)] : []);
       
-      // Zone density
-      const zoneResult = await query(`
-        SELECT * FROM v_zone_density_realtime
-        ${businessId ? 'WHERE business_id = $1' : ''}
-      `, businessId ? [parseInt(businessId)] : []);
+      // Zone density (bellekteki bölgeler işletmeye göre filtrelenemez)
+      const zoneDensity = realtime && !businessId
+        ? zoneDensityFromRealtime(realtime)
+        : (await query(`
+            SELECT * FROM v_zone_density_realtime
+            ${businessId ? 'WHERE business_id = $1' : ''}
+          `, businessId ? [parseInt(businessId)] : [])).rows;
       
       response.stats = {
-        current_occupancy: occupancyResult.rows,
+        current_occupancy: currentOccupancy,
         hourly_traffic: trafficResult.rows,
-        zone_density: zoneResult.rows
+        zone_density: zoneDensity,
+        source: realtime ? 'realtime' : 'database',
+        realtime
       };
     }
     
@@ -2,6 +2,7 @@
 
 import { useEffect, useState } from 'react';
 import { motion } from 'framer-motion';
+import { decodeDetections } from '@/lib/detections';
 
 interface AIAnalysis {
   id: number;
@@ -9,7 +10,7 @@ interface AIAnalysis {
   location_zone: string;
   person_count: number;
   crowd_density: number;
-  detection_objects: any[];
+  detection_objects: unknown; // liste veya kompakt (columnar) biçim, decodeDetections ile okunur
   heatmap_url: string | null;
   processing_time_ms: number;
   created_at: string;
@@ -97,6 +98,7 @@ export default function RealTimeAIDisplay({
   }
 
   const latestAnalysis = analyses[0];
+  const detections = decodeDetections(latestAnalysis.detection_objects);
 
   return (
     <div className="space-y-6">
@@ -206,13 +208,13 @@ export default function RealTimeAIDisplay({
       )}
 
       {/* Detection Objects */}
-      {latestAnalysis.detection_objects && latestAnalysis.detection_objects.length > 0 && (
+      {detections.length > 0 && (
         <div className="bg-white rounded-lg shadow-md p-6">
           <h3 className="text-lg font-semibold text-gray-800 mb-4 flex items-center gap-2">
             🎯 Tespit Detayları
           </h3>
           <div className="space-y-2">
-            {latestAnalysis.detection_objects.map((obj: any, idx: number) => (
+            {detections.map((obj, idx) => (
               <div
                 key={idx}
                 className="flex items-center justify-between p-3 bg-gray-50 rounded-lg"
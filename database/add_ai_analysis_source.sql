@@ -0,0 +1,5 @@
+-- iot_ai_analysis satırını yazan servis (saatlik özet için gerekli: HOURLY_ROLLUP=on)
+-- Mevcut satırlar NULL kalır (geçmiş); kolonu vermeyen yazanlar (Next.js route) 'other' olur.
+-- ai_standalone saatlik özet açıkken 'ai_standalone' yazar; backfill NULL + 'ai_standalone' okur.
+ALTER TABLE iot_ai_analysis ADD COLUMN IF NOT EXISTS source VARCHAR(32);
+ALTER TABLE iot_ai_analysis ALTER COLUMN source SET DEFAULT 'other';
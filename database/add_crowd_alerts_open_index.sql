@@ -0,0 +1,4 @@
+-- Açık uyarı araması (ai_standalone.py uyarı motoru her açma/kapatmada kullanır)
+CREATE INDEX IF NOT EXISTS idx_crowd_alerts_open
+  ON iot_crowd_alerts (camera_id, alert_type)
+  WHERE is_resolved = FALSE;
@@ -0,0 +1,44 @@
+-- Saatlik AI analiz özeti (ai_standalone.py tarafından artımlı güncellenir)
+-- Her satır bir (kamera, bölge, saat) için toplam/min/max değerlerini tutar;
+-- ortalamalar sum / analysis_count ile hesaplanır, böylece satırlar birleştirilebilir.
+-- hour database saatine göre saat başıdır (v_ai_hourly_stats ile aynı).
+-- Önce database/add_ai_analysis_source.sql çalıştırılmalı.
+
+CREATE TABLE IF NOT EXISTS iot_ai_hourly_rollup (
+  camera_id INTEGER NOT NULL,
+  location_zone VARCHAR(100) NOT NULL DEFAULT 'Unknown',
+  hour TIMESTAMP NOT NULL,
+  analysis_count INTEGER NOT NULL DEFAULT 0,
+  person_count_sum BIGINT NOT NULL DEFAULT 0,
+  person_count_min INTEGER,
+  person_count_max INTEGER,
+  crowd_density_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  crowd_density_min FLOAT,
+  crowd_density_max FLOAT,
+  entry_count_sum INTEGER NOT NULL DEFAULT 0,
+  exit_count_sum INTEGER NOT NULL DEFAULT 0,
+  occupancy_max INTEGER,
+  updated_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (camera_id, location_zone, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_hourly_rollup_hour ON iot_ai_hourly_rollup (hour DESC);
+
+-- v_ai_hourly_stats ile aynı kolonlar; ham tabloyu taramadan özet tablodan okunur
+CREATE OR REPLACE VIEW v_ai_hourly_rollup AS
+SELECT
+  camera_id,
+  location_zone,
+  hour,
+  (person_count_sum::FLOAT / NULLIF(analysis_count, 0))::INTEGER as avg_person_count,
+  person_count_max as max_person_count,
+  (crowd_density_sum / NULLIF(analysis_count, 0))::FLOAT as avg_crowd_density,
+  crowd_density_max as max_crowd_density,
+  analysis_count,
+  entry_count_sum as total_entries,
+  exit_count_sum as total_exits,
+  occupancy_max as peak_occupancy
+FROM iot_ai_hourly_rollup
+ORDER BY hour DESC;
+
+COMMENT ON TABLE iot_ai_hourly_rollup IS 'Kamera/bölge/saat bazlı artımlı AI analiz özeti (geçmiş veriler için: python hourly_rollup.py backfill)';
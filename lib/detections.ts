@@ -0,0 +1,106 @@
+/**
+ * detection_objects okuyucu
+ *
+ * Python AI servisleri detection_objects alanını üç biçimde döndürebilir / saklayabilir
+ * (python-ai/compact_detections.py):
+ * - Sözlük listesi: ai_service `{type, confidence, bbox, center, area}`,
+ *   ai_standalone `{label, confidence, x, y, width, height}`
+ * - columnar-v1: `{format, n, boxes: [x1, y1, x2, y2, ...], conf: [0-255], track_ids?}`
+ * - columnar-v1-b64: aynı diziler little-endian binary + base64
+ *   (boxes n*4 int16, conf n uint8, tracks=true ise track_ids n int32)
+ *
+ * Hepsi aynı DetectionObject listesine çevrilir; center ve area kutudan hesaplanır.
+ */
+
+export interface DetectionObject {
+  label: string;
+  confidence: number;
+  bbox: [number, number, number, number];
+  center: [number, number];
+  area: number;
+  track_id: number | null;
+}
+
+interface ColumnarDetections {
+  format: 'columnar-v1';
+  n: number;
+  boxes: number[];
+  conf: number[];
+  track_ids?: (number | null)[];
+}
+
+interface PackedDetections {
+  format: 'columnar-v1-b64';
+  n: number;
+  tracks: boolean;
+  data: string;
+}
+
+function toDetection(
+  x1: number, y1: number, x2: number, y2: number,
+  confidence: number, trackId: number | null, label = 'person'
+): DetectionObject {
+  return {
+    label,
+    confidence,
+    bbox: [x1, y1, x2, y2],
+    center: [Math.floor((x1 + x2) / 2), Math.floor((y1 + y2) / 2)],
+    area: (x2 - x1) * (y2 - y1),
+    track_id: trackId,
+  };
+}
+
+function fromLegacy(obj: any): DetectionObject {
+  const [x1, y1, x2, y2] = Array.isArray(obj.bbox)
+    ? obj.bbox
+    : [obj.x, obj.y, obj.x + obj.width, obj.y + obj.height];
+  return toDetection(x1, y1, x2, y2, obj.confidence ?? 0, obj.track_id ?? null, obj.label || obj.type || 'person');
+}
+
+function fromColumnar(value: ColumnarDetections): DetectionObject[] {
+  const detections: DetectionObject[] = [];
+  for (let i = 0; i < value.n; i++) {
+    const [x1, y1, x2, y2] = value.boxes.slice(i * 4, i * 4 + 4);
+    detections.push(toDetection(x1, y1, x2, y2, value.conf[i] / 255, value.track_ids?.[i] ?? null));
+  }
+  return detections;
+}
+
+function fromPacked(value: PackedDetections): DetectionObject[] {
+  const binary = atob(value.data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  // DataView: hizasız ofsetlerde de little-endian okur
+  const view = new DataView(bytes.buffer);
+  const n = value.n;
+  const detections: DetectionObject[] = [];
+  for (let i = 0; i < n; i++) {
+    const box = i * 8;
+    const trackId = value.tracks ? view.getInt32(n * 9 + i * 4, true) : -1;
+    detections.push(toDetection(
+      view.getInt16(box, true),
+      view.getInt16(box + 2, true),
+      view.getInt16(box + 4, true),
+      view.getInt16(box + 6, true),
+      view.getUint8(n * 8 + i) / 255,
+      trackId < 0 ? null : trackId
+    ));
+  }
+  return detections;
+}
+
+/**
+ * detection_objects değerini (API yanıtı veya iot_ai_analysis JSONB satırı) listeye çevir
+ */
+export function decodeDetections(value: unknown): DetectionObject[] {
+  if (!value) return [];
+  if (Array.isArray(value)) return value.map(fromLegacy);
+  if (typeof value === 'object' && 'format' in value) {
+    const compact = value as ColumnarDetections | PackedDetections;
+    if (compact.format === 'columnar-v1') return fromColumnar(compact);
+    if (compact.format === 'columnar-v1-b64') return fromPacked(compact);
+  }
+  return [];
+}
@@ -0,0 +1,234 @@
+"""
+🛂 Kabul kontrolü (admission) ve geri basınç
+Analiz hattının önünde sınırlı bir kapı; yük patlamasında (ör. Wi-Fi kesintisi
+sonrası tüm ESP32'lerin aynı anda bağlanması) iş kuyruğu büyümez:
+- Kamera başına en fazla 1 işlenen + 1 bekleyen kare. Yeni kare gelirse bekleyen
+  eski kare düşer (429, reason=superseded); bayat kare yerine taze kare işlenir.
+- Bekleyen kare ADMISSION_MAX_WAIT_MS içinde sıra alamazsa düşer (reason=timeout).
+- Global eşzamanlı kare sınırı; dolunca yeni kamera karesi beklemeden 429 +
+  Retry-After alır (reason=saturated).
+- Öncelik katmanları: her katman global sınırın belli bir oranına kadar doldurabilir,
+  böylece düşük öncelikli kameralar yüksek öncelikliler için yer bırakır.
+
+Kamera kimliği olmayan istekler sadece global sınıra tabidir.
+Tüm durum event loop üzerinde tutulur (kilit gerekmez).
+
+ADMISSION_CAMERA_TIERS örneği (camera_id -> katman, diğerleri "normal"):
+    {"5": "high", "12": "low"}
+"""
+
+import asyncio
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+
+from fastapi.responses import JSONResponse
+
+from executors import EXECUTOR_THREADS
+from metrics import METRICS_ENABLED, registry
+
+ADMISSION_ENABLED = os.getenv("ADMISSION", "on") == "on"
+# Aynı anda analiz edilen en fazla kare (tüm kameralar)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", str(2 * EXECUTOR_THREADS)))
+# Bekleyen karenin sıra için en fazla bekleme süresi
+ADMISSION_MAX_WAIT_MS = int(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+ADMISSION_RETRY_AFTER_S = float(os.getenv("ADMISSION_RETRY_AFTER_S", "1"))
+# Katman başına global sınırın doldurulabilecek oranı
+ADMISSION_TIER_SHARES = os.getenv("ADMISSION_TIER_SHARES", "high:1.0,normal:0.8,low:0.5")
+
+DEFAULT_TIER = "normal"
+
+REASONS = {
+    "saturated": "Sunucu dolu, kare kabul edilmedi",
+    "superseded": "Aynı kameradan daha yeni kare geldi",
+    "timeout": "Kare sırada çok bekledi",
+}
+
+ADMISSIONS = registry.counter(
+    "cityv_admission_total", "Kabul kararları (result: admitted, queued, saturated, superseded, timeout)",
+    ("service", "tier", "result"))
+ADMISSION_FRAMES = registry.gauge(
+    "cityv_admission_frames", "Kabul edilmiş kareler (state: inflight, pending)", ("service", "state"))
+
+
+def load_tiers(raw=None):
+    """ADMISSION_CAMERA_TIERS JSON'unu {camera_id: katman} sözlüğüne çevir"""
+    raw = os.getenv("ADMISSION_CAMERA_TIERS", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+    try:
+        tiers = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"ADMISSION_CAMERA_TIERS geçerli JSON değil: {e}")
+    return {str(camera_id): str(tier) for camera_id, tier in tiers.items()}
+
+
+def parse_shares(raw=ADMISSION_TIER_SHARES):
+    """"high:1.0,normal:0.8,low:0.5" -> {katman: oran}"""
+    shares = {}
+    for item in raw.split(","):
+        tier, _, share = item.strip().partition(":")
+        if tier:
+            shares[tier] = float(share)
+    return shares
+
+
+class AdmissionRejected(Exception):
+    """Kare kabul edilmedi; HTTP'de 429 + Retry-After olarak döner"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(REASONS[reason])
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def response(self):
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+            content={
+                "success": False,
+                "error": str(self),
+                "reason": self.reason,
+                "retry_after_ms": int(self.retry_after * 1000),
+            },
+        )
+
+
+class _CameraSlot:
+    __slots__ = ("tier", "pending")
+
+    def __init__(self, tier):
+        self.tier = tier
+        # Sıra bekleyen karenin future'ı (en fazla bir tane)
+        self.pending = None
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        service,
+        max_inflight=ADMISSION_MAX_INFLIGHT,
+        camera_tiers=None,
+        shares=None,
+        max_wait_ms=ADMISSION_MAX_WAIT_MS,
+        retry_after=ADMISSION_RETRY_AFTER_S,
+        enabled=ADMISSION_ENABLED,
+    ):
+        self.service = service
+        self.enabled = enabled
+        self.max_inflight = max(1, max_inflight)
+        self.camera_tiers = load_tiers() if camera_tiers is None else camera_tiers
+        self.shares = parse_shares() if shares is None else shares
+        self.max_wait = max_wait_ms / 1000
+        self.retry_after = retry_after
+        self.inflight = 0
+        # Karesi işlenen kameralar (bekleyen kare varsa slot ona devredilir)
+        self._cameras = {}
+        self.counts = {}
+        ADMISSION_FRAMES.set_function(self._gauges)
+
+    def tier(self, camera_id):
+        return self.camera_tiers.get(str(camera_id), DEFAULT_TIER)
+
+    def limit(self, tier):
+        """Katmanın doldurabileceği en fazla global slot"""
+        return max(1, int(self.max_inflight * self.shares.get(tier, 1.0)))
+
+    def pending(self):
+        return sum(1 for slot in self._cameras.values() if slot.pending is not None)
+
+    def _gauges(self):
+        return {
+            (self.service, "inflight"): self.inflight,
+            (self.service, "pending"): self.pending(),
+        }
+
+    def _count(self, tier, result):
+        key = (tier, result)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if METRICS_ENABLED:
+            ADMISSIONS.inc(service=self.service, tier=tier, result=result)
+
+    def _reject(self, tier, reason):
+        self._count(tier, reason)
+        return AdmissionRejected(reason, self.retry_after)
+
+    async def acquire(self, camera_id):
+        """Slot al; kabul edilmezse AdmissionRejected"""
+        tier = self.tier(camera_id)
+        slot = self._cameras.get(str(camera_id)) if camera_id is not None else None
+
+        if slot is None:
+            if self.inflight >= self.limit(tier):
+                raise self._reject(tier, "saturated")
+            self.inflight += 1
+            if camera_id is not None:
+                self._cameras[str(camera_id)] = _CameraSlot(tier)
+            self._count(tier, "admitted")
+            return
+
+        # Kameranın karesi işleniyor: bu kare bekler, bekleyen eski kare düşer
+        if slot.pending is not None and not slot.pending.done():
+            slot.pending.set_exception(self._reject(tier, "superseded"))
+        waiter = asyncio.get_running_loop().create_future()
+        slot.pending = waiter
+        self._count(tier, "queued")
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            if slot.pending is waiter:
+                slot.pending = None
+            raise self._reject(tier, "timeout")
+        except asyncio.CancelledError:
+            # İstemci koptu; slot bu kareye devredildiyse geri bırak
+            if slot.pending is waiter:
+                slot.pending = None
+            elif waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release(camera_id)
+            raise
+
+    def release(self, camera_id):
+        """Slotu bırak; kameranın bekleyen karesi varsa slot doğrudan ona geçer"""
+        slot = self._cameras.get(str(camera_id)) if camera_id is not None else None
+        if slot is not None:
+            waiter, slot.pending = slot.pending, None
+            if waiter is not None and not waiter.done():
+                waiter.set_result(True)
+                return
+            del self._cameras[str(camera_id)]
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def admit(self, camera_id):
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(camera_id)
+        try:
+            yield
+        finally:
+            self.release(camera_id)
+
+    def guard(self, analyze):
+        """analyze(contents, camera_id, location_zone, ...) çağrısını kabul kontrolüne sar (WebSocket akışı)"""
+        async def guarded(contents, camera_id, location_zone, *args):
+            async with self.admit(camera_id):
+                return await analyze(contents, camera_id, location_zone, *args)
+        return guarded
+
+    def stats(self):
+        tiers = sorted(set(self.shares) | set(self.camera_tiers.values()) | {DEFAULT_TIER})
+        results = {}
+        for (tier, result), count in self.counts.items():
+            results.setdefault(tier, {})[result] = count
+        return {
+            "enabled": self.enabled,
+            "inflight": self.inflight,
+            "pending": self.pending(),
+            "max_inflight": self.max_inflight,
+            "max_wait_ms": int(self.max_wait * 1000),
+            "tier_limits": {tier: self.limit(tier) for tier in tiers},
+            "camera_tiers": self.camera_tiers,
+            "results": results,
+        }
@@ -1,18 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, Header, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, Header, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import cv2
-import numpy as np
-from ultralytics import YOLO
-import io
-from PIL import Image
-import time
 from typing import Optional
 import os
 from datetime import datetime
-import json
+from batching import InferenceBatcher
+from admission import AdmissionController, AdmissionRejected
+from executors import EXECUTOR_THREADS, get_thread_pool, run_in_thread, shutdown_executors
+from heatmap import blur_sigma, render_density, render_overlay
+from heatmap_cache import HEATMAP_MODE, LazyHeatmapCache
+from heatmap_store import HeatmapStore
+from frame_stream import serve_frame_stream, stream_params
+from image_io import decode_image, read_frame, scale_detections
+from inference_policy import InferencePolicy, merge_tile_detections
+from metrics import QUEUE_DEPTH, FrameMetrics, render_metrics, track_frames
+from motion_gate import MOTION_GATE, MotionGate, bbox_xywh, merge_roi_detections, outside_roi
+from readiness import Startup
+from sharded_workers import SHARD_WORKERS, ShardedInference
+from realtime_stats import REALTIME_STATS_ENABLED, RealtimeStats
+from tracker import TRACKER_ENABLED, TrackerRegistry
+from compact_detections import negotiate, with_detection_format
+from density import area_density, classify_area_density
+from detectors import registry, resolve_backends, warm_up
 
 app = FastAPI(title="CityV AI Service - Production", version="1.0.0")
+startup = Startup("ai_service", started=IMPORT_STARTED)
 
 # CORS - Next.js'ten gelen istekleri kabul et
 app.add_middleware(
@@ -23,125 +39,275 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# YOLOv8 model yükle (ilk çalıştırmada otomatik indirilir)
-print("🤖 YOLOv8 model yükleniyor...")
-model = YOLO('yolov8n.pt')  # Nano model - hızlı ve hafif (50-150ms)
-print("✅ YOLOv8n model hazır!")
+# YOLOv8n model detector registry üzerinden yüklenir (startup'ta, ilk çalıştırmada otomatik indirilir)
+# Nano model - hızlı ve hafif (50-150ms); YOLO_MODEL_PATH ile değiştirilebilir
+# AI_DETECTOR_BACKEND=yolo_onnx: export edilmiş ONNX (veya INT8) model, torch import edilmez
+DETECTOR_BACKEND = os.getenv("AI_DETECTOR_BACKEND", "yolo")
+if DETECTOR_BACKEND not in ("yolo", "yolo_onnx"):
+    raise ValueError(f"ai_service.py sadece yolo veya yolo_onnx destekler: {DETECTOR_BACKEND}")
+resolve_backends(DETECTOR_BACKEND)
+
+# Mikro-batch ayarları (aynı pencerede gelen kareler tek YOLO çağrısında işlenir)
+BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "10"))
+
+def run_yolo_batch(images, imgsz=None):
+    """Bir grup kareyi tek YOLO çağrısında işle (class 0 = person); kare başına (xyxy, skor)"""
+    return registry.detect_batch(DETECTOR_BACKEND, images, imgsz)
+
+if SHARD_WORKERS > 0:
+    # AI_SHARD_WORKERS > 0: model bu process'te yüklenmez; kareler shared memory ile
+    # kamera başına sabit worker process'ine gider, batch'leme worker'da yapılır
+    batcher = ShardedInference(DETECTOR_BACKEND, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+else:
+    batcher = InferenceBatcher(
+        run_yolo_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        executor=get_thread_pool()
+    )
+
+SERVICE_NAME = "ai_service"
+
+# Kabul kontrolü: kamera başına 1 işlenen + 1 bekleyen kare, global sınır, 429 + Retry-After
+admission = AdmissionController(SERVICE_NAME)
+
+QUEUE_DEPTH.set_function(lambda: {(SERVICE_NAME, "inference_batch"): batcher.queue_depth()})
+
+# Kamera başına model giriş boyutu ve döşemeli çıkarım (INFER_POLICY)
+inference_policy = InferencePolicy()
+
+# Kamera başına kişi takibi ve giriş/çıkış sayımı (COUNTING_LINES ile sanal çizgi)
+trackers = TrackerRegistry() if TRACKER_ENABLED else None
+
+# Statik karelerde YOLO'yu atlayan kamera başına hareket kapısı (MOTION_GATE=on)
+motion_gate = MotionGate() if MOTION_GATE else None
 
-# Heatmap klasörü oluştur
-os.makedirs("heatmaps", exist_ok=True)
-os.makedirs("static", exist_ok=True)
+# Kamera/bölge başına 1m-5m-1h kayan pencereler (dashboard DB'ye gitmeden okur)
+realtime_stats = RealtimeStats() if REALTIME_STATS_ENABLED else None
+
+# Heatmap deposu (static/<camera>/<gün>/..., yaş ve disk bütçesiyle)
+heatmap_store = HeatmapStore()
 
 @app.get("/")
 def health_check():
-    return {
-        "status": "healthy",
+    # Liveness: model yüklenirken de 200; yükleme başarısızsa 503 (process yeniden başlatılsın)
+    return JSONResponse(status_code=503 if startup.error else 200, content={
+        "status": "unhealthy" if startup.error else "healthy",
+        "ready": startup.ready,
         "service": "CityV Real AI",
         "model": "YOLOv8n",
+        "backend": DETECTOR_BACKEND,
         "features": ["person_detection", "crowd_density", "heat_maps", "entry_exit_tracking"]
+    })
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness: model yüklenip ısıtılana kadar 503"""
+    return startup.readiness()
+
+async def load_models():
+    # Model bir kez yüklenir ve boş kareyle ısıtılır; ilk istek yükleme maliyeti ödemez
+    with startup.phase("detectors"):
+        if SHARD_WORKERS > 0:
+            await batcher.start()
+        else:
+            await warm_up([DETECTOR_BACKEND], EXECUTOR_THREADS)
+    load_times = batcher.load_times_ms if SHARD_WORKERS > 0 else registry.load_times_ms
+    for name, elapsed_ms in load_times.items():
+        startup.record(f"model_load_{name}", elapsed_ms)
+    with startup.phase("services"):
+        await batcher.start()
+        await heatmap_store.start()
+
+@app.on_event("startup")
+async def on_startup():
+    # Port hemen açılır; model arka planda yüklenir, /ready o zamana kadar 503 döner
+    startup.record("imports", (time.perf_counter() - IMPORT_STARTED) * 1000)
+    startup.run(load_models)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await startup.stop()
+    await batcher.stop()
+    if lazy_heatmaps is not None:
+        # Verilen heatmap URL'leri restart sonrası da geçerli kalsın
+        await run_in_thread(lazy_heatmaps.flush)
+    await heatmap_store.stop()
+    shutdown_executors()
+
+@track_frames(SERVICE_NAME, DETECTOR_BACKEND)
+async def analyze_frame(contents, camera_id, location_zone, start_time=None):
+    """
+    Tek kareyi analiz et (HTTP ve WebSocket uçları ortak kullanır)
+    """
+    start_time = start_time or time.time()
+    frame = FrameMetrics(SERVICE_NAME, camera_id, DETECTOR_BACKEND)
+    
+    # Hareket kapısı: sahne değişmediyse son analizi döndür (decode ve YOLO yok)
+    motion = None
+    if motion_gate is not None and camera_id:
+        with frame.stage("motion"):
+            motion = await run_in_thread(motion_gate.probe, camera_id, contents)
+        if motion.reused:
+            # İzler güncellenmez; bu karede giriş/çıkış 0, doluluk güncel
+            tracking = trackers.snapshot(camera_id) if trackers is not None else {}
+            analysis = motion.reuse_analysis(start_time, batch=None, **tracking)
+            frame.finish("reused", analysis["person_count"])
+            analysis["stages_ms"] = frame.as_dict()
+            if realtime_stats is not None:
+                realtime_stats.record(camera_id, location_zone, analysis["person_count"], analysis["crowd_density"])
+            return {
+                "success": True,
+                "camera_id": int(camera_id),
+                "location_zone": location_zone or "Unknown",
+                "analysis": analysis
+            }
+    
+    # JPEG'i decode et (AI_DECODE_MAX_SIDE ile doğrudan küçültülmüş)
+    with frame.stage("decode"):
+        image, original_size = await run_in_thread(decode_image, contents)
+    
+    if image is None:
+        raise HTTPException(status_code=400, detail="Geçersiz görüntü")
+    
+    image_height, image_width = image.shape[:2]
+    original_width, original_height = original_size
+    
+    # Sadece değişen bölge analiz edilecekse kareyi kırp, bölge dışındaki önceki tespitleri koru
+    kept = []
+    offset_x = offset_y = 0
+    if motion is not None and motion.roi:
+        roi = motion.roi_pixels(image_width, image_height)
+        offset_x, offset_y = roi[0], roi[1]
+        kept = [det for det in motion.payload["detections"] if outside_roi(det["center"], roi)]
+        image_input = image[roi[1]:roi[3], roi[0]:roi[2]]
+    else:
+        image_input = image
+    
+    # YOLOv8 ile person detection - kare, pencere içindeki diğer karelerle batch'lenir
+    input_height, input_width = image_input.shape[:2]
+    plan = inference_policy.plan(camera_id or "0", input_width, input_height)
+    if plan.tiles:
+        # Parçalar + tam kare tek model çağrısında
+        crops = [image_input[y0:y1, x0:x1] for x0, y0, x1, y1 in plan.tiles] + [image_input]
+        results, batch_info = await batcher.submit_many(crops, plan.imgsz, camera_id)
+        boxes, scores = merge_tile_detections(plan.tiles, results[:-1], results[-1], input_width, input_height)
+    else:
+        (boxes, scores), batch_info = await batcher.submit(image_input, plan.imgsz, camera_id)
+    frame.add("batch_wait", batch_info.wait_ms)
+    frame.add("inference", batch_info.inference_ms)
+    
+    # Tespit edilen kişiler
+    detections = []
+    bounding_boxes = []
+    
+    for (x1, y1, x2, y2), confidence in zip(boxes.tolist(), scores.tolist()):
+        # Bounding box koordinatları
+        x1, x2 = x1 + offset_x, x2 + offset_x
+        y1, y2 = y1 + offset_y, y2 + offset_y
+    
+        bbox = [int(x1), int(y1), int(x2), int(y2)]
+    
+        detections.append({
+            "type": "person",
+            "confidence": round(confidence, 3),
+            "bbox": bbox,
+            "center": [int((x1 + x2) / 2), int((y1 + y2) / 2)],
+            "area": int((x2 - x1) * (y2 - y1))
+        })
+    
+        bounding_boxes.append(bbox)
+    
+    # ROI sınırındaki kişi hem eski hem yeni listede olabilir
+    detections = merge_roi_detections(kept, detections, bbox_xywh)
+    person_count = len(detections)
+    inference_policy.observe(camera_id or "0", person_count, boxes, plan, input_width, input_height)
+    
+    # İz güncelle: her tespite track_id, bu kare için giriş/çıkış sayıları
+    tracking = {}
+    if trackers is not None:
+        with frame.stage("tracking"):
+            track_ids, tracking = trackers.update(
+                camera_id or "0", [det["bbox"] for det in detections], image_width, image_height
+            )
+        for det, track_id in zip(detections, track_ids):
+            det["track_id"] = track_id
+    
+    # Crowd density hesapla (alan bazlı)
+    crowd_density = area_density(detections, image_width, image_height)
+    density_level, density_score = classify_area_density(crowd_density)
+    
+    # Heat map oluştur (event loop dışında); lazy modda sadece referans saklanır
+    heatmap_url = None
+    if person_count > 0 and lazy_heatmaps is not None:
+        heatmap_path = heatmap_store.new_name(camera_id, location_zone)
+        lazy_heatmaps.register(heatmap_path, contents, detections)
+        heatmap_url = heatmap_store.url(heatmap_path)
+    elif person_count > 0:
+        heatmap_url = await generate_heatmap(image, detections, camera_id, location_zone, frame)
+    
+    processing_time = int((time.time() - start_time) * 1000)
+    frame.finish("analyzed", person_count)
+    
+    analysis = {
+        "person_count": person_count,
+        "crowd_density": round(crowd_density, 2),
+        "density_level": density_level,
+        "density_score": density_score,
+        "detection_objects": scale_detections(
+            detections, original_width / image_width, original_height / image_height
+        ),
+        "heatmap_url": heatmap_url,
+        "processing_time_ms": processing_time,
+        "stages_ms": frame.as_dict(),
+        "batch": batch_info.as_dict(),
+        "inference": plan.as_dict(),
+        "image_resolution": f"{original_width}x{original_height}",
+        "decode_resolution": f"{image_width}x{image_height}",
+        "timestamp": datetime.now().isoformat(),
+        **tracking,
+        "reused": False,
+        "motion": motion.as_dict() if motion is not None else None
+    }
+    if motion is not None:
+        # Bu kare yeni referans olur; sonraki statik kareler bu sonucu kullanır
+        motion_gate.commit(camera_id, motion, {"analysis": analysis, "detections": detections})
+    if realtime_stats is not None:
+        realtime_stats.record(camera_id or 0, location_zone, person_count, analysis["crowd_density"])
+    
+    return {
+        "success": True,
+        "camera_id": int(camera_id) if camera_id else 0,
+        "location_zone": location_zone or "Unknown",
+        "analysis": analysis
     }
+    
 
 @app.post("/analyze")
 async def analyze_image(
-    file: UploadFile = File(...),
+    request: Request,
+    file: Optional[UploadFile] = File(None),
     camera_id: Optional[str] = Header(None, alias="X-Camera-ID"),
-    location_zone: Optional[str] = Header(None, alias="X-Location-Zone")
+    location_zone: Optional[str] = Header(None, alias="X-Location-Zone"),
+    detections_format: Optional[str] = Header(None, alias="X-Detections-Format")
 ):
     """
     Gerçek AI analizi - YOLOv8 person detection
+    Kare multipart `file` alanı veya ham `image/jpeg` body olarak gönderilebilir.
     """
+    if not startup.ready:
+        return startup.not_ready()
     start_time = time.time()
     
     try:
-        # JPEG'i oku ve numpy array'e çevir
-        contents = await file.read()
-        image_array = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Geçersiz görüntü")
-        
-        image_height, image_width = image.shape[:2]
-        
-        # YOLOv8 ile person detection (class 0 = person)
-        results = model(image, classes=[0], conf=0.4, verbose=False)
-        
-        # Tespit edilen kişiler
-        detections = []
-        bounding_boxes = []
-        
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Bounding box koordinatları
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                
-                bbox = [int(x1), int(y1), int(x2), int(y2)]
-                
-                detections.append({
-                    "type": "person",
-                    "confidence": round(confidence, 3),
-                    "bbox": bbox,
-                    "center": [int((x1 + x2) / 2), int((y1 + y2) / 2)],
-                    "area": int((x2 - x1) * (y2 - y1))
-                })
-                
-                bounding_boxes.append(bbox)
-        
-        person_count = len(detections)
-        
-        # Crowd density hesapla (alan bazlı)
-        total_area = image_width * image_height
-        occupied_area = sum([det["area"] for det in detections])
-        crowd_density = (occupied_area / total_area) * 100.0
-        
-        # Yoğunluk seviyesi
-        if crowd_density < 5:
-            density_level = "low"
-            density_score = 1
-        elif crowd_density < 15:
-            density_level = "medium-low"
-            density_score = 3
-        elif crowd_density < 30:
-            density_level = "medium"
-            density_score = 5
-        elif crowd_density < 50:
-            density_level = "high"
-            density_score = 7
-        else:
-            density_level = "critical"
-            density_score = 10
-        
-        # Heat map oluştur
-        heatmap_url = None
-        if person_count > 0:
-            heatmap_url = generate_heatmap(
-                image, 
-                detections, 
-                camera_id, 
-                location_zone
-            )
-        
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        return {
-            "success": True,
-            "camera_id": int(camera_id) if camera_id else 0,
-            "location_zone": location_zone or "Unknown",
-            "analysis": {
-                "person_count": person_count,
-                "crowd_density": round(crowd_density, 2),
-                "density_level": density_level,
-                "density_score": density_score,
-                "detection_objects": detections,
-                "heatmap_url": heatmap_url,
-                "processing_time_ms": processing_time,
-                "image_resolution": f"{image_width}x{image_height}",
-                "timestamp": datetime.now().isoformat()
-            }
-        }
-        
+        contents = await read_frame(request, file)
+        async with admission.admit(camera_id):
+            result = await analyze_frame(contents, camera_id, location_zone, start_time)
+        # X-Detections-Format: columnar | columnar-b64 ile kompakt detection_objects
+        return with_detection_format(result, negotiate(detections_format))
+    except AdmissionRejected as e:
+        return e.response()
     except Exception as e:
         print(f"❌ AI Analiz Hatası: {e}")
         return JSONResponse(
@@ -149,87 +315,139 @@ async def analyze_image(
             content={"error": str(e), "success": False}
         )
 
-def generate_heatmap(image, detections, camera_id, location_zone):
+def render_heatmap(image, detections):
     """
-    Profesyonel ısı haritası oluştur
+    Profesyonel ısı haritası oluştur (overlay görüntüsünü döndürür)
     """
-    try:
-        height, width = image.shape[:2]
+    # Her kişi tespiti için disk şeklinde yoğunluk lekesi
+    blobs = []
+    for det in detections:
+        center_x, center_y = det["center"]
+        bbox_width = det["bbox"][2] - det["bbox"][0]
+        bbox_height = det["bbox"][3] - det["bbox"][1]
         
-        # Boş heatmap oluştur
-        heatmap = np.zeros((height, width), dtype=np.float32)
+        # Kişinin boyutuna göre radius ayarla
+        radius = int(max(bbox_width, bbox_height) * 0.8)
+        radius = max(50, min(radius, 200))  # 50-200 pixel arası
         
-        # Her kişi tespiti için Gaussian dağılım ekle
-        for det in detections:
-            center_x, center_y = det["center"]
-            bbox_width = det["bbox"][2] - det["bbox"][0]
-            bbox_height = det["bbox"][3] - det["bbox"][1]
-            
-            # Kişinin boyutuna göre radius ayarla
-            radius = int(max(bbox_width, bbox_height) * 0.8)
-            radius = max(50, min(radius, 200))  # 50-200 pixel arası
-            
-            # Gaussian blur ile yoğunluk haritası
-            cv2.circle(heatmap, (center_x, center_y), radius, 1.0, -1)
-        
-        # Gaussian blur uygula (daha yumuşak geçişler)
-        heatmap = cv2.GaussianBlur(heatmap, (51, 51), 0)
+        blobs.append((center_x, center_y, radius, radius, "disc"))
+    
+    # Küçük ızgarada önceden bulanıklaştırılmış kernel'larla yoğunluk haritası
+    # (51x51 GaussianBlur ile aynı yumuşaklık, normalize edilmiş)
+    heatmap = render_density(image.shape, blobs, blur_sigma(51), accumulate="max")
+    
+    # Renklendir (JET colormap - mavi soğuk, kırmızı sıcak) ve orijinal görüntü ile birleştir
+    overlay = render_overlay(image, heatmap, 0.5, 0.5)
+    
+    # Bounding box'ları çiz
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        confidence = det["confidence"]
         
-        # Normalize et
-        if heatmap.max() > 0:
-            heatmap = heatmap / heatmap.max()
+        # Yeşil kutu
+        cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
-        # Renklendir (JET colormap - mavi soğuk, kırmızı sıcak)
-        heatmap_colored = cv2.applyColorMap(
-            np.uint8(255 * heatmap), 
-            cv2.COLORMAP_JET
+        # Confidence label
+        label = f"Person {confidence:.2f}"
+        cv2.putText(
+            overlay, 
+            label, 
+            (x1, y1 - 10), 
+            cv2.FONT_HERSHEY_SIMPLEX, 
+            0.5, 
+            (0, 255, 0), 
+            2
         )
-        
-        # Orijinal görüntü ile birleştir (overlay)
-        overlay = cv2.addWeighted(image, 0.5, heatmap_colored, 0.5, 0)
-        
-        # Bounding box'ları çiz
-        for det in detections:
-            x1, y1, x2, y2 = det["bbox"]
-            confidence = det["confidence"]
-            
-            # Yeşil kutu
-            cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            
-            # Confidence label
-            label = f"Person {confidence:.2f}"
-            cv2.putText(
-                overlay, 
-                label, 
-                (x1, y1 - 10), 
-                cv2.FONT_HERSHEY_SIMPLEX, 
-                0.5, 
-                (0, 255, 0), 
-                2
-            )
-        
-        # Kaydet
-        timestamp = int(time.time())
-        filename = f"heatmap_{camera_id}_{location_zone}_{timestamp}.jpg"
-        filepath = os.path.join("static", filename)
-        cv2.imwrite(filepath, overlay)
-        
-        return f"/static/{filename}"
+    
+    return overlay
+
+async def generate_heatmap(image, detections, camera_id, location_zone, frame):
+    """
+    Heatmap'i üret ve depoya kaydet (render ve yazma event loop dışında)
+    """
+    try:
+        with frame.stage("heatmap_render"):
+            overlay = await run_in_thread(render_heatmap, image, detections)
+        with frame.stage("heatmap_write"):
+            return await heatmap_store.save(overlay, camera_id, location_zone)
         
     except Exception as e:
         print(f"❌ Heatmap oluşturma hatası: {e}")
         return None
 
-@app.get("/static/{filename}")
-async def serve_heatmap(filename: str):
+# Lazy modda heatmap ilk GET /static isteğinde üretilir
+lazy_heatmaps = LazyHeatmapCache(render_heatmap, heatmap_store) if HEATMAP_MODE == "lazy" else None
+
+@app.websocket("/ws/analyze")
+async def analyze_stream(websocket: WebSocket):
     """
-    Heatmap dosyalarını servis et
+    Sürekli kare akışı: ws://host:8000/ws/analyze?camera_id=5&zone=Giris
+    Binary JPEG kareler gönderilir, her kare için kısa JSON sonuç döner.
     """
-    filepath = os.path.join("static", filename)
-    if os.path.exists(filepath):
-        return FileResponse(filepath, media_type="image/jpeg")
-    else:
-        raise HTTPException(status_code=404, detail="Heatmap bulunamadı")
+    camera_id, location_zone = stream_params(websocket)
+    if not startup.ready:
+        # 1013: tekrar dene (servis henüz hazır değil)
+        await websocket.close(code=1013)
+        return
+    await serve_frame_stream(websocket, admission.guard(analyze_frame), camera_id, location_zone)
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Kabul kontrolü: işlenen/bekleyen kareler, katman sınırları, ret sayıları"""
+    return admission.stats()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text formatında metrikler"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/realtime")
+async def realtime_stats_view(camera_id: Optional[str] = None, zone: Optional[str] = None):
+    """Bellekteki kayan pencere istatistikleri (v_ai_realtime_stats yerine)"""
+    if realtime_stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **realtime_stats.snapshot(camera_id, zone)}
+
+@app.get("/inference/workers")
+async def inference_workers():
+    """AI_SHARD_WORKERS > 0 ise worker process'leri, bekleyen işler ve serbest slotlar"""
+    if SHARD_WORKERS == 0:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/inference/policy")
+async def inference_policy_stats():
+    """Kamera kuralları ve son karelerin kalabalık ortalaması (auto boyut seçimi)"""
+    return inference_policy.stats()
+
+@app.get("/tracking/stats")
+async def tracking_stats():
+    """Kamera başına aktif iz ve giriş/çıkış sayaçları"""
+    if trackers is None:
+        return {"enabled": False}
+    return {"enabled": True, "cameras": trackers.stats()}
+
+@app.get("/motion/stats")
+async def motion_stats():
+    """Hareket kapısı metrikleri (kaç kare yeniden kullanıldı)"""
+    if motion_gate is None:
+        return {"enabled": False}
+    return {"enabled": True, **motion_gate.stats()}
+
+@app.get("/heatmaps/stats")
+async def heatmap_stats():
+    """Heatmap deposu ve lazy önbellek metrikleri"""
+    stats = {"mode": HEATMAP_MODE, "store": heatmap_store.stats()}
+    if lazy_heatmaps is not None:
+        stats["lazy"] = lazy_heatmaps.stats()
+    return stats
+
+@app.get("/static/{path:path}")
+async def serve_heatmap(path: str, request: Request):
+    """
+    Heatmap dosyalarını servis et (lazy modda ilk istekte üretilir, ETag/Cache-Control ile)
+    """
+    return await heatmap_store.serve(path, request, lazy_heatmaps)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, File, UploadFile, Header, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, Header, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import cv2
 import numpy as np
-import io
-from PIL import Image
-import time
 from typing import Optional
 import os
 from datetime import datetime
+from admission import AdmissionController, AdmissionRejected
+from executors import EXECUTOR_THREADS, configure_process_pool, run_cpu_bound, run_in_thread, shutdown_executors
+from heatmap import blur_sigma, render_density, render_overlay
+from heatmap_cache import HEATMAP_MODE, LazyHeatmapCache
+from heatmap_store import HeatmapStore
+from frame_stream import serve_frame_stream, stream_params
+from image_io import decode_image, read_frame, scale_detections
+from metrics import FrameMetrics, render_metrics, track_frames
+from motion_gate import MOTION_GATE, MotionGate, bbox_xywh, merge_roi_detections, outside_roi
+from readiness import Startup
+from realtime_stats import REALTIME_STATS_ENABLED, RealtimeStats
+from tracker import TRACKER_ENABLED, TrackerRegistry
+from compact_detections import negotiate, with_detection_format
+from density import area_density, classify_area_density
+from detectors import registry, resolve_backends, warm_up, warm_up_worker
+from nms import non_max_suppression
 
 app = FastAPI(title="CityV AI Service - Simple", version="1.0.0")
+startup = Startup("ai_service_simple", started=IMPORT_STARTED)
 
 # CORS
 app.add_middleware(
@@ -21,134 +38,234 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Klasörler
-os.makedirs("static", exist_ok=True)
+# Kamera başına kişi takibi ve giriş/çıkış sayımı (COUNTING_LINES ile sanal çizgi)
+trackers = TrackerRegistry() if TRACKER_ENABLED else None
+
+# Statik karelerde tespiti atlayan kamera başına hareket kapısı (MOTION_GATE=on)
+motion_gate = MotionGate() if MOTION_GATE else None
+
+# Kamera/bölge başına 1m-5m-1h kayan pencereler (dashboard DB'ye gitmeden okur)
+realtime_stats = RealtimeStats() if REALTIME_STATS_ENABLED else None
+
+# Heatmap deposu (static/<camera>/<gün>/..., yaş ve disk bütçesiyle)
+heatmap_store = HeatmapStore()
+
+# Detector backend seçimi: haar (fullbody + upperbody), haar_fullbody, haar_upperbody, yolo
+DETECTOR_BACKEND = os.getenv("AI_DETECTOR_BACKEND", "haar")
+DETECTOR_BACKENDS = resolve_backends(DETECTOR_BACKEND)
+SERVICE_NAME = "ai_service_simple"
+
+# Kabul kontrolü: kamera başına 1 işlenen + 1 bekleyen kare, global sınır, 429 + Retry-After
+admission = AdmissionController(SERVICE_NAME)
+configure_process_pool(warm_up_worker, (DETECTOR_BACKENDS,))
 
 print("✅ CityV Simple AI Service - OpenCV Person Detection Ready!")
 
 @app.get("/")
 def health_check():
-    return {
-        "status": "healthy",
+    # Liveness: detector'lar yüklenirken de 200; yükleme başarısızsa 503
+    return JSONResponse(status_code=503 if startup.error else 200, content={
+        "status": "unhealthy" if startup.error else "healthy",
+        "ready": startup.ready,
         "service": "CityV Simple AI",
         "model": "OpenCV Haar Cascade",
         "features": ["person_detection", "crowd_density", "heat_maps"]
+    })
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness: detector'lar yüklenip ısıtılana kadar 503"""
+    return startup.readiness()
+
+async def load_models():
+    # Cascade'ler her executor thread'i için bir kez yüklenir ve ısıtılır
+    with startup.phase("detectors"):
+        await warm_up(DETECTOR_BACKENDS, EXECUTOR_THREADS)
+    with startup.phase("services"):
+        await heatmap_store.start()
+
+@app.on_event("startup")
+async def on_startup():
+    # Port hemen açılır; detector'lar arka planda yüklenir
+    startup.record("imports", (time.perf_counter() - IMPORT_STARTED) * 1000)
+    startup.run(load_models)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await startup.stop()
+    if lazy_heatmaps is not None:
+        # Verilen heatmap URL'leri restart sonrası da geçerli kalsın
+        await run_in_thread(lazy_heatmaps.flush)
+    await heatmap_store.stop()
+    shutdown_executors()
+
+def detect_persons(image, offset=(0, 0)):
+    """
+    Seçili backend'lerle insan tespiti, çıktılar IoU tabanlı NMS ile birleştirilir.
+    offset: image tam karenin kırpılmış bir bölgesiyse sol üst köşesi (koordinatlar tam kareye göre döner)
+    """
+    # Gri tonlamaya çevir (tüm Haar backend'leri aynı gri kareyi kullanır)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    all_boxes = []
+    all_scores = []
+    for backend in DETECTOR_BACKENDS:
+        boxes, scores = registry.detect(backend, image, gray)
+        all_boxes.append(boxes)
+        all_scores.append(scores)
+    
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    
+    # Çakışan kutuları ele (fullbody skoru upperbody'den yüksek olduğu için öncelikli)
+    detections = []
+    for i in non_max_suppression(boxes, scores):
+        x, y, w, h = boxes[i]
+        x, y = x + offset[0], y + offset[1]
+        detections.append({
+            "type": "person",
+            "confidence": round(float(scores[i]), 3),
+            "bbox": [int(x), int(y), int(x+w), int(y+h)],
+            "center": [int(x + w/2), int(y + h/2)],
+            "area": int(w * h)
+        })
+    
+    return detections
+
+@track_frames(SERVICE_NAME, DETECTOR_BACKEND)
+async def analyze_frame(contents, camera_id, location_zone, start_time=None):
+    """
+    Tek kareyi analiz et (HTTP ve WebSocket uçları ortak kullanır)
+    """
+    start_time = start_time or time.time()
+    frame = FrameMetrics(SERVICE_NAME, camera_id, DETECTOR_BACKEND)
+    
+    # Hareket kapısı: sahne değişmediyse son analizi döndür (decode ve tespit yok)
+    motion = None
+    if motion_gate is not None and camera_id:
+        with frame.stage("motion"):
+            motion = await run_in_thread(motion_gate.probe, camera_id, contents)
+        if motion.reused:
+            # İzler güncellenmez; bu karede giriş/çıkış 0, doluluk güncel
+            tracking = trackers.snapshot(camera_id) if trackers is not None else {}
+            analysis = motion.reuse_analysis(start_time, **tracking)
+            frame.finish("reused", analysis["person_count"])
+            analysis["stages_ms"] = frame.as_dict()
+            if realtime_stats is not None:
+                realtime_stats.record(camera_id, location_zone, analysis["person_count"], analysis["crowd_density"])
+            return {
+                "success": True,
+                "camera_id": int(camera_id),
+                "location_zone": location_zone or "Unknown",
+                "analysis": analysis
+            }
+    
+    # JPEG'i decode et (AI_DECODE_MAX_SIDE ile doğrudan küçültülmüş)
+    with frame.stage("decode"):
+        image, original_size = await run_in_thread(decode_image, contents)
+    
+    if image is None:
+        raise HTTPException(status_code=400, detail="Geçersiz görüntü")
+    
+    image_height, image_width = image.shape[:2]
+    original_width, original_height = original_size
+    
+    # Haar Cascade tespiti (event loop dışında); hareket küçük bir bölgedeyse sadece orada
+    with frame.stage("detect"):
+        if motion is not None and motion.roi:
+            roi = motion.roi_pixels(image_width, image_height)
+            kept = [det for det in motion.payload["detections"] if outside_roi(det["center"], roi)]
+            fresh = await run_cpu_bound(
+                detect_persons, image[roi[1]:roi[3], roi[0]:roi[2]], (roi[0], roi[1])
+            )
+            detections = merge_roi_detections(kept, fresh, bbox_xywh)
+        else:
+            detections = await run_cpu_bound(detect_persons, image)
+    
+    person_count = len(detections)
+    
+    # İz güncelle: her tespite track_id, bu kare için giriş/çıkış sayıları
+    tracking = {}
+    if trackers is not None:
+        with frame.stage("tracking"):
+            track_ids, tracking = trackers.update(
+                camera_id or "0", [det["bbox"] for det in detections], image_width, image_height
+            )
+        for det, track_id in zip(detections, track_ids):
+            det["track_id"] = track_id
+    
+    # Crowd density
+    crowd_density = area_density(detections, image_width, image_height)
+    density_level, density_score = classify_area_density(crowd_density)
+    
+    # Heat map oluştur (lazy modda sadece referans saklanır)
+    heatmap_url = None
+    if person_count > 0 and lazy_heatmaps is not None:
+        heatmap_path = heatmap_store.new_name(camera_id, location_zone)
+        lazy_heatmaps.register(heatmap_path, contents, detections)
+        heatmap_url = heatmap_store.url(heatmap_path)
+    elif person_count > 0:
+        heatmap_url = await generate_heatmap(image, detections, camera_id, location_zone, frame)
+    
+    processing_time = int((time.time() - start_time) * 1000)
+    frame.finish("analyzed", person_count)
+    
+    analysis = {
+        "person_count": person_count,
+        "crowd_density": round(crowd_density, 2),
+        "density_level": density_level,
+        "density_score": density_score,
+        "detection_objects": scale_detections(
+            detections, original_width / image_width, original_height / image_height
+        ),
+        "heatmap_url": heatmap_url,
+        "processing_time_ms": processing_time,
+        "stages_ms": frame.as_dict(),
+        "image_resolution": f"{original_width}x{original_height}",
+        "decode_resolution": f"{image_width}x{image_height}",
+        "timestamp": datetime.now().isoformat(),
+        **tracking,
+        "reused": False,
+        "motion": motion.as_dict() if motion is not None else None
+    }
+    if motion is not None:
+        # Bu kare yeni referans olur; sonraki statik kareler bu sonucu kullanır
+        motion_gate.commit(camera_id, motion, {"analysis": analysis, "detections": detections})
+    if realtime_stats is not None:
+        realtime_stats.record(camera_id or 0, location_zone, person_count, analysis["crowd_density"])
+    
+    return {
+        "success": True,
+        "camera_id": int(camera_id) if camera_id else 0,
+        "location_zone": location_zone or "Unknown",
+        "analysis": analysis
     }
+    
 
 @app.post("/analyze")
 async def analyze_image(
-    file: UploadFile = File(...),
+    request: Request,
+    file: Optional[UploadFile] = File(None),
     camera_id: Optional[str] = Header(None, alias="X-Camera-ID"),
-    location_zone: Optional[str] = Header(None, alias="X-Location-Zone")
+    location_zone: Optional[str] = Header(None, alias="X-Location-Zone"),
+    detections_format: Optional[str] = Header(None, alias="X-Detections-Format")
 ):
     """
     OpenCV ile basit insan tespiti (PyTorch gerektirmez)
+    Kare multipart `file` alanı veya ham `image/jpeg` body olarak gönderilebilir.
     """
+    if not startup.ready:
+        return startup.not_ready()
     start_time = time.time()
     
     try:
-        # JPEG'i oku
-        contents = await file.read()
-        image_array = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Geçersiz görüntü")
-        
-        image_height, image_width = image.shape[:2]
-        
-        # Haar Cascade person detector
-        person_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_fullbody.xml')
-        upper_body_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_upperbody.xml')
-        
-        # Gri tonlamaya çevir
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Full body detection
-        full_body = person_cascade.detectMultiScale(gray, 1.1, 3, minSize=(30, 90))
-        
-        # Upper body detection (daha hassas)
-        upper_body = upper_body_cascade.detectMultiScale(gray, 1.1, 3, minSize=(30, 60))
-        
-        # Tespit edilen kişileri birleştir
-        detections = []
-        all_boxes = []
-        
-        for (x, y, w, h) in full_body:
-            detections.append({
-                "type": "person",
-                "confidence": 0.85,
-                "bbox": [int(x), int(y), int(x+w), int(y+h)],
-                "center": [int(x + w/2), int(y + h/2)],
-                "area": int(w * h)
-            })
-            all_boxes.append([x, y, w, h])
-        
-        for (x, y, w, h) in upper_body:
-            # Çakışma kontrolü
-            overlap = False
-            for box in all_boxes:
-                if abs(x - box[0]) < 50 and abs(y - box[1]) < 50:
-                    overlap = True
-                    break
-            
-            if not overlap:
-                detections.append({
-                    "type": "person",
-                    "confidence": 0.75,
-                    "bbox": [int(x), int(y), int(x+w), int(y+h)],
-                    "center": [int(x + w/2), int(y + h/2)],
-                    "area": int(w * h)
-                })
-        
-        person_count = len(detections)
-        
-        # Crowd density
-        total_area = image_width * image_height
-        occupied_area = sum([det["area"] for det in detections])
-        crowd_density = (occupied_area / total_area) * 100.0
-        
-        # Density level
-        if crowd_density < 5:
-            density_level = "low"
-            density_score = 1
-        elif crowd_density < 15:
-            density_level = "medium-low"
-            density_score = 3
-        elif crowd_density < 30:
-            density_level = "medium"
-            density_score = 5
-        elif crowd_density < 50:
-            density_level = "high"
-            density_score = 7
-        else:
-            density_level = "critical"
-            density_score = 10
-        
-        # Heat map oluştur
-        heatmap_url = None
-        if person_count > 0:
-            heatmap_url = generate_heatmap(image, detections, camera_id, location_zone)
-        
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        return {
-            "success": True,
-            "camera_id": int(camera_id) if camera_id else 0,
-            "location_zone": location_zone or "Unknown",
-            "analysis": {
-                "person_count": person_count,
-                "crowd_density": round(crowd_density, 2),
-                "density_level": density_level,
-                "density_score": density_score,
-                "detection_objects": detections,
-                "heatmap_url": heatmap_url,
-                "processing_time_ms": processing_time,
-                "image_resolution": f"{image_width}x{image_height}",
-                "timestamp": datetime.now().isoformat()
-            }
-        }
-        
+        contents = await read_frame(request, file)
+        async with admission.admit(camera_id):
+            result = await analyze_frame(contents, camera_id, location_zone, start_time)
+        # X-Detections-Format: columnar | columnar-b64 ile kompakt detection_objects
+        return with_detection_format(result, negotiate(detections_format))
+    except AdmissionRejected as e:
+        return e.response()
     except Exception as e:
         print(f"❌ AI Analiz Hatası: {e}")
         import traceback
@@ -158,60 +275,107 @@ async def analyze_image(
             content={"error": str(e), "success": False}
         )
 
-def generate_heatmap(image, detections, camera_id, location_zone):
-    try:
-        height, width = image.shape[:2]
-        heatmap = np.zeros((height, width), dtype=np.float32)
-        
-        # Her kişi için Gaussian dağılım
-        for det in detections:
-            center_x, center_y = det["center"]
-            bbox_width = det["bbox"][2] - det["bbox"][0]
-            bbox_height = det["bbox"][3] - det["bbox"][1]
-            
-            radius = int(max(bbox_width, bbox_height) * 0.8)
-            radius = max(50, min(radius, 200))
-            
-            cv2.circle(heatmap, (center_x, center_y), radius, 1.0, -1)
-        
-        # Gaussian blur
-        heatmap = cv2.GaussianBlur(heatmap, (51, 51), 0)
-        
-        if heatmap.max() > 0:
-            heatmap = heatmap / heatmap.max()
-        
-        # Renklendir
-        heatmap_colored = cv2.applyColorMap(np.uint8(255 * heatmap), cv2.COLORMAP_JET)
+def render_heatmap(image, detections):
+    # Her kişi için disk şeklinde yoğunluk lekesi
+    blobs = []
+    for det in detections:
+        center_x, center_y = det["center"]
+        bbox_width = det["bbox"][2] - det["bbox"][0]
+        bbox_height = det["bbox"][3] - det["bbox"][1]
         
-        # Overlay
-        overlay = cv2.addWeighted(image, 0.5, heatmap_colored, 0.5, 0)
+        radius = int(max(bbox_width, bbox_height) * 0.8)
+        radius = max(50, min(radius, 200))
         
-        # Bounding box'ları çiz
-        for det in detections:
-            x1, y1, x2, y2 = det["bbox"]
-            cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(overlay, f"Person {det['confidence']:.2f}", (x1, y1-10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        # Kaydet
-        timestamp = int(time.time())
-        filename = f"heatmap_{camera_id}_{location_zone}_{timestamp}.jpg"
-        filepath = os.path.join("static", filename)
-        cv2.imwrite(filepath, overlay)
-        
-        return f"/static/{filename}"
+        blobs.append((center_x, center_y, radius, radius, "disc"))
+    
+    # Küçük ızgarada Gaussian yoğunluk (51x51 blur eşdeğeri)
+    heatmap = render_density(image.shape, blobs, blur_sigma(51), accumulate="max")
+    
+    # Renklendir + overlay
+    overlay = render_overlay(image, heatmap, 0.5, 0.5)
+    
+    # Bounding box'ları çiz
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(overlay, f"Person {det['confidence']:.2f}", (x1, y1-10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    
+    return overlay
+
+async def generate_heatmap(image, detections, camera_id, location_zone, frame):
+    try:
+        # Render CPU havuzunda, JPEG yazma thread havuzunda
+        with frame.stage("heatmap_render"):
+            overlay = await run_cpu_bound(render_heatmap, image, detections)
+        with frame.stage("heatmap_write"):
+            return await heatmap_store.save(overlay, camera_id, location_zone)
         
     except Exception as e:
         print(f"❌ Heatmap hatası: {e}")
         return None
 
-@app.get("/static/{filename}")
-async def serve_heatmap(filename: str):
-    filepath = os.path.join("static", filename)
-    if os.path.exists(filepath):
-        return FileResponse(filepath, media_type="image/jpeg")
-    else:
-        raise HTTPException(status_code=404, detail="Heatmap bulunamadı")
+# Lazy modda heatmap ilk GET /static isteğinde üretilir
+lazy_heatmaps = LazyHeatmapCache(render_heatmap, heatmap_store) if HEATMAP_MODE == "lazy" else None
+
+@app.websocket("/ws/analyze")
+async def analyze_stream(websocket: WebSocket):
+    """
+    Sürekli kare akışı: ws://host:8000/ws/analyze?camera_id=5&zone=Giris
+    Binary JPEG kareler gönderilir, her kare için kısa JSON sonuç döner.
+    """
+    camera_id, location_zone = stream_params(websocket)
+    if not startup.ready:
+        # 1013: tekrar dene (servis henüz hazır değil)
+        await websocket.close(code=1013)
+        return
+    await serve_frame_stream(websocket, admission.guard(analyze_frame), camera_id, location_zone)
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Kabul kontrolü: işlenen/bekleyen kareler, katman sınırları, ret sayıları"""
+    return admission.stats()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text formatında metrikler"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/realtime")
+async def realtime_stats_view(camera_id: Optional[str] = None, zone: Optional[str] = None):
+    """Bellekteki kayan pencere istatistikleri (v_ai_realtime_stats yerine)"""
+    if realtime_stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **realtime_stats.snapshot(camera_id, zone)}
+
+@app.get("/tracking/stats")
+async def tracking_stats():
+    """Kamera başına aktif iz ve giriş/çıkış sayaçları"""
+    if trackers is None:
+        return {"enabled": False}
+    return {"enabled": True, "cameras": trackers.stats()}
+
+@app.get("/motion/stats")
+async def motion_stats():
+    """Hareket kapısı metrikleri (kaç kare yeniden kullanıldı)"""
+    if motion_gate is None:
+        return {"enabled": False}
+    return {"enabled": True, **motion_gate.stats()}
+
+@app.get("/heatmaps/stats")
+async def heatmap_stats():
+    """Heatmap deposu ve lazy önbellek metrikleri"""
+    stats = {"mode": HEATMAP_MODE, "store": heatmap_store.stats()}
+    if lazy_heatmaps is not None:
+        stats["lazy"] = lazy_heatmaps.stats()
+    return stats
+
+@app.get("/static/{path:path}")
+async def serve_heatmap(path: str, request: Request):
+    """
+    Heatmap dosyalarını servis et (lazy modda ilk istekte üretilir, ETag/Cache-Control ile)
+    """
+    return await heatmap_store.serve(path, request, lazy_heatmaps)
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,23 +3,47 @@
 ESP32 → Python AI → Database (direkt bağlantı)
 """
 
-from fastapi import FastAPI, File, UploadFile, Header, Request
-from fastapi.responses import JSONResponse, FileResponse
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, Header, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import cv2
 import numpy as np
 from datetime import datetime
+import asyncio
 import os
 import json
-import asyncpg
 from dotenv import load_dotenv
-import time
+from typing import Optional
+from admission import AdmissionController, AdmissionRejected
+from executors import EXECUTOR_THREADS, configure_process_pool, run_cpu_bound, run_in_thread, shutdown_executors
+from heatmap import blur_sigma, render_density, render_overlay
+from heatmap_cache import HEATMAP_MODE, LazyHeatmapCache
+from heatmap_store import HeatmapStore
+from hourly_rollup import HOURLY_ROLLUP_ENABLED, HourlyRollup
+from camera_poller import CameraPoller, load_targets
+from crowd_alerts import CROWD_ALERTS_ENABLED, AlertWriter, CrowdAlertEngine
+from frame_stream import serve_frame_stream, stream_params
+from image_io import decode_image
+from metrics import QUEUE_DEPTH, FrameMetrics, render_metrics, track_frames
+from motion_gate import MOTION_GATE, MotionGate, merge_roi_detections, outside_roi
+from readiness import Startup
+from realtime_stats import REALTIME_STATS_ENABLED, RealtimeStats
+from tracker import TRACKER_ENABLED, TrackerRegistry
+from compact_detections import DETECTION_FORMATS, encode_detections, negotiate, with_detection_format
+from density import classify_person_density, person_density
+from detectors import registry, resolve_backends, warm_up, warm_up_worker
+from nms import non_max_suppression
+from db_pool import DatabasePool
+from write_behind import WriteBehindBuffer
 
 # .env dosyasını yükle
 load_dotenv()
 
 app = FastAPI(title="CityV AI Standalone")
+startup = Startup("ai_standalone", started=IMPORT_STARTED)
 
 # CORS
 app.add_middleware(
@@ -30,72 +54,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static files
-os.makedirs("static", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Heatmap deposu (static/<camera>/<gün>/..., yaş ve disk bütçesiyle)
+heatmap_store = HeatmapStore()
 
 # Database connection
 DATABASE_URL = os.getenv('DATABASE_URL') or os.getenv('POSTGRES_URL')
 if not DATABASE_URL:
     print("⚠️ DATABASE_URL bulunamadı! .env dosyasını kontrol et")
 
-# OpenCV Haar Cascade models
-FULLBODY_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_fullbody.xml')
-UPPERBODY_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_upperbody.xml')
+# Bağlantı havuzu (startup'ta açılır, shutdown'da kapanır)
+db_pool = DatabasePool(DATABASE_URL) if DATABASE_URL else None
+
+# Kayıt modu: "direct" (her kare INSERT ... RETURNING) veya "write_behind" (tamponla toplu COPY)
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "direct")
+ANALYSIS_COLUMNS = [
+    "camera_id", "location_zone", "person_count", "crowd_density",
+    "detection_objects", "heatmap_url", "image_size", "processing_time_ms"
+]
+# source kolonu (database/add_ai_analysis_source.sql) sadece saatlik özet açıkken yazılır;
+# özet kapalıyken kayıt yolu bu migration'a bağlı değildir
+WRITE_SOURCE = db_pool is not None and HOURLY_ROLLUP_ENABLED
+if WRITE_SOURCE:
+    ANALYSIS_COLUMNS.append("source")
+
+# Sabit SQL metni: asyncpg her bağlantıda bir kez prepare eder, sonra önbellekten kullanır
+INSERT_ANALYSIS_SQL = f"""
+    INSERT INTO iot_ai_analysis 
+    ({', '.join(ANALYSIS_COLUMNS)})
+    VALUES ({', '.join(f'${i}' for i in range(1, len(ANALYSIS_COLUMNS) + 1))})
+    RETURNING id, created_at
+"""
+# detection_objects JSONB biçimi: full (sözlük listesi), columnar veya columnar-b64 (compact_detections.py)
+DB_DETECTIONS_FORMAT = os.getenv("DB_DETECTIONS_FORMAT", "full")
+if DB_DETECTIONS_FORMAT not in DETECTION_FORMATS:
+    raise ValueError(f"DB_DETECTIONS_FORMAT {', '.join(DETECTION_FORMATS)} olmalı: {DB_DETECTIONS_FORMAT}")
+# created_at kolonu COPY'de verilmez, flush anında DEFAULT NOW() ile dolar
+write_buffer = None
+if db_pool is not None and DB_WRITE_MODE == "write_behind":
+    write_buffer = WriteBehindBuffer(db_pool, "iot_ai_analysis", ANALYSIS_COLUMNS)
+
+# Saatlik özet tablosu (iot_ai_hourly_rollup) bellekteki kısmi toplamlarla artımlı güncellenir
+hourly_rollup = HourlyRollup(db_pool) if db_pool is not None and HOURLY_ROLLUP_ENABLED else None
+
+# Yoğunluk uyarıları: kurallar her karede değerlendirilir, iot_crowd_alerts'e toplu yazılır
+alert_engine = CrowdAlertEngine() if CROWD_ALERTS_ENABLED else None
+alert_writer = AlertWriter(db_pool) if alert_engine is not None and db_pool is not None else None
 
-def detect_persons(image):
-    """OpenCV Haar Cascade ile insan tespiti"""
+SERVICE_NAME = "ai_standalone"
+
+# Kabul kontrolü: kamera başına 1 işlenen + 1 bekleyen kare, global sınır, 429 + Retry-After
+admission = AdmissionController(SERVICE_NAME)
+
+def queue_depths():
+    """Prometheus cityv_queue_depth: yazma tamponlarında bekleyen satırlar"""
+    depths = {}
+    if write_buffer is not None:
+        depths[(SERVICE_NAME, "write_behind")] = write_buffer.stats()["pending"]
+    if hourly_rollup is not None:
+        depths[(SERVICE_NAME, "hourly_rollup")] = hourly_rollup.stats()["pending_rows"]
+    if alert_writer is not None:
+        depths[(SERVICE_NAME, "alert_writer")] = alert_writer.stats()["pending"]
+    return depths
+
+QUEUE_DEPTH.set_function(queue_depths)
+
+# Detector backend seçimi: haar (fullbody + upperbody), haar_fullbody, haar_upperbody, yolo
+# Cascade örnekleri registry'de thread başına tutulur (eşzamanlı kullanıma güvenli)
+DETECTOR_BACKEND = os.getenv("AI_DETECTOR_BACKEND", "haar")
+DETECTOR_BACKENDS = resolve_backends(DETECTOR_BACKEND)
+configure_process_pool(warm_up_worker, (DETECTOR_BACKENDS,))
+
+def detect_persons(image, offset=(0, 0)):
+    """Seçili backend'lerle insan tespiti (offset: kırpılmış bölgenin tam karedeki sol üst köşesi)"""
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Full body detection
-    fullbodies = FULLBODY_CASCADE.detectMultiScale(gray, 1.1, 3, minSize=(30, 90))
-    
-    # Upper body detection
-    upperbodies = UPPERBODY_CASCADE.detectMultiScale(gray, 1.1, 3, minSize=(30, 60))
-    
     # Combine detections
-    all_detections = list(fullbodies) + list(upperbodies)
+    all_boxes = []
+    all_scores = []
+    for backend in DETECTOR_BACKENDS:
+        boxes, scores = registry.detect(backend, image, gray)
+        all_boxes.append(boxes)
+        all_scores.append(scores)
     
-    # Non-maximum suppression (basit)
-    unique_detections = []
-    for x, y, w, h in all_detections:
-        is_duplicate = False
-        for x2, y2, w2, h2 in unique_detections:
-            # Overlap kontrolü
-            if abs(x - x2) < 50 and abs(y - y2) < 50:
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_detections.append((x, y, w, h))
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
     
-    return unique_detections
+    # Non-maximum suppression (vektörel, IoU tabanlı)
+    keep = non_max_suppression(boxes, scores)
+    return [(int(x) + offset[0], int(y) + offset[1], int(w), int(h)) for x, y, w, h in boxes[keep]]
 
 def generate_heatmap(image, detections):
     """Heat map oluştur"""
-    height, width = image.shape[:2]
-    heatmap = np.zeros((height, width), dtype=np.float32)
-    
-    # Her tespit için Gaussian blob ekle
+    # Her tespit için kare şeklinde yoğunluk lekesi (çakışmalar toplanır)
+    blobs = []
     for (x, y, w, h) in detections:
         center_x, center_y = x + w//2, y + h//2
         radius = max(w, h) // 2
-        
-        y1, y2 = max(0, center_y - radius), min(height, center_y + radius)
-        x1, x2 = max(0, center_x - radius), min(width, center_x + radius)
-        
-        if y2 > y1 and x2 > x1:
-            heatmap[y1:y2, x1:x2] += 1.0
-    
-    # Gaussian blur
-    if heatmap.max() > 0:
-        heatmap = cv2.GaussianBlur(heatmap, (99, 99), 0)
-        heatmap = heatmap / heatmap.max() if heatmap.max() > 0 else heatmap
+        blobs.append((center_x, center_y, radius, radius, "rect"))
     
-    # Colormap
-    heatmap_colored = cv2.applyColorMap((heatmap * 255).astype(np.uint8), cv2.COLORMAP_JET)
+    # Küçük ızgarada Gaussian yoğunluk (99x99 blur eşdeğeri), normalize edilmiş
+    heatmap = render_density(image.shape, blobs, blur_sigma(99), accumulate="sum")
     
-    # Overlay
-    result = cv2.addWeighted(image, 0.6, heatmap_colored, 0.4, 0)
+    # Colormap + overlay
+    result = render_overlay(image, heatmap, 0.6, 0.4)
     
     # Bounding boxes çiz
     for (x, y, w, h) in detections:
@@ -104,23 +165,95 @@ def generate_heatmap(image, detections):
     
     return result
 
+# Kamera başına kişi takibi ve giriş/çıkış sayımı (COUNTING_LINES ile sanal çizgi)
+trackers = TrackerRegistry() if TRACKER_ENABLED else None
+
+# Statik karelerde tespiti atlayan kamera başına hareket kapısı (MOTION_GATE=on)
+motion_gate = MotionGate() if MOTION_GATE else None
+
+# Kamera/bölge başına 1m-5m-1h kayan pencereler (dashboard DB'ye gitmeden okur)
+realtime_stats = RealtimeStats() if REALTIME_STATS_ENABLED else None
+
+# Lazy modda heatmap ilk GET /static isteğinde üretilir
+lazy_heatmaps = LazyHeatmapCache(generate_heatmap, heatmap_store) if HEATMAP_MODE == "lazy" else None
+
+async def record_analysis(camera_id, location_zone, person_count, crowd_density, detection_objects, heatmap_url, image_size, processing_time_ms):
+    """Analizi yazma moduna göre kaydet (write-behind tampon veya doğrudan INSERT)"""
+    detection_objects = encode_detections(detection_objects, DB_DETECTIONS_FORMAT)
+    if write_buffer is not None:
+        # Write-behind: satır tampona girer, id flush sırasında oluşur
+        write_buffer.add((
+            camera_id,
+            location_zone,
+            person_count,
+            crowd_density,
+            json.dumps(detection_objects),
+            heatmap_url,
+            image_size,
+            processing_time_ms,
+            *((SERVICE_NAME,) if WRITE_SOURCE else ())
+        ))
+        return {"saved": False, "status": "queued"}
+    
+    db_result = await save_to_database(
+        camera_id,
+        location_zone,
+        person_count,
+        crowd_density,
+        detection_objects,
+        heatmap_url,
+        image_size,
+        processing_time_ms
+    )
+    return {
+        "saved": db_result is not None,
+        "id": db_result['id'] if db_result else None
+    }
+
+def update_aggregates(camera_id, location_zone, person_count, crowd_density, analysis):
+    """Kaydedilen her analizi bellek içi pencerelere ve saatlik özete ekle (DB'deki değerlerle aynı)"""
+    if realtime_stats is not None:
+        realtime_stats.record(camera_id, location_zone, person_count, crowd_density)
+    if hourly_rollup is not None:
+        hourly_rollup.add(
+            camera_id,
+            location_zone,
+            person_count,
+            crowd_density,
+            analysis.get("entry_count", 0),
+            analysis.get("exit_count", 0),
+            analysis.get("current_occupancy")
+        )
+
+def check_alerts(camera_id, location_zone, person_count, crowd_density, density_score):
+    """Uyarı kurallarını bu kare için değerlendir; açılan/kapanan uyarılar yanıta eklenir"""
+    if alert_engine is None:
+        return None
+    events = alert_engine.evaluate(camera_id, location_zone, person_count, crowd_density, density_score)
+    for event in events:
+        if alert_writer is not None:
+            alert_writer.add(event)
+    return {
+        "active": alert_engine.active(camera_id),
+        "events": [
+            {"action": e["action"], "alert_type": e["alert_type"], "alert_message": e["alert_message"]}
+            for e in events
+        ]
+    }
+
 async def save_to_database(camera_id, location_zone, person_count, crowd_density, detection_objects, heatmap_url, image_size, processing_time_ms):
     """Veritabanına kaydet"""
-    if not DATABASE_URL:
+    if db_pool is None:
         print("⚠️ Database URL yok, kayıt atlanıyor")
         return None
     
     try:
-        conn = await asyncpg.connect(DATABASE_URL)
-        
-        result = await conn.fetchrow("""
-            INSERT INTO iot_ai_analysis 
-            (camera_id, location_zone, person_count, crowd_density, detection_objects, heatmap_url, image_size, processing_time_ms)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            RETURNING id, created_at
-        """, camera_id, location_zone, person_count, crowd_density, json.dumps(detection_objects), heatmap_url, image_size, processing_time_ms)
-        
-        await conn.close()
+        result = await db_pool.fetchrow(
+            INSERT_ANALYSIS_SQL,
+            camera_id, location_zone, person_count, crowd_density,
+            json.dumps(detection_objects), heatmap_url, image_size, processing_time_ms,
+            *((SERVICE_NAME,) if WRITE_SOURCE else ())
+        )
         
         print(f"✅ Database kaydedildi: ID {result['id']}")
         return dict(result)
@@ -129,128 +262,360 @@ async def save_to_database(camera_id, location_zone, person_count, crowd_density
         print(f"❌ Database hatası: {e}")
         return None
 
+async def load_detectors():
+    with startup.phase("detectors"):
+        await warm_up(DETECTOR_BACKENDS, EXECUTOR_THREADS)
+
+async def open_database():
+    if db_pool is not None:
+        with startup.phase("database"):
+            await db_pool.open()
+
+async def load_services():
+    # Detector ısıtma ve database bağlantıları birbirini beklemez
+    await asyncio.gather(load_detectors(), open_database())
+    with startup.phase("services"):
+        await start_background_tasks()
+
+async def start_background_tasks():
+    if write_buffer is not None:
+        await write_buffer.start()
+    if hourly_rollup is not None:
+        await hourly_rollup.start()
+    if alert_writer is not None:
+        # Açık uyarılar sadece bellekte izlenir; önceki çalışmadan kalanlar motora yüklenir
+        await alert_writer.reconcile(alert_engine)
+        await alert_writer.start()
+    await heatmap_store.start()
+    if camera_poller is not None:
+        await camera_poller.start()
+
+@app.on_event("startup")
+async def on_startup():
+    # Port hemen açılır; detector'lar ve database arka planda hazırlanır
+    startup.record("imports", (time.perf_counter() - IMPORT_STARTED) * 1000)
+    startup.run(load_services)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await startup.stop()
+    # Önce yeni kare akışını durdur, tampondaki satırları yaz, sonra havuzu kapat
+    if camera_poller is not None:
+        await camera_poller.stop()
+    if write_buffer is not None:
+        await write_buffer.stop()
+    if hourly_rollup is not None:
+        await hourly_rollup.stop()
+    if alert_writer is not None:
+        await alert_writer.stop()
+    if db_pool is not None:
+        await db_pool.close()
+    if lazy_heatmaps is not None:
+        # Verilen heatmap URL'leri restart sonrası da geçerli kalsın
+        await run_in_thread(lazy_heatmaps.flush)
+    await heatmap_store.stop()
+    shutdown_executors()
+
 @app.get("/")
 async def root():
-    return {
-        "status": "healthy",
+    # Liveness: hazırlanırken de 200; başlatma başarısızsa 503
+    return JSONResponse(status_code=503 if startup.error else 200, content={
+        "status": "unhealthy" if startup.error else "healthy",
+        "ready": startup.ready,
         "service": "CityV AI Standalone",
         "model": "OpenCV Haar Cascade",
         "features": ["person_detection", "crowd_density", "heat_maps", "database_integration"]
+    })
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: detector'lar ve database hazır olana kadar 503"""
+    return startup.readiness()
+
+@app.get("/db/pool")
+async def db_pool_stats():
+    """Bağlantı havuzu doluluk metrikleri"""
+    if db_pool is None:
+        return {"enabled": False}
+    stats = {"enabled": True, "write_mode": DB_WRITE_MODE, **db_pool.stats()}
+    if write_buffer is not None:
+        stats["write_behind"] = write_buffer.stats()
+    if hourly_rollup is not None:
+        stats["hourly_rollup"] = hourly_rollup.stats()
+    return stats
+
+@app.get("/cameras/poller")
+async def camera_poller_stats():
+    """Pull modundaki kameraların durumu (çekilen, analiz edilen, düşürülen kareler)"""
+    if camera_poller is None:
+        return {"enabled": False}
+    return {"enabled": True, **camera_poller.stats()}
+
+@app.get("/alerts/stats")
+async def alert_stats():
+    """Açık uyarılar, kurallar ve yazma tamponu"""
+    if alert_engine is None:
+        return {"enabled": False}
+    stats = {"enabled": True, **alert_engine.stats()}
+    if alert_writer is not None:
+        stats["writer"] = alert_writer.stats()
+    return stats
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Kabul kontrolü: işlenen/bekleyen kareler, katman sınırları, ret sayıları"""
+    return admission.stats()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text formatında metrikler"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/realtime")
+async def realtime_stats_view(camera_id: Optional[str] = None, zone: Optional[str] = None):
+    """Bellekteki kayan pencere istatistikleri (v_ai_realtime_stats yerine)"""
+    if realtime_stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **realtime_stats.snapshot(camera_id, zone)}
+
+@app.get("/tracking/stats")
+async def tracking_stats():
+    """Kamera başına aktif iz ve giriş/çıkış sayaçları"""
+    if trackers is None:
+        return {"enabled": False}
+    return {"enabled": True, "cameras": trackers.stats()}
+
+@app.get("/motion/stats")
+async def motion_stats():
+    """Hareket kapısı metrikleri (kaç kare yeniden kullanıldı)"""
+    if motion_gate is None:
+        return {"enabled": False}
+    return {"enabled": True, **motion_gate.stats()}
+
+@app.get("/heatmaps/stats")
+async def heatmap_stats():
+    """Heatmap deposu ve lazy önbellek metrikleri"""
+    stats = {"mode": HEATMAP_MODE, "store": heatmap_store.stats()}
+    if lazy_heatmaps is not None:
+        stats["lazy"] = lazy_heatmaps.stats()
+    return stats
+
+@app.get("/static/{path:path}")
+async def serve_heatmap(path: str, request: Request):
+    """Heatmap dosyalarını servis et (lazy modda ilk istekte üretilir, ETag/Cache-Control ile)"""
+    return await heatmap_store.serve(path, request, lazy_heatmaps)
+
+@track_frames(SERVICE_NAME, DETECTOR_BACKEND)
+async def analyze_frame(image_data, camera_id, location_zone, start_time=None):
+    """Tek kareyi analiz et ve kaydet (HTTP ve WebSocket uçları ortak kullanır)"""
+    start_time = start_time or time.time()
+    frame = FrameMetrics(SERVICE_NAME, camera_id, DETECTOR_BACKEND)
+    
+    # Hareket kapısı: sahne değişmediyse son analiz tekrar kaydedilir (decode ve tespit yok)
+    motion = None
+    if motion_gate is not None:
+        with frame.stage("motion"):
+            motion = await run_in_thread(motion_gate.probe, camera_id, image_data)
+        if motion.reused:
+            # İzler güncellenmez; bu karede giriş/çıkış 0, doluluk güncel
+            tracking = trackers.snapshot(camera_id) if trackers is not None else {}
+            analysis = motion.reuse_analysis(start_time, **tracking)
+            update_aggregates(camera_id, location_zone, analysis["person_count"], analysis["crowd_density"], analysis)
+            with frame.stage("alerts"):
+                analysis["alerts"] = check_alerts(
+                    camera_id, location_zone, analysis["person_count"], analysis["crowd_density"], analysis["density_score"]
+                )
+            with frame.stage("db"):
+                database_info = await record_analysis(
+                    int(camera_id),
+                    location_zone,
+                    analysis["person_count"],
+                    analysis["crowd_density"],
+                    analysis["detection_objects"],
+                    analysis["heatmap_url"],
+                    len(image_data),
+                    analysis["processing_time_ms"]
+                )
+            frame.finish("reused", analysis["person_count"])
+            analysis["stages_ms"] = frame.as_dict()
+            return {
+                "success": True,
+                "camera_id": int(camera_id),
+                "location_zone": location_zone,
+                "analysis": analysis,
+                "database": database_info
+            }
+    
+    # JPEG decode (AI_DECODE_MAX_SIDE ile doğrudan küçültülmüş)
+    with frame.stage("decode"):
+        image, original_size = await run_in_thread(decode_image, image_data)
+    
+    if image is None:
+        frame.finish("error")
+        return JSONResponse({"success": False, "error": "Invalid image"}, status_code=400)
+    
+    width, height = original_size
+    scale_x = width / image.shape[1]
+    scale_y = height / image.shape[0]
+    image_size = len(image_data)
+    
+    print(f"📸 ESP32 analiz: Camera {camera_id}, Zone {location_zone}, {width}x{height}, {image_size} bytes")
+    
+    # İnsan tespiti (event loop dışında); hareket küçük bir bölgedeyse sadece orada
+    with frame.stage("detect"):
+        if motion is not None and motion.roi:
+            roi = motion.roi_pixels(image.shape[1], image.shape[0])
+            kept = [
+                (x, y, w, h) for x, y, w, h in motion.payload["detections"]
+                if outside_roi((x + w // 2, y + h // 2), roi)
+            ]
+            fresh = await run_cpu_bound(
+                detect_persons, image[roi[1]:roi[3], roi[0]:roi[2]], (roi[0], roi[1])
+            )
+            detections = merge_roi_detections(kept, fresh)
+        else:
+            detections = await run_cpu_bound(detect_persons, image)
+    person_count = len(detections)
+    
+    # Yoğunluk hesapla (orijinal çözünürlüğe göre)
+    crowd_density = person_density(person_count, width, height)
+    density_level, density_score = classify_person_density(crowd_density)
+    
+    # İz güncelle: her tespite track_id, bu kare için giriş/çıkış sayıları
+    tracking = {}
+    track_ids = [None] * person_count
+    if trackers is not None:
+        with frame.stage("tracking"):
+            track_ids, tracking = trackers.update(
+                camera_id, [(x, y, x + w, y + h) for x, y, w, h in detections], image.shape[1], image.shape[0]
+            )
+    
+    # Detection objects (orijinal görüntü koordinatlarında)
+    detection_objects = [
+        {
+            "label": "person",
+            "confidence": 0.75,
+            "x": int(x * scale_x),
+            "y": int(y * scale_y),
+            "width": int(w * scale_x),
+            "height": int(h * scale_y),
+            "track_id": track_id
+        }
+        for (x, y, w, h), track_id in zip(detections, track_ids)
+    ]
+    
+    # Heat map oluştur
+    heatmap_url = None
+    if person_count > 0:
+        if lazy_heatmaps is not None:
+            # Lazy: sadece kaynak kare ve tespitler saklanır, overlay ilk istekte üretilir
+            heatmap_path = heatmap_store.new_name(camera_id, location_zone)
+            lazy_heatmaps.register(heatmap_path, image_data, detections)
+            heatmap_url = heatmap_store.url(heatmap_path)
+        else:
+            with frame.stage("heatmap_render"):
+                heatmap_image = await run_cpu_bound(generate_heatmap, image, detections)
+            with frame.stage("heatmap_write"):
+                heatmap_url = await heatmap_store.save(heatmap_image, camera_id, location_zone)
+    
+    processing_time_ms = int((time.time() - start_time) * 1000)
+    
+    # Database'e kaydet
+    with frame.stage("db"):
+        database_info = await record_analysis(
+            int(camera_id),
+            location_zone,
+            person_count,
+            crowd_density,
+            detection_objects,
+            heatmap_url,
+            image_size,
+            processing_time_ms
+        )
+    
+    print(f"✅ Analiz tamamlandı: {person_count} kişi, {crowd_density:.2f}% yoğunluk, {processing_time_ms}ms")
+    
+    analysis = {
+        "person_count": person_count,
+        "crowd_density": round(crowd_density, 2),
+        "density_level": density_level,
+        "density_score": density_score,
+        "detection_objects": detection_objects,
+        "heatmap_url": heatmap_url,
+        "processing_time_ms": processing_time_ms,
+        "image_resolution": f"{width}x{height}",
+        "timestamp": datetime.now().isoformat(),
+        **tracking,
+        "reused": False,
+        "motion": motion.as_dict() if motion is not None else None
+    }
+    if motion is not None:
+        # Bu kare yeni referans olur; sonraki statik kareler bu sonucu kullanır
+        motion_gate.commit(camera_id, motion, {"analysis": analysis, "detections": detections})
+    update_aggregates(camera_id, location_zone, person_count, crowd_density, analysis)
+    with frame.stage("alerts"):
+        analysis["alerts"] = check_alerts(camera_id, location_zone, person_count, crowd_density, density_score)
+    frame.finish("analyzed", person_count)
+    analysis["stages_ms"] = frame.as_dict()
+    
+    return {
+        "success": True,
+        "camera_id": int(camera_id),
+        "location_zone": location_zone,
+        "analysis": analysis,
+        "database": database_info
     }
+    
+
+# Pull modu: CAMERA_POLL_TARGETS'taki kameralar sunucu tarafından yoklanır, kareler
+# /esp32/analyze ile aynı analyze_frame akışından geçer
+POLL_TARGETS = load_targets()
+camera_poller = CameraPoller(analyze_frame, POLL_TARGETS) if POLL_TARGETS else None
 
 @app.post("/esp32/analyze")
 async def esp32_analyze(
     request: Request,
     x_camera_id: str = Header("1"),
-    x_location_zone: str = Header("Unknown")
+    x_location_zone: str = Header("Unknown"),
+    x_detections_format: Optional[str] = Header(None)
 ):
     """ESP32'den gelen fotoğrafı analiz et"""
+    if not startup.ready:
+        return startup.not_ready()
     start_time = time.time()
     
     try:
         # Raw body data al (ESP32 JPEG binary gönderir)
         image_data = await request.body()
-        
-        # JPEG decode
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return JSONResponse({"success": False, "error": "Invalid image"}, status_code=400)
-        
-        height, width = image.shape[:2]
-        image_size = len(image_data)
-        
-        print(f"📸 ESP32 analiz: Camera {x_camera_id}, Zone {x_location_zone}, {width}x{height}, {image_size} bytes")
-        
-        # İnsan tespiti
-        detections = detect_persons(image)
-        person_count = len(detections)
-        
-        # Yoğunluk hesapla
-        area = width * height
-        crowd_density = (person_count / area) * 10000 if area > 0 else 0.0
-        
-        # Density level
-        if crowd_density < 0.5:
-            density_level = "low"
-            density_score = 1
-        elif crowd_density < 1.5:
-            density_level = "medium"
-            density_score = 2
-        else:
-            density_level = "high"
-            density_score = 3
-        
-        # Detection objects
-        detection_objects = [
-            {
-                "label": "person",
-                "confidence": 0.75,
-                "x": int(x),
-                "y": int(y),
-                "width": int(w),
-                "height": int(h)
-            }
-            for x, y, w, h in detections
-        ]
-        
-        # Heat map oluştur
-        heatmap_url = None
-        if person_count > 0:
-            heatmap_image = generate_heatmap(image, detections)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            heatmap_filename = f"heatmap_{x_camera_id}_{timestamp}.jpg"
-            heatmap_path = os.path.join("static", heatmap_filename)
-            cv2.imwrite(heatmap_path, heatmap_image)
-            heatmap_url = f"/static/{heatmap_filename}"
-        
-        processing_time_ms = int((time.time() - start_time) * 1000)
-        
-        # Database'e kaydet
-        db_result = await save_to_database(
-            int(x_camera_id),
-            x_location_zone,
-            person_count,
-            crowd_density,
-            detection_objects,
-            heatmap_url,
-            image_size,
-            processing_time_ms
-        )
-        
-        print(f"✅ Analiz tamamlandı: {person_count} kişi, {crowd_density:.2f}% yoğunluk, {processing_time_ms}ms")
-        
-        return {
-            "success": True,
-            "camera_id": int(x_camera_id),
-            "location_zone": x_location_zone,
-            "analysis": {
-                "person_count": person_count,
-                "crowd_density": round(crowd_density, 2),
-                "density_level": density_level,
-                "density_score": density_score,
-                "detection_objects": detection_objects,
-                "heatmap_url": heatmap_url,
-                "processing_time_ms": processing_time_ms,
-                "image_resolution": f"{width}x{height}",
-                "timestamp": datetime.now().isoformat()
-            },
-            "database": {
-                "saved": db_result is not None,
-                "id": db_result['id'] if db_result else None
-            }
-        }
-        
+        async with admission.admit(x_camera_id):
+            result = await analyze_frame(image_data, x_camera_id, x_location_zone, start_time)
+        # X-Detections-Format: columnar | columnar-b64 ile kompakt detection_objects
+        return with_detection_format(result, negotiate(x_detections_format))
+    except AdmissionRejected as e:
+        return e.response()
     except Exception as e:
         print(f"❌ Analiz hatası: {e}")
         import traceback
         traceback.print_exc()
         return JSONResponse({"success": False, "error": str(e)}, status_code=500)
 
+@app.websocket("/esp32/stream")
+async def esp32_stream(websocket: WebSocket):
+    """
+    ESP32 sürekli kare akışı: ws://host:8000/esp32/stream?camera_id=5&zone=Giris
+    Binary JPEG kareler gönderilir, her kare için kısa JSON sonuç döner.
+    """
+    camera_id, location_zone = stream_params(websocket, "1", "Unknown")
+    if not startup.ready:
+        # 1013: tekrar dene (servis henüz hazır değil)
+        await websocket.close(code=1013)
+        return
+    await serve_frame_stream(websocket, admission.guard(analyze_frame), camera_id, location_zone)
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 CityV AI Standalone Server başlatılıyor...")
     print("📡 ESP32 endpoint: POST /esp32/analyze")
+    print("📡 ESP32 stream: WS /esp32/stream")
     print("🗄️ Database integration: ACTIVE" if DATABASE_URL else "⚠️ Database integration: DISABLED")
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,154 @@
+"""
+⚡ Dinamik mikro-batch çıkarım zamanlayıcısı
+Kısa bir pencere içinde gelen kareleri tek bir model çağrısında toplar,
+sonra her isteğe kendi sonucunu geri verir. Farklı giriş boyutu (imgsz) isteyen
+kareler aynı pencerede toplanır ama boyut başına ayrı çağrıda işlenir.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class BatchInfo:
+    """Bir karenin içinde işlendiği batch hakkında zamanlama bilgisi"""
+    size: int
+    max_size: int
+    wait_ms: float
+    max_wait_ms: float
+    inference_ms: float
+
+    def as_dict(self):
+        return {
+            "size": self.size,
+            "max_size": self.max_size,
+            "wait_ms": round(self.wait_ms, 2),
+            "max_wait_ms": self.max_wait_ms,
+            "inference_ms": round(self.inference_ms, 2),
+        }
+
+
+class InferenceBatcher:
+    """
+    Gelen kareleri kuyrukta toplar ve `infer_batch(images, imgsz) -> results` ile
+    toplu çalıştırır. İlk kare en fazla `max_wait_ms` bekler; batch dolarsa
+    beklemeden çalıştırılır. Batch boyutu görüntü sayısıdır (parçalı kareler dahil).
+    """
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10.0, executor=None):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.executor = executor
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Kuyrukta kalan istekleri boşta bırakma
+        while not self._queue.empty():
+            _, _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher durduruldu"))
+
+    def queue_depth(self):
+        """Model çağrısını bekleyen istek sayısı"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, image, imgsz=None, camera_id=None):
+        """Kareyi kuyruğa ekle, (sonuç, BatchInfo) dönene kadar bekle"""
+        results, info = await self.submit_many([image], imgsz)
+        return results[0], info
+
+    async def submit_many(self, images, imgsz=None, camera_id=None):
+        """
+        Bir karenin birden fazla görüntüsünü (ör. parçalar) aynı model çağrısına ekle;
+        ([sonuç, ...], BatchInfo) döner. camera_id kullanılmaz (ShardedInference ile aynı arayüz).
+        """
+        if self._worker is None:
+            raise RuntimeError("Inference batcher başlatılmadı")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(images), imgsz, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        first = await self._queue.get()
+        batch = [first]
+        size = len(first[0])
+
+        # Halihazırda bekleyen kareleri hemen al
+        while size < self.max_batch_size and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+
+        # Pencere dolana kadar (ilk karenin gelişinden itibaren) yeni kare bekle
+        deadline = first[3] + self.max_wait_ms / 1000.0
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            # İptal edilmiş istekleri modele gönderme
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+
+            # Aynı giriş boyutundakiler tek çağrıda
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for imgsz, group in groups.items():
+                images = [image for item in group for image in item[0]]
+                started = time.perf_counter()
+                try:
+                    results = await loop.run_in_executor(self.executor, self.infer_batch, images, imgsz)
+                except Exception as e:
+                    for _, _, future, _ in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                inference_ms = (time.perf_counter() - started) * 1000
+                offset = 0
+                for item_images, _, future, enqueued in group:
+                    item_results = results[offset:offset + len(item_images)]
+                    offset += len(item_images)
+                    if future.done():
+                        continue
+                    future.set_result((item_results, BatchInfo(
+                        size=len(images),
+                        max_size=self.max_batch_size,
+                        wait_ms=(started - enqueued) * 1000,
+                        max_wait_ms=self.max_wait_ms,
+                        inference_ms=inference_ms,
+                    )))
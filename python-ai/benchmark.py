@@ -0,0 +1,371 @@
+"""
+⏱️ Sunucusuz, aşama bazlı benchmark
+Her pipeline aşaması sentetik sahnelerle (synthetic_scenes.py) ayrı ayrı ölçülür;
+çalışan servis, internet veya kamera gerekmez. Sonuç JSON'a yazılır ve iki çalıştırma
+`compare` ile karşılaştırılır (deploy öncesi regresyon kontrolü).
+
+Aşamalar (çözünürlük başına p50/p95/p99 ve saniyedeki işlem):
+- decode: JPEG -> BGR (image_io.decode_image)
+- detect:<backend>: registry.detect (kurulu olmayan backend atlanır); kişi sayısı hatası da raporlanır
+- nms: aday kutularda non_max_suppression
+- density: alan ve kişi bazlı yoğunluk sınıflandırması
+- heatmap:<servis>: servisin heatmap render fonksiyonu, heatmap_encode: JPEG encode
+- db_insert / db_copy: --dsn verilirse geçici tabloya INSERT ... RETURNING ve toplu COPY
+
+    python benchmark.py run --resolutions QVGA,VGA,UXGA --backends haar_fullbody,yolo_onnx --output bench.json
+    python benchmark.py run --dsn postgresql://postgres@localhost/postgres --output bench.json
+    python benchmark.py compare onceki.json bench.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from density import area_density, classify_area_density, classify_person_density, person_density
+from image_io import decode_image
+from nms import non_max_suppression
+from synthetic_scenes import RESOLUTIONS, scene_set
+
+DEFAULT_RESOLUTIONS = "QVGA,VGA,SVGA,XGA,SXGA,UXGA"
+DEFAULT_COUNTS = "0,3,10,25"
+DEFAULT_BACKENDS = "haar_fullbody,haar_upperbody,yolo,yolo_onnx"
+DEFAULT_HEATMAPS = "ai_service,ai_service_simple,ai_standalone"
+
+# Servis -> (heatmap fonksiyonu, tespit biçimi)
+HEATMAP_RENDERERS = {
+    "ai_service": ("render_heatmap", "dict"),
+    "ai_service_simple": ("render_heatmap", "dict"),
+    "ai_standalone": ("generate_heatmap", "xywh"),
+}
+
+# iot_ai_analysis ile aynı kolonlar ve indeksler; oturum sonunda silinir
+BENCH_TABLE_SQL = """
+    CREATE TEMP TABLE iot_ai_analysis (
+        id SERIAL PRIMARY KEY,
+        camera_id INTEGER NOT NULL,
+        location_zone VARCHAR(100),
+        person_count INTEGER DEFAULT 0,
+        crowd_density FLOAT DEFAULT 0.0,
+        detection_objects JSONB,
+        heatmap_url TEXT,
+        image_size INTEGER,
+        processing_time_ms INTEGER,
+        created_at TIMESTAMP DEFAULT NOW(),
+        source VARCHAR(32)
+    );
+    CREATE INDEX ON iot_ai_analysis (camera_id);
+    CREATE INDEX ON iot_ai_analysis (location_zone);
+    CREATE INDEX ON iot_ai_analysis (created_at);
+"""
+
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    mean = float(samples.mean())
+    return {
+        "n": int(len(samples)),
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "throughput_per_s": round(1000.0 / mean, 2) if mean > 0 else None,
+    }
+
+
+def measure(func, inputs, iterations, warmup=2):
+    """inputs üzerinde dönerek func(input) süresini ölç (ms listesi)"""
+    for i in range(min(warmup, len(inputs))):
+        func(inputs[i])
+    samples = []
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        started = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def as_detections(boxes, scores=None):
+    """[x1, y1, x2, y2] kutularını servislerin tespit sözlüklerine çevir"""
+    detections = []
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        detections.append({
+            "type": "person",
+            "confidence": float(scores[i]) if scores is not None else 0.9,
+            "bbox": [int(x1), int(y1), int(x2), int(y2)],
+            "center": [int((x1 + x2) / 2), int((y1 + y2) / 2)],
+            "area": int((x2 - x1) * (y2 - y1)),
+        })
+    return detections
+
+
+def nms_candidates(scene, seed):
+    """Her gerçek kutu için 3 kaydırılmış aday (tespit çıktısına benzer), xywh + skor"""
+    rng = np.random.default_rng([seed, scene["width"], scene["person_count"], scene["index"]])
+    boxes = []
+    for x1, y1, x2, y2 in scene["boxes"]:
+        w, h = x2 - x1, y2 - y1
+        for _ in range(3):
+            jitter = rng.normal(0, 0.05, 4) * [w, h, w, h]
+            boxes.append([x1 + jitter[0], y1 + jitter[1], w + jitter[2], h + jitter[3]])
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return boxes, rng.uniform(0.4, 0.95, len(boxes)).astype(np.float32)
+
+
+class Benchmark:
+    def __init__(self, scenes, iterations, seed):
+        self.iterations = iterations
+        self.seed = seed
+        self.by_resolution = {}
+        for scene in scenes:
+            self.by_resolution.setdefault(scene["resolution"], []).append(scene)
+        self.results = []
+        self.skipped = {}
+
+    def add(self, stage, resolution, samples, **extra):
+        row = {"stage": stage, "resolution": resolution, **summarize(samples), **extra}
+        self.results.append(row)
+        print(f"   {stage:<28} {resolution:<5} p50 {row['p50_ms']:>9.3f}ms  p95 {row['p95_ms']:>9.3f}ms  "
+              f"p99 {row['p99_ms']:>9.3f}ms  {row['throughput_per_s'] or 0:>9.1f}/s")
+
+    def run_decode(self, max_side=0):
+        stage = "decode" if not max_side else f"decode@{max_side}"
+        for resolution, scenes in self.by_resolution.items():
+            jpegs = [scene["jpeg"] for scene in scenes]
+            self.add(stage, resolution, measure(lambda data: decode_image(data, max_side), jpegs, self.iterations),
+                     jpeg_kb=round(float(np.mean([len(j) for j in jpegs])) / 1024, 1))
+
+    def run_detect(self, backends):
+        from detectors import registry
+
+        for backend in backends:
+            try:
+                registry.warm_up_local([backend])
+            except Exception as e:
+                self.skipped[f"detect:{backend}"] = f"{type(e).__name__}: {e}"
+                print(f"   ⏭️ detect:{backend} atlandı ({type(e).__name__}: {e})")
+                continue
+            for resolution, scenes in self.by_resolution.items():
+                inputs = [(s["image"], cv2.cvtColor(s["image"], cv2.COLOR_BGR2GRAY)) for s in scenes]
+                samples = measure(lambda item: registry.detect(backend, item[0], item[1]), inputs,
+                                  max(len(inputs), self.iterations // 4))
+                # Tespit edilen / bilinen kişi sayısı (NMS öncesi ham backend çıktısı)
+                errors = [abs(len(registry.detect(backend, image, gray)[0]) - s["person_count"])
+                          for (image, gray), s in zip(inputs, scenes)]
+                self.add(f"detect:{backend}", resolution, samples,
+                         mean_abs_count_error=round(float(np.mean(errors)), 2))
+
+    def run_nms(self):
+        for resolution, scenes in self.by_resolution.items():
+            inputs = [nms_candidates(scene, self.seed) for scene in scenes]
+            self.add("nms", resolution, measure(lambda item: non_max_suppression(*item), inputs, self.iterations),
+                     mean_candidates=round(float(np.mean([len(b) for b, _ in inputs])), 1))
+
+    def run_density(self):
+        def classify(scene):
+            detections = scene["detections"]
+            classify_area_density(area_density(detections, scene["width"], scene["height"]))
+            classify_person_density(person_density(len(detections), scene["width"], scene["height"]))
+
+        for resolution, scenes in self.by_resolution.items():
+            inputs = [{**scene, "detections": as_detections(scene["boxes"])} for scene in scenes]
+            self.add("density", resolution, measure(classify, inputs, self.iterations))
+
+    def run_heatmap(self, services):
+        for service in services:
+            function_name, kind = HEATMAP_RENDERERS[service]
+            try:
+                render = getattr(importlib.import_module(service), function_name)
+            except Exception as e:
+                self.skipped[f"heatmap:{service}"] = f"{type(e).__name__}: {e}"
+                print(f"   ⏭️ heatmap:{service} atlandı ({type(e).__name__}: {e})")
+                continue
+            for resolution, scenes in self.by_resolution.items():
+                inputs = []
+                for scene in scenes:
+                    if not scene["boxes"]:
+                        continue
+                    if kind == "dict":
+                        detections = as_detections(scene["boxes"])
+                    else:
+                        detections = [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in scene["boxes"]]
+                    inputs.append((scene["image"], detections))
+                if inputs:
+                    self.add(f"heatmap:{service}", resolution,
+                             measure(lambda item: render(*item), inputs, self.iterations))
+
+    def run_heatmap_encode(self):
+        for resolution, scenes in self.by_resolution.items():
+            images = [scene["image"] for scene in scenes]
+            self.add("heatmap_encode", resolution, measure(lambda image: cv2.imencode(".jpg", image), images,
+                                                           self.iterations))
+
+    async def run_db(self, dsn, rows, copy_batch):
+        import asyncpg
+        from ai_standalone import ANALYSIS_COLUMNS, INSERT_ANALYSIS_SQL
+
+        scenes = [scene for group in self.by_resolution.values() for scene in group]
+        records = []
+        for i in range(rows):
+            scene = scenes[i % len(scenes)]
+            detections = as_detections(scene["boxes"])
+            records.append((
+                1 + i % 8, "Benchmark", scene["person_count"],
+                person_density(scene["person_count"], scene["width"], scene["height"]),
+                json.dumps(detections), None, len(scene["jpeg"]), 50,
+                *(("benchmark",) if "source" in ANALYSIS_COLUMNS else ()),
+            ))
+
+        conn = await asyncpg.connect(dsn)
+        try:
+            await conn.execute(BENCH_TABLE_SQL)
+            insert = []
+            for record in records:
+                started = time.perf_counter()
+                await conn.fetchrow(INSERT_ANALYSIS_SQL, *record)
+                insert.append((time.perf_counter() - started) * 1000)
+            self.add("db_insert", "-", insert, rows_per_call=1)
+
+            copy = []
+            for start in range(0, len(records), copy_batch):
+                batch = records[start:start + copy_batch]
+                started = time.perf_counter()
+                await conn.copy_records_to_table("iot_ai_analysis", records=batch, columns=ANALYSIS_COLUMNS)
+                copy.append((time.perf_counter() - started) * 1000)
+            row = summarize(copy)
+            self.add("db_copy", "-", copy, rows_per_call=copy_batch,
+                     rows_per_s=round(copy_batch * 1000.0 / row["mean_ms"], 1))
+        finally:
+            await conn.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    resolutions = [r for r in args.resolutions.split(",") if r]
+    counts = [int(c) for c in args.counts.split(",") if c]
+    started = time.perf_counter()
+    print(f"🧍 Sahneler üretiliyor: {', '.join(resolutions)} x {counts} kişi x {args.per_combination}")
+    scenes = scene_set(resolutions, counts, args.per_combination, args.seed)
+    bench = Benchmark(scenes, args.iterations, args.seed)
+
+    stages = set(args.stages.split(","))
+    print("⏱️ Aşamalar")
+    if "decode" in stages:
+        bench.run_decode()
+        if args.decode_max_side:
+            bench.run_decode(args.decode_max_side)
+    if "detect" in stages:
+        bench.run_detect([b for b in args.backends.split(",") if b])
+    if "nms" in stages:
+        bench.run_nms()
+    if "density" in stages:
+        bench.run_density()
+    if "heatmap" in stages:
+        bench.run_heatmap([s for s in args.heatmaps.split(",") if s])
+        bench.run_heatmap_encode()
+    if "db" in stages:
+        if args.dsn:
+            asyncio.run(bench.run_db(args.dsn, args.db_rows, args.db_copy_batch))
+        else:
+            bench.skipped["db"] = "--dsn verilmedi"
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "resolutions": {name: RESOLUTIONS[name] for name in resolutions},
+            "person_counts": counts,
+            "per_combination": args.per_combination,
+            "duration_s": round(time.perf_counter() - started, 1),
+        },
+        "skipped": bench.skipped,
+        "results": bench.results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(bench.results)} ölçüm: {args.output} ({report['meta']['duration_s']}s)")
+
+
+def compare(args):
+    """Aynı (aşama, çözünürlük) satırlarını karşılaştır; eşiği aşan yavaşlamada çıkış kodu 1"""
+    with open(args.baseline) as f:
+        baseline = {(r["stage"], r["resolution"]): r for r in json.load(f)["results"]}
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'aşama':<28} {'çöz.':<5} {'önce':>10} {'sonra':>10} {'fark':>8}  ({args.metric})")
+    for row in current:
+        before = baseline.get((row["stage"], row["resolution"]))
+        if before is None or not before[args.metric]:
+            continue
+        ratio = row[args.metric] / before[args.metric] - 1
+        mark = ""
+        if ratio > args.threshold:
+            mark = " ❌"
+            regressions += 1
+        elif ratio < -args.threshold:
+            mark = " ✅"
+        print(f"{row['stage']:<28} {row['resolution']:<5} {before[args.metric]:>10.3f} {row[args.metric]:>10.3f} "
+              f"{ratio:>+7.1%}{mark}")
+    if regressions:
+        print(f"❌ {regressions} aşama %{args.threshold * 100:.0f} eşiğinden fazla yavaşladı")
+    else:
+        print("✅ Regresyon yok")
+    return regressions == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CityV AI aşama bazlı benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Aşamaları ölç ve JSON'a yaz")
+    run_parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help=f"({', '.join(RESOLUTIONS)})")
+    run_parser.add_argument("--counts", default=DEFAULT_COUNTS, help="Sahne başına kişi sayıları")
+    run_parser.add_argument("--per-combination", type=int, default=3)
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--stages", default="decode,detect,nms,density,heatmap,db")
+    run_parser.add_argument("--backends", default=DEFAULT_BACKENDS)
+    run_parser.add_argument("--heatmaps", default=DEFAULT_HEATMAPS)
+    run_parser.add_argument("--decode-max-side", type=int, default=640, help="Küçültülmüş decode ölçümü (0 = yok)")
+    run_parser.add_argument("--dsn", help="Yerel Postgres (geçici tablo kullanılır, veri kalmaz)")
+    run_parser.add_argument("--db-rows", type=int, default=2000)
+    run_parser.add_argument("--db-copy-batch", type=int, default=500)
+    run_parser.add_argument("--output", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    compare_parser = commands.add_parser("compare", help="İki benchmark JSON'unu karşılaştır")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--metric", default="p50_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="İzin verilen yavaşlama oranı")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(0 if compare(args) else 1)
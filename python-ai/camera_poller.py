@@ -0,0 +1,255 @@
+"""
+📷 Pull modunda kamera yoklayıcı
+Kameralar kare göndermek yerine sunucu kareyi kendisi çeker:
+- `capture` modu: hedef hızda `GET /capture` (tek JPEG)
+- `mjpeg` modu: `GET /stream` (multipart/x-mixed-replace) bağlantısı açık tutulur
+
+Her kamera için bir okuyucu ve bir analiz görevi çalışır. Okuyucu en son kareyi tek
+elemanlı slota yazar (eskisi düşer); analiz görevi hedef hızda en son kareyi alır.
+Kuyruk yoktur. Toplam eşzamanlı analiz sayısı CAMERA_POLL_MAX_INFLIGHT ile sınırlanır,
+böylece yük kamera zamanlayıcılarına değil CPU bütçesine göre belirlenir.
+
+CAMERA_POLL_TARGETS örneği:
+    [{"camera_id": "5", "zone": "Giris", "url": "http://192.168.1.50/capture", "fps": 1},
+     {"camera_id": "6", "zone": "Salon", "url": "http://192.168.1.51/stream", "mode": "mjpeg", "fps": 2}]
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+
+import httpx
+
+from frame_stream import STREAM_MAX_FRAME_BYTES, LatestFrameSlot
+
+CAMERA_POLL_MAX_INFLIGHT = int(os.getenv("CAMERA_POLL_MAX_INFLIGHT", "2"))
+CAMERA_POLL_TIMEOUT = float(os.getenv("CAMERA_POLL_TIMEOUT", "5"))
+CAMERA_POLL_DEFAULT_FPS = float(os.getenv("CAMERA_POLL_DEFAULT_FPS", "1"))
+# Bağlantı hatasında yeniden deneme bekleme süresi (üstel, bu değere kadar)
+CAMERA_POLL_MAX_BACKOFF = float(os.getenv("CAMERA_POLL_MAX_BACKOFF", "30"))
+
+_CONTENT_LENGTH = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+
+
+def load_targets(raw=None):
+    """CAMERA_POLL_TARGETS JSON'unu kamera listesine çevir"""
+    raw = os.getenv("CAMERA_POLL_TARGETS", "") if raw is None else raw
+    if not raw.strip():
+        return []
+    try:
+        items = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"CAMERA_POLL_TARGETS geçerli JSON değil: {e}")
+
+    targets = []
+    for item in items:
+        mode = item.get("mode", "capture")
+        if mode not in ("capture", "mjpeg"):
+            raise ValueError(f"Bilinmeyen poll modu: {mode} (capture | mjpeg)")
+        targets.append({
+            "camera_id": str(item["camera_id"]),
+            "zone": item.get("zone", "Unknown"),
+            "url": item["url"],
+            "mode": mode,
+            "fps": float(item.get("fps", CAMERA_POLL_DEFAULT_FPS)),
+        })
+    return targets
+
+
+class MjpegParser:
+    """
+    multipart/x-mixed-replace akışından JPEG kareleri çıkarır.
+    Parça başlığında Content-Length varsa onu kullanır, yoksa SOI/EOI işaretlerini arar.
+    """
+
+    def __init__(self, max_frame_bytes=STREAM_MAX_FRAME_BYTES):
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        """Yeni baytları ekle, tamamlanan kareleri döndür"""
+        self._buffer.extend(chunk)
+        frames = []
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+        if len(self._buffer) > 2 * self.max_frame_bytes:
+            # Bozuk akış; tamponu sıfırla ve bir sonraki kareden devam et
+            self._buffer.clear()
+        return frames
+
+    def _next_frame(self):
+        buffer = self._buffer
+        soi = buffer.find(b"\xff\xd8")
+        if soi < 0:
+            return None
+
+        header = bytes(buffer[max(0, soi - 256):soi])
+        match = None
+        for match in _CONTENT_LENGTH.finditer(header):
+            pass
+        if match is not None:
+            length = int(match.group(1))
+            if len(buffer) - soi < length:
+                return None
+            frame = bytes(buffer[soi:soi + length])
+            del buffer[:soi + length]
+            return frame
+
+        eoi = buffer.find(b"\xff\xd9", soi + 2)
+        if eoi < 0:
+            return None
+        frame = bytes(buffer[soi:eoi + 2])
+        del buffer[:eoi + 2]
+        return frame
+
+
+class CameraState:
+    def __init__(self, target):
+        self.target = target
+        self.slot = None
+        self.fetched = 0
+        self.analyzed = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_result = None
+        self.last_analysis_ms = None
+        self.connected = False
+
+    def stats(self):
+        return {
+            **self.target,
+            "connected": self.connected,
+            "fetched": self.fetched,
+            "analyzed": self.analyzed,
+            "dropped": self.slot.dropped if self.slot else 0,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_analysis_ms": self.last_analysis_ms,
+            "last_person_count": (self.last_result or {}).get("person_count"),
+        }
+
+
+class CameraPoller:
+    """
+    analyze(contents, camera_id, location_zone) -> yanıt sözlüğü
+    HTTP uçlarıyla aynı analiz fonksiyonu kullanılır.
+    """
+
+    def __init__(self, analyze, targets, max_inflight=CAMERA_POLL_MAX_INFLIGHT, timeout=CAMERA_POLL_TIMEOUT):
+        self.analyze = analyze
+        self.cameras = [CameraState(target) for target in targets]
+        self.max_inflight = max_inflight
+        self.timeout = timeout
+        self._client = None
+        self._inflight = None
+        self._tasks = []
+
+    async def start(self):
+        if not self.cameras or self._tasks:
+            return
+        # Kameralar arasında paylaşılan, keep-alive bağlantı havuzlu tek istemci
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, read=None),
+            limits=httpx.Limits(max_connections=len(self.cameras) * 2,
+                                max_keepalive_connections=len(self.cameras)),
+        )
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        for camera in self.cameras:
+            camera.slot = LatestFrameSlot()
+            reader = self._read_mjpeg if camera.target["mode"] == "mjpeg" else self._read_capture
+            self._tasks.append(asyncio.create_task(reader(camera)))
+            self._tasks.append(asyncio.create_task(self._analyze_loop(camera)))
+        print(f"📷 Kamera yoklayıcı başladı: {len(self.cameras)} kamera, en fazla {self.max_inflight} eşzamanlı analiz")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _failed(camera, error, disconnected=True):
+        camera.errors += 1
+        camera.last_error = str(error) or type(error).__name__
+        if disconnected:
+            camera.connected = False
+
+    async def _read_capture(self, camera):
+        """Hedef hızda tek kare çek; analiz yetişemezse slot eskisini düşürür"""
+        interval = 1.0 / camera.target["fps"]
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                response = await self._client.get(camera.target["url"], timeout=self.timeout)
+                response.raise_for_status()
+                camera.connected = True
+                camera.fetched += 1
+                camera.slot.put(response.content)
+                backoff = 1.0
+            except (httpx.HTTPError, OSError) as e:
+                self._failed(camera, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, CAMERA_POLL_MAX_BACKOFF)
+                continue
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def _read_mjpeg(self, camera):
+        """MJPEG akışını açık tut; her tamamlanan kare slottaki eskisinin yerine geçer"""
+        backoff = 1.0
+        while True:
+            parser = MjpegParser()
+            try:
+                async with self._client.stream("GET", camera.target["url"]) as response:
+                    response.raise_for_status()
+                    camera.connected = True
+                    backoff = 1.0
+                    async for chunk in response.aiter_bytes():
+                        for frame in parser.feed(chunk):
+                            camera.fetched += 1
+                            camera.slot.put(frame)
+                # Kamera akışı kapattı; yeniden bağlan
+                camera.connected = False
+            except (httpx.HTTPError, OSError) as e:
+                self._failed(camera, e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, CAMERA_POLL_MAX_BACKOFF)
+
+    async def _analyze_loop(self, camera):
+        """En son kareyi hedef hızda analiz et (kuyruk yok, eski kareler düşer)"""
+        interval = 1.0 / camera.target["fps"]
+        camera_id = camera.target["camera_id"]
+        zone = camera.target["zone"]
+        while True:
+            frame = await camera.slot.take()
+            if frame is None:
+                return
+            started = time.monotonic()
+            try:
+                async with self._inflight:
+                    result = await self.analyze(frame, camera_id, zone)
+                if isinstance(result, dict):
+                    camera.last_result = result.get("analysis")
+                camera.analyzed += 1
+            except Exception as e:
+                self._failed(camera, e, disconnected=False)
+            camera.last_analysis_ms = int((time.monotonic() - started) * 1000)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def stats(self):
+        return {
+            "cameras": [camera.stats() for camera in self.cameras],
+            "max_inflight": self.max_inflight,
+        }
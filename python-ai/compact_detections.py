@@ -0,0 +1,123 @@
+"""
+🗜️ detection_objects için sütunlu (columnar) kompakt format
+Kişi başına sözlük yerine paralel diziler: int16 kutular [x1, y1, x2, y2, ...],
+uint8 güven (0-255) ve varsa track_id'ler. center ve area okurken hesaplanır.
+
+Formatlar:
+- "full": mevcut sözlük listesi (varsayılan)
+- "columnar": {"format": "columnar-v1", "n": 2, "boxes": [...], "conf": [...], "track_ids": [...]}
+- "columnar-b64": aynı diziler little-endian binary paketlenip base64'lenir:
+  {"format": "columnar-v1-b64", "n": 2, "tracks": true, "data": "..."}
+  data = boxes (n*4 int16) + conf (n uint8) + track_ids (n int32, iz yoksa -1; tracks=true ise)
+
+HTTP yanıtında `X-Detections-Format` header'ı ile, DB'de DB_DETECTIONS_FORMAT ile seçilir.
+Dashboard tarafında lib/detections.ts her iki biçimi de aynı nesnelere çevirir.
+"""
+
+import base64
+
+import numpy as np
+
+DETECTION_FORMATS = ("full", "columnar", "columnar-b64")
+COLUMNAR = "columnar-v1"
+COLUMNAR_B64 = "columnar-v1-b64"
+
+INT16_MAX = np.iinfo(np.int16).max
+
+
+def negotiate(value):
+    """X-Detections-Format header'ı -> format adı (tanınmayan değer "full")"""
+    value = (value or "").strip().lower()
+    return value if value in DETECTION_FORMATS else "full"
+
+
+def _box(det):
+    """İki tespit biçiminden [x1, y1, x2, y2]: bbox (ai_service) veya x/y/width/height (ai_standalone)"""
+    if "bbox" in det:
+        return det["bbox"]
+    return [det["x"], det["y"], det["x"] + det["width"], det["y"] + det["height"]]
+
+
+def _columns(detections):
+    boxes = np.clip(np.asarray([_box(det) for det in detections], dtype=np.int64).reshape(-1, 4), 0, INT16_MAX)
+    conf = np.clip(np.rint(np.asarray([det.get("confidence", 0) for det in detections], dtype=np.float64) * 255), 0, 255)
+    track_ids = [det.get("track_id") for det in detections]
+    tracks = any(track_id is not None for track_id in track_ids)
+    return boxes.astype(np.int16), conf.astype(np.uint8), track_ids if tracks else None
+
+
+def encode_detections(detections, fmt):
+    """Tespit listesini seçilen formata çevir ("full" ise olduğu gibi döner)"""
+    if fmt == "full":
+        return detections
+    boxes, conf, track_ids = _columns(detections)
+    if fmt == "columnar":
+        encoded = {"format": COLUMNAR, "n": len(conf), "boxes": boxes.ravel().tolist(), "conf": conf.tolist()}
+        if track_ids is not None:
+            encoded["track_ids"] = track_ids
+        return encoded
+    if fmt == "columnar-b64":
+        data = boxes.astype("<i2").tobytes() + conf.tobytes()
+        if track_ids is not None:
+            data += np.asarray([-1 if t is None else t for t in track_ids], dtype="<i4").tobytes()
+        return {
+            "format": COLUMNAR_B64,
+            "n": len(conf),
+            "tracks": track_ids is not None,
+            "data": base64.b64encode(data).decode("ascii"),
+        }
+    raise ValueError(f"Bilinmeyen detection formatı: {fmt} ({', '.join(DETECTION_FORMATS)})")
+
+
+def decode_detections(value):
+    """
+    Kompakt değeri [{label, confidence, bbox, center, area, track_id}, ...] listesine çevir.
+    Sözlük listesi (full) olduğu gibi döner.
+    """
+    if not isinstance(value, dict):
+        return value
+    n = value["n"]
+    if value["format"] == COLUMNAR:
+        boxes = np.asarray(value["boxes"], dtype=np.int64).reshape(-1, 4)
+        conf = np.asarray(value["conf"], dtype=np.uint8)
+        track_ids = value.get("track_ids")
+    elif value["format"] == COLUMNAR_B64:
+        data = base64.b64decode(value["data"])
+        boxes = np.frombuffer(data, dtype="<i2", count=n * 4).reshape(-1, 4).astype(np.int64)
+        conf = np.frombuffer(data, dtype=np.uint8, count=n, offset=n * 8)
+        track_ids = None
+        if value.get("tracks"):
+            raw = np.frombuffer(data, dtype="<i4", count=n, offset=n * 9).tolist()
+            track_ids = [None if t < 0 else t for t in raw]
+    else:
+        raise ValueError(f"Bilinmeyen detection formatı: {value['format']}")
+
+    detections = []
+    for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+        detections.append({
+            "label": "person",
+            "confidence": round(int(conf[i]) / 255, 3),
+            "bbox": [x1, y1, x2, y2],
+            "center": [(x1 + x2) // 2, (y1 + y2) // 2],
+            "area": (x2 - x1) * (y2 - y1),
+            "track_id": track_ids[i] if track_ids is not None else None,
+        })
+    return detections
+
+
+def with_detection_format(result, fmt):
+    """
+    Endpoint yanıtındaki analysis.detection_objects'i formata çevir.
+    Analiz sözlüğü kopyalanır (hareket kapısında saklanan sonuç tam biçimde kalır).
+    """
+    if fmt == "full" or not isinstance(result, dict) or "analysis" not in result:
+        return result
+    analysis = result["analysis"]
+    return {
+        **result,
+        "analysis": {
+            **analysis,
+            "detection_objects": encode_detections(analysis["detection_objects"], fmt),
+            "detections_format": fmt,
+        },
+    }
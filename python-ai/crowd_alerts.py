@@ -0,0 +1,333 @@
+"""
+🚨 Kare akışı içinde yoğunluk uyarıları (iot_crowd_alerts)
+Her analiz edilen kare kamera kurallarıyla değerlendirilir; eşik aşıldığı karede
+uyarı açılır, değer eşiğin `clear_ratio` katının altına inince kapanır (histerezis).
+Kapanan uyarı `cooldown_s` dolmadan tekrar açılmaz. Açılan/kapanan uyarılar
+bellekte toplanır ve tek transaction içinde toplu yazılır; dışarıdan sorgu gerekmez.
+Açık uyarılar bellekte tutulduğu için servis başlarken DB'deki açık uyarılar motora
+geri yüklenir (kuralı artık kapalı olanlar kapatılır); yeniden başlatma sonrası
+kapanmayan veya aynı uyarının ikinci kez açılması beklenen kayıt kalmaz.
+
+Kural tipleri (0 = kapalı):
+- max_density_score -> high_density      (density_score 1-3)
+- max_person_count  -> safety_threshold  (kişi sayısı)
+- max_rise          -> unusual_crowd     (rise_window_s içinde kişi artışı)
+
+CROWD_ALERT_RULES örneği ("default" tüm kameralar, diğer anahtarlar camera_id):
+    {"default": {"max_density_score": 3}, "5": {"max_person_count": 40, "max_rise": 15}}
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Varsayılan kapalı: iot_crowd_alerts'e yazar, CROWD_ALERTS=on ile açılır
+CROWD_ALERTS_ENABLED = os.getenv("CROWD_ALERTS", "off") == "on"
+CROWD_ALERT_FLUSH_INTERVAL = float(os.getenv("CROWD_ALERT_FLUSH_INTERVAL", "2"))
+# Database erişilemezken tutulacak en fazla olay; aşılırsa en eski düşer
+CROWD_ALERT_BUFFER_MAX = int(os.getenv("CROWD_ALERT_BUFFER_MAX", "5000"))
+
+DEFAULT_RULE = {
+    "max_density_score": 3,
+    "max_person_count": 0,
+    "max_rise": 0,
+    "rise_window_s": 60,
+    "clear_ratio": 0.8,
+    "cooldown_s": 300,
+}
+
+# (kural anahtarı, ölçülen değer, alert_type, mesaj)
+RULE_TYPES = (
+    ("max_density_score", "density_score", "high_density", "Yüksek yoğunluk"),
+    ("max_person_count", "person_count", "safety_threshold", "Kişi sayısı güvenlik eşiğini aştı"),
+    ("max_rise", "person_rise", "unusual_crowd", "Ani kalabalık artışı"),
+)
+
+INSERT_ALERT_SQL = """
+    INSERT INTO iot_crowd_alerts
+    (camera_id, location_zone, alert_type, person_count, crowd_density, alert_message, created_at)
+    SELECT $1::INTEGER, $2::VARCHAR, $3::VARCHAR, $4::INTEGER, $5::FLOAT, $6::TEXT, $7::TIMESTAMP
+    WHERE NOT EXISTS (
+        SELECT 1 FROM iot_crowd_alerts
+        WHERE camera_id = $1 AND alert_type = $3 AND is_resolved = FALSE
+    )
+"""
+
+RESOLVE_ALERT_SQL = """
+    UPDATE iot_crowd_alerts SET is_resolved = TRUE, resolved_at = $3
+    WHERE camera_id = $1 AND alert_type = $2 AND is_resolved = FALSE
+"""
+
+OPEN_ALERTS_SQL = """
+    SELECT camera_id, alert_type, created_at FROM iot_crowd_alerts WHERE is_resolved = FALSE
+"""
+
+
+def load_alert_rules(raw=None):
+    """CROWD_ALERT_RULES JSON'unu {camera_id | "default": kural} sözlüğüne çevir"""
+    raw = os.getenv("CROWD_ALERT_RULES", "") if raw is None else raw
+    config = {}
+    if raw.strip():
+        try:
+            config = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"CROWD_ALERT_RULES geçerli JSON değil: {e}")
+
+    default = {**DEFAULT_RULE, **config.pop("default", {})}
+    rules = {"default": default}
+    for camera_id, rule in config.items():
+        unknown = set(rule) - set(DEFAULT_RULE)
+        if unknown:
+            raise ValueError(f"CROWD_ALERT_RULES[{camera_id}]: bilinmeyen alan {sorted(unknown)}")
+        rules[str(camera_id)] = {**default, **rule}
+    return rules
+
+
+class _CameraAlerts:
+    __slots__ = ("active", "resolved_at", "history")
+
+    def __init__(self):
+        self.active = {}
+        self.resolved_at = {}
+        self.history = deque()
+
+
+class CrowdAlertEngine:
+    """Kamera başına açık uyarılar ve kural değerlendirmesi"""
+
+    def __init__(self, rules=None):
+        self.rules = load_alert_rules() if rules is None else rules
+        self._cameras = {}
+        self._lock = threading.Lock()
+
+        # Metrikler
+        self.evaluated = 0
+        self.raised = 0
+        self.resolved = 0
+
+    def rule_for(self, camera_id):
+        return self.rules.get(str(camera_id), self.rules["default"])
+
+    def evaluate(self, camera_id, location_zone, person_count, crowd_density, density_score, now=None):
+        """Kareyi kurallarla değerlendir; bu karede açılan/kapanan uyarıları döndür"""
+        now = time.time() if now is None else now
+        camera_id = str(camera_id)
+        rule = self.rule_for(camera_id)
+        events = []
+        with self._lock:
+            self.evaluated += 1
+            state = self._cameras.get(camera_id)
+            if state is None:
+                state = self._cameras[camera_id] = _CameraAlerts()
+
+            # Pencere içindeki en düşük kişi sayısına göre artış (monoton deque, kare başına O(1))
+            history = state.history
+            while history and history[-1][1] >= person_count:
+                history.pop()
+            history.append((now, person_count))
+            while now - history[0][0] > rule["rise_window_s"]:
+                history.popleft()
+            values = {
+                "density_score": density_score,
+                "person_count": person_count,
+                "person_rise": person_count - history[0][1],
+            }
+
+            for rule_key, value_key, alert_type, title in RULE_TYPES:
+                threshold = rule[rule_key]
+                value = values[value_key]
+                if threshold <= 0:
+                    continue
+                if alert_type in state.active:
+                    if value < threshold * rule["clear_ratio"]:
+                        del state.active[alert_type]
+                        state.resolved_at[alert_type] = now
+                        self.resolved += 1
+                        events.append(self._event("resolve", camera_id, location_zone, alert_type,
+                                                  f"Uyarı kapandı: {title} ({value_key}={value})",
+                                                  person_count, crowd_density, now))
+                elif value >= threshold and now - state.resolved_at.get(alert_type, float("-inf")) >= rule["cooldown_s"]:
+                    state.active[alert_type] = now
+                    self.raised += 1
+                    events.append(self._event("raise", camera_id, location_zone, alert_type,
+                                              f"{title}: Camera {camera_id} ({location_zone}) {value_key}={value} ≥ {threshold}",
+                                              person_count, crowd_density, now))
+        return events
+
+    @staticmethod
+    def _event(action, camera_id, location_zone, alert_type, message, person_count, crowd_density, now):
+        return {
+            "action": action,
+            "camera_id": camera_id,
+            "location_zone": location_zone,
+            "alert_type": alert_type,
+            "alert_message": message,
+            "person_count": person_count,
+            "crowd_density": crowd_density,
+            "at": datetime.fromtimestamp(now),
+        }
+
+    def enabled_types(self, camera_id):
+        """Kameranın kuralında açık (eşik > 0) uyarı tipleri"""
+        rule = self.rule_for(camera_id)
+        return {alert_type for rule_key, _, alert_type, _ in RULE_TYPES if rule[rule_key] > 0}
+
+    def restore(self, camera_id, alert_type, opened_at):
+        """DB'de açık kalan uyarıyı aktif say; değer düşünce normal şekilde kapanır"""
+        camera_id = str(camera_id)
+        with self._lock:
+            state = self._cameras.get(camera_id)
+            if state is None:
+                state = self._cameras[camera_id] = _CameraAlerts()
+            state.active[alert_type] = opened_at
+
+    def active(self, camera_id):
+        with self._lock:
+            state = self._cameras.get(str(camera_id))
+            return sorted(state.active) if state else []
+
+    def stats(self):
+        with self._lock:
+            return {
+                "evaluated": self.evaluated,
+                "raised": self.raised,
+                "resolved": self.resolved,
+                "active": {
+                    camera_id: sorted(state.active)
+                    for camera_id, state in self._cameras.items() if state.active
+                },
+                "rules": self.rules,
+            }
+
+
+class AlertWriter:
+    """
+    Uyarı olaylarını sırayla ve toplu yazar. Ardışık aynı tür olaylar tek
+    executemany'de gider; tüm flush tek transaction'dır.
+    """
+
+    def __init__(self, db_pool, flush_interval=CROWD_ALERT_FLUSH_INTERVAL, max_events=CROWD_ALERT_BUFFER_MAX):
+        self.db_pool = db_pool
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._events = deque()
+        self._wakeup = None
+        self._task = None
+        self._stopping = False
+
+        # Metrikler
+        self.written_total = 0
+        self.dropped_total = 0
+        self.flush_errors = 0
+        self.restored = 0
+        self.closed_stale = 0
+
+    def add(self, event):
+        if len(self._events) >= self.max_events:
+            self._events.popleft()
+            self.dropped_total += 1
+        self._events.append(event)
+
+    async def reconcile(self, engine):
+        """
+        Başlangıçta DB'deki açık uyarıları motorla eşitle: kuralı hâlâ açık olanlar
+        motora yüklenir, kuralı kapatılmış (veya tipi bilinmeyen) uyarılar kapatılır.
+        """
+        try:
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(OPEN_ALERTS_SQL)
+                stale = []
+                for row in rows:
+                    if row["alert_type"] in engine.enabled_types(row["camera_id"]):
+                        engine.restore(row["camera_id"], row["alert_type"], row["created_at"].timestamp())
+                        self.restored += 1
+                    else:
+                        stale.append((row["camera_id"], row["alert_type"], datetime.now()))
+                if stale:
+                    await conn.executemany(RESOLVE_ALERT_SQL, stale)
+        except Exception as e:
+            print(f"❌ Açık uyarılar yüklenemedi: {e}")
+            return False
+
+        self.closed_stale += len(stale)
+        if rows:
+            print(f"🚨 Açık uyarılar: {len(rows) - len(stale)} motora yüklendi, {len(stale)} kapatıldı")
+        return True
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+        if self._events and not await self.flush():
+            print(f"⚠️ Kapanışta {len(self._events)} uyarı olayı yazılamadı")
+
+    async def flush(self):
+        if not self._events:
+            return True
+        events = list(self._events)
+        self._events.clear()
+
+        # Sıra korunarak ardışık aynı tür olayları grupla
+        runs = []
+        for event in events:
+            if runs and runs[-1][0] == event["action"]:
+                runs[-1][1].append(event)
+            else:
+                runs.append((event["action"], [event]))
+
+        try:
+            async with self.db_pool.acquire() as conn:
+                async with conn.transaction():
+                    for action, batch in runs:
+                        if action == "raise":
+                            await conn.executemany(INSERT_ALERT_SQL, [
+                                (int(e["camera_id"]), e["location_zone"], e["alert_type"], e["person_count"],
+                                 e["crowd_density"], e["alert_message"], e["at"])
+                                for e in batch
+                            ])
+                        else:
+                            await conn.executemany(RESOLVE_ALERT_SQL, [
+                                (int(e["camera_id"]), e["alert_type"], e["at"]) for e in batch
+                            ])
+        except Exception as e:
+            self._events.extendleft(reversed(events))
+            while len(self._events) > self.max_events:
+                self._events.popleft()
+                self.dropped_total += 1
+            self.flush_errors += 1
+            print(f"❌ Uyarı yazma hatası ({len(events)} olay): {e}")
+            return False
+
+        self.written_total += len(events)
+        return True
+
+    def stats(self):
+        return {
+            "pending": len(self._events),
+            "written_total": self.written_total,
+            "dropped_total": self.dropped_total,
+            "flush_errors": self.flush_errors,
+            "restored": self.restored,
+            "closed_stale": self.closed_stale,
+        }
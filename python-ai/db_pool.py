@@ -0,0 +1,130 @@
+"""
+🗄️ asyncpg bağlantı havuzu
+Uygulama açılışında kurulur, kapanışta kapatılır. Her kare hazır bir bağlantı
+üzerinden tek round trip ile yazılır; havuz doluluğu metrik olarak izlenir.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+# asyncpg her sorguyu bağlantı başına prepare edip önbellekte tutar.
+# Transaction modundaki PgBouncer arkasında 0 yapılmalı.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Açılış başarısız olursa tekrar denemeden önce beklenecek süre (bağlantı fırtınasını önler)
+DB_POOL_RETRY_INTERVAL = float(os.getenv("DB_POOL_RETRY_INTERVAL", "10"))
+
+
+class DatabasePool:
+    """asyncpg havuzu + doluluk metrikleri"""
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.acquire_timeout = acquire_timeout
+        self.pool = None
+        self._open_lock = None
+        self._next_retry = 0.0
+
+        # Metrikler
+        self.waiting = 0
+        self.acquired_total = 0
+        self.acquire_timeouts = 0
+        self.acquire_wait_ms_total = 0.0
+        self.acquire_wait_ms_max = 0.0
+
+    @property
+    def is_open(self):
+        return self.pool is not None
+
+    async def open(self):
+        """Havuzu kur; başarısız olursa False döner ve bir süre tekrar denemez"""
+        if self.pool is not None:
+            return True
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self.pool is not None:
+                return True
+            if time.monotonic() < self._next_retry:
+                return False
+            try:
+                self.pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                )
+                print(f"✅ Database havuzu hazır ({self.min_size}-{self.max_size} bağlantı)")
+                return True
+            except Exception as e:
+                self._next_retry = time.monotonic() + DB_POOL_RETRY_INTERVAL
+                print(f"❌ Database havuzu açılamadı: {e}")
+                return False
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Havuzdan bağlantı al; bekleme süresi ve timeout'lar metriklere yazılır"""
+        if not await self.open():
+            raise RuntimeError("Database havuzu kullanılamıyor")
+
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            conn = await self.pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.acquired_total += 1
+        self.acquire_wait_ms_total += wait_ms
+        self.acquire_wait_ms_max = max(self.acquire_wait_ms_max, wait_ms)
+
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    async def fetchrow(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def execute(self, query, *args):
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args)
+
+    def stats(self):
+        """Havuz doluluk metrikleri"""
+        size = self.pool.get_size() if self.pool else 0
+        idle = self.pool.get_idle_size() if self.pool else 0
+        in_use = size - idle
+        return {
+            "open": self.is_open,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "waiting": self.waiting,
+            "saturation": round(in_use / self.max_size, 3) if self.max_size else 0.0,
+            "acquired_total": self.acquired_total,
+            "acquire_timeouts": self.acquire_timeouts,
+            "acquire_wait_ms_avg": round(self.acquire_wait_ms_total / self.acquired_total, 2) if self.acquired_total else 0.0,
+            "acquire_wait_ms_max": round(self.acquire_wait_ms_max, 2),
+        }
@@ -0,0 +1,50 @@
+"""
+👥 Kalabalık yoğunluğu ve seviye sınıflandırması
+- Alan bazlı (ai_service, ai_service_simple): kişi kutularının kare alanına oranı (%)
+- Kişi bazlı (ai_standalone): 10.000 piksel başına kişi sayısı
+"""
+
+# (üst sınır, seviye, skor); son eşiği aşan değer en üst seviyeye düşer
+AREA_LEVELS = (
+    (5, "low", 1),
+    (15, "medium-low", 3),
+    (30, "medium", 5),
+    (50, "high", 7),
+    (float("inf"), "critical", 10),
+)
+
+PERSON_LEVELS = (
+    (0.5, "low", 1),
+    (1.5, "medium", 2),
+    (float("inf"), "high", 3),
+)
+
+
+def _classify(value, levels):
+    for limit, level, score in levels:
+        if value < limit:
+            return level, score
+    return levels[-1][1], levels[-1][2]
+
+
+def area_density(detections, width, height):
+    """Tespit kutularının (det["area"]) kare alanına oranı, yüzde"""
+    total_area = width * height
+    occupied_area = sum(det["area"] for det in detections)
+    return (occupied_area / total_area) * 100.0 if total_area > 0 else 0.0
+
+
+def classify_area_density(crowd_density):
+    """Alan yüzdesi -> (density_level, density_score 1-10)"""
+    return _classify(crowd_density, AREA_LEVELS)
+
+
+def person_density(person_count, width, height):
+    """10.000 piksel başına kişi"""
+    area = width * height
+    return (person_count / area) * 10000 if area > 0 else 0.0
+
+
+def classify_person_density(crowd_density):
+    """Kişi yoğunluğu -> (density_level, density_score 1-3)"""
+    return _classify(crowd_density, PERSON_LEVELS)
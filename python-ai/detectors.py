@@ -0,0 +1,238 @@
+"""
+🧠 Detector registry
+Her backend (YOLO, YOLO ONNX, Haar fullbody/upperbody) worker başına bir kez yüklenir.
+Haar cascade'leri eşzamanlı kullanıma güvenli olmadığı için her thread kendi
+örneğini tutar; YOLO tek örnektir ve kilit altında kullanılır.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from executors import run_in_thread
+
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "yolov8n.pt")
+YOLO_CONFIDENCE = float(os.getenv("YOLO_CONFIDENCE", "0.4"))
+
+# Servislerin seçebileceği backend grupları (AI_DETECTOR_BACKEND)
+BACKEND_GROUPS = {
+    "yolo": ["yolo"],
+    "yolo_onnx": ["yolo_onnx"],
+    "haar": ["haar_fullbody", "haar_upperbody"],
+    "haar_fullbody": ["haar_fullbody"],
+    "haar_upperbody": ["haar_upperbody"],
+}
+
+# Isınma için kullanılan boş kare (VGA)
+WARMUP_FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def resolve_backends(name):
+    """AI_DETECTOR_BACKEND değerini backend listesine çevir"""
+    if name not in BACKEND_GROUPS:
+        raise ValueError(f"Bilinmeyen detector backend: {name} (seçenekler: {', '.join(BACKEND_GROUPS)})")
+    return BACKEND_GROUPS[name]
+
+
+class DetectorSpec:
+    def __init__(self, name, factory, detect, per_thread=True, detect_batch=None):
+        self.name = name
+        self.factory = factory
+        self.detect = detect
+        self.per_thread = per_thread
+        self.detect_batch = detect_batch
+
+
+class DetectorRegistry:
+    """Backend örneklerini yükler, önbellekte tutar ve thread'lere dağıtır"""
+
+    def __init__(self):
+        self._specs = {}
+        self._local = threading.local()
+        self._shared = {}
+        self._shared_locks = {}
+        self._load_lock = threading.Lock()
+        self.load_times_ms = {}
+
+    def register(self, name, factory, detect, per_thread=True, detect_batch=None):
+        self._specs[name] = DetectorSpec(name, factory, detect, per_thread, detect_batch)
+        if not per_thread:
+            self._shared_locks[name] = threading.Lock()
+
+    def spec(self, name):
+        if name not in self._specs:
+            raise ValueError(f"Kayıtlı olmayan detector: {name}")
+        return self._specs[name]
+
+    def _load(self, spec):
+        started = time.perf_counter()
+        instance = spec.factory()
+        self.load_times_ms[spec.name] = round((time.perf_counter() - started) * 1000, 1)
+        return instance
+
+    def get(self, name):
+        """Çağıran thread'e ait (veya paylaşılan) örneği döndür; yoksa yükle"""
+        spec = self.spec(name)
+        if not spec.per_thread:
+            if name not in self._shared:
+                with self._load_lock:
+                    if name not in self._shared:
+                        self._shared[name] = self._load(spec)
+            return self._shared[name]
+
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        if name not in instances:
+            instances[name] = self._load(spec)
+        return instances[name]
+
+    @contextmanager
+    def use(self, name):
+        """Örneği güvenli kullanım için al (paylaşılan backend'lerde kilitli)"""
+        instance = self.get(name)
+        lock = self._shared_locks.get(name)
+        if lock is None:
+            yield instance
+        else:
+            with lock:
+                yield instance
+
+    def detect(self, name, image, gray=None):
+        """
+        Tek karede tespit yap.
+        (boxes, scores) döner; boxes Nx4 [x, y, w, h] int32, scores N float32
+        """
+        spec = self.spec(name)
+        with self.use(name) as instance:
+            boxes, scores = spec.detect(instance, image, gray)
+        return np.asarray(boxes, dtype=np.int32).reshape(-1, 4), np.asarray(scores, dtype=np.float32).reshape(-1)
+
+    def detect_batch(self, name, images, imgsz=None):
+        """
+        Birden fazla karede tek model çağrısıyla tespit yap (mikro-batch).
+        imgsz verilirse model girişi bu boyuttadır (uzun kenar), yoksa backend varsayılanı.
+        Her kare için (boxes Nx4 [x1, y1, x2, y2] float32, scores N float32) döner.
+        """
+        spec = self.spec(name)
+        if spec.detect_batch is None:
+            raise ValueError(f"{name} backend'i batch tespiti desteklemiyor")
+        with self.use(name) as instance:
+            return spec.detect_batch(instance, images, imgsz)
+
+    def warm_up_local(self, names):
+        """Çağıran thread için backend'leri yükle ve boş kareyle bir kez çalıştır"""
+        gray = cv2.cvtColor(WARMUP_FRAME, cv2.COLOR_BGR2GRAY)
+        for name in names:
+            self.detect(name, WARMUP_FRAME, gray)
+
+    def info(self):
+        return {
+            "registered": list(self._specs),
+            "load_times_ms": dict(self.load_times_ms),
+        }
+
+
+def _load_yolo():
+    # ultralytics/torch sadece YOLO backend'i gerçekten kullanılırsa import edilir
+    from ultralytics import YOLO
+    print(f"🤖 YOLO model yükleniyor: {YOLO_MODEL_PATH}")
+    return YOLO(YOLO_MODEL_PATH)
+
+
+def _xyxy_to_xywh(xyxy):
+    return np.column_stack([xyxy[:, 0], xyxy[:, 1], xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]])
+
+
+def _detect_yolo_batch(model, images, imgsz=None):
+    options = {"imgsz": imgsz} if imgsz else {}
+    results = model(images, classes=[0], conf=YOLO_CONFIDENCE, verbose=False, **options)
+    return [(r.boxes.xyxy.cpu().numpy().astype(np.float32), r.boxes.conf.cpu().numpy().astype(np.float32))
+            for r in results]
+
+
+def _detect_yolo(model, image, gray):
+    xyxy, scores = _detect_yolo_batch(model, [image])[0]
+    return _xyxy_to_xywh(xyxy), scores
+
+
+def _load_yolo_onnx():
+    # Sadece onnxruntime gerekir; torch/ultralytics import edilmez
+    from onnx_backend import OnnxYolo
+    return OnnxYolo()
+
+
+def _detect_yolo_onnx_batch(model, images, imgsz=None):
+    return model(images, conf=YOLO_CONFIDENCE, imgsz=imgsz)
+
+
+def _detect_yolo_onnx(model, image, gray):
+    xyxy, scores = model([image], conf=YOLO_CONFIDENCE)[0]
+    return _xyxy_to_xywh(xyxy), scores
+
+
+def _haar_factory(filename):
+    def load():
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + filename)
+        if cascade.empty():
+            raise RuntimeError(f"Haar cascade yüklenemedi: {filename}")
+        return cascade
+    return load
+
+
+def _haar_detector(min_size, score):
+    def detect(cascade, image, gray):
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        boxes = cascade.detectMultiScale(gray, 1.1, 3, minSize=min_size)
+        return boxes, np.full(len(boxes), score, dtype=np.float32)
+    return detect
+
+
+registry = DetectorRegistry()
+registry.register("yolo", _load_yolo, _detect_yolo, per_thread=False, detect_batch=_detect_yolo_batch)
+registry.register("yolo_onnx", _load_yolo_onnx, _detect_yolo_onnx, per_thread=False,
+                  detect_batch=_detect_yolo_onnx_batch)
+registry.register("haar_fullbody", _haar_factory("haarcascade_fullbody.xml"),
+                  _haar_detector((30, 90), 0.85))
+registry.register("haar_upperbody", _haar_factory("haarcascade_upperbody.xml"),
+                  _haar_detector((30, 60), 0.75))
+
+
+def warm_up_worker(names):
+    """Process havuzu initializer'ı: worker process açılırken backend'leri ısıt"""
+    registry.warm_up_local(names)
+
+
+async def warm_up(names, workers):
+    """
+    Backend'leri executor thread'lerinde yükle ve ısıt.
+    Paylaşılan backend'ler bir kez, thread başına olanlar her thread'de ısıtılır;
+    Barrier her işin ayrı bir thread'e düşmesini sağlar.
+    """
+    started = time.perf_counter()
+    shared = [name for name in names if not registry.spec(name).per_thread]
+    per_thread = [name for name in names if registry.spec(name).per_thread]
+
+    if shared:
+        await run_in_thread(registry.warm_up_local, shared)
+
+    if per_thread:
+        barrier = threading.Barrier(workers)
+
+        def _warm():
+            registry.warm_up_local(per_thread)
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+
+        await asyncio.gather(*[run_in_thread(_warm) for _ in range(workers)])
+
+    elapsed = int((time.perf_counter() - started) * 1000)
+    print(f"🔥 Detector'lar ısıtıldı: {', '.join(names)} ({workers} thread, {elapsed}ms)")
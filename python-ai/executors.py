@@ -0,0 +1,81 @@
+"""
+🧵 Bloklayan işler için executor katmanı
+Event loop sadece I/O yapar; decode, tespit, heatmap ve disk yazma burada çalışır.
+
+- Thread havuzu (varsayılan): OpenCV ve torch çağrıları GIL'i bıraktığı için
+  aynı process içinde gerçekten paralel çalışır.
+- Process havuzu (opsiyonel): `AI_EXECUTOR_PROCESSES > 0` ise saf Python
+  ağırlıklı işler için kullanılır. Gönderilen fonksiyon modül seviyesinde,
+  argümanları picklable olmalıdır.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTOR_THREADS = int(os.getenv("AI_EXECUTOR_THREADS", str(min(8, (os.cpu_count() or 1) + 2))))
+EXECUTOR_PROCESSES = int(os.getenv("AI_EXECUTOR_PROCESSES", "0"))  # 0 = process havuzu kapalı
+
+_thread_pool = None
+_process_pool = None
+_process_initializer = None
+_process_initargs = ()
+
+
+def get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=EXECUTOR_THREADS, thread_name_prefix="cityv-ai")
+    return _thread_pool
+
+
+def configure_process_pool(initializer=None, initargs=()):
+    """Worker process'ler açılırken çalışacak fonksiyonu ayarla (havuz kurulmadan önce)"""
+    global _process_initializer, _process_initargs
+    _process_initializer = initializer
+    _process_initargs = tuple(initargs)
+
+
+def get_process_pool():
+    """Process havuzu kapalıysa None döner"""
+    global _process_pool
+    if _process_pool is None and EXECUTOR_PROCESSES > 0:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=EXECUTOR_PROCESSES,
+            initializer=_process_initializer,
+            initargs=_process_initargs,
+        )
+    return _process_pool
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """GIL bırakan bloklayan çağrıyı thread havuzunda çalıştır"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """Process havuzu açıksa orada, değilse thread havuzunda çalıştır"""
+    pool = get_process_pool()
+    if pool is None:
+        return await run_in_thread(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+
+def executor_info():
+    return {
+        "threads": EXECUTOR_THREADS,
+        "processes": EXECUTOR_PROCESSES,
+    }
+
+
+def shutdown_executors(wait=True):
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=wait)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=wait)
+        _process_pool = None
@@ -0,0 +1,223 @@
+"""
+📦 YOLOv8 -> ONNX export, INT8 quantization ve doğruluk kontrolü
+Geliştirme makinesinde (torch + ultralytics kurulu) bir kez çalıştırılır; çıkan
+.onnx dosyası production'a kopyalanır ve AI_DETECTOR_BACKEND=yolo_onnx ile kullanılır.
+
+    python export_onnx.py export --weights yolov8n.pt --output yolov8n.onnx
+    python export_onnx.py quantize --model yolov8n.onnx --output yolov8n-int8.onnx --calib-dir kareler/
+    python export_onnx.py validate --weights yolov8n.pt --model yolov8n-int8.onnx --images kareler/
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from onnx_backend import OnnxYolo, letterbox, rect_shape
+from tracker import iou_matrix
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def list_images(directory, limit=None):
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        raise SystemExit(f"❌ {directory} içinde görüntü yok ({', '.join(IMAGE_PATTERNS)})")
+    return paths[:limit] if limit else paths
+
+
+def export(weights, output, imgsz=640, dynamic=True, opset=17):
+    """ultralytics ile ONNX'e çevir (dinamik batch ve boyut varsayılan)"""
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=dynamic, opset=opset, simplify=False)
+    if os.path.abspath(exported) != os.path.abspath(output):
+        shutil.move(exported, output)
+    print(f"✅ ONNX model: {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+    return output
+
+
+class _CalibrationReader:
+    """quantize_static için kalibrasyon kareleri (üretimdeki ön işleme ile aynı)"""
+
+    def __init__(self, model_path, paths, imgsz):
+        import onnxruntime as ort
+
+        session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        _, _, height, width = model_input.shape
+        fixed = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+        self.blobs = iter([self._blob(cv2.imread(path), fixed, imgsz) for path in paths])
+
+    @staticmethod
+    def _blob(image, fixed_shape, imgsz):
+        padded, _, _ = letterbox(image, fixed_shape or rect_shape(image.shape, imgsz))
+        blob = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None]
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+
+    def get_next(self):
+        blob = next(self.blobs, None)
+        return None if blob is None else {self.input_name: blob}
+
+
+def head_nodes(model_path):
+    """
+    Detect katmanının kutu çözme düğümleri (DFL, anchor/stride çarpımları, concat).
+    Bu kısım INT8'de koordinat hassasiyeti kaybeder; head konvolüsyonları quantize edilir.
+    """
+    import onnx
+
+    graph = onnx.load(model_path).graph
+    layers = [int(m.group(1)) for node in graph.node for m in [re.match(r"/model\.(\d+)/", node.name)] if m]
+    if not layers:
+        return []
+    prefix = f"/model.{max(layers)}/"
+    return [
+        node.name for node in graph.node
+        if node.name.startswith(prefix) and not re.match(re.escape(prefix) + r"cv\d+\.", node.name)
+    ]
+
+
+def quantize(model, output, calib_dir=None, calib_count=100, imgsz=640, mode="static", keep_head=True):
+    """
+    static: kalibrasyon kareleriyle aktivasyonlar da INT8 (QDQ, kanal başına ağırlık)
+    dynamic: sadece ağırlıklar INT8, kalibrasyon gerekmez (daha az hızlanma)
+    """
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    exclude = head_nodes(model) if keep_head else []
+    started = time.perf_counter()
+    if mode == "dynamic":
+        quantize_dynamic(model, output, weight_type=QuantType.QInt8, nodes_to_exclude=exclude)
+    else:
+        if not calib_dir:
+            raise SystemExit("❌ static quantization için --calib-dir gerekli (kameralardan örnek kareler)")
+        reader = _CalibrationReader(model, list_images(calib_dir, calib_count), imgsz)
+        quantize_static(
+            model, output, reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=exclude,
+        )
+    print(f"✅ INT8 model ({mode}): {output} ({os.path.getsize(output) / 1e6:.1f} MB, "
+          f"{len(exclude)} head düğümü FP32, {time.perf_counter() - started:.1f}s)")
+    return output
+
+
+def match_detections(reference, candidate, iou_threshold):
+    """Açgözlü IoU eşleştirme; eşleşen kutu sayısı"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0
+    iou = iou_matrix(np.asarray(reference, np.float32), np.asarray(candidate, np.float32))
+    matched = 0
+    while iou.size and iou.max() >= iou_threshold:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        iou[r, :] = 0
+        iou[:, c] = 0
+        matched += 1
+    return matched
+
+
+def validate(weights, model, images_dir, conf=0.4, iou_threshold=0.5, limit=None, min_f1=0.9):
+    """PyTorch modelini referans alarak ONNX modelin kişi tespitlerini karşılaştır"""
+    from ultralytics import YOLO
+
+    reference_model = YOLO(weights)
+    onnx_model = OnnxYolo(model)
+    paths = list_images(images_dir, limit)
+
+    # Isınma (ilk çağrı süreleri ölçüme katılmasın)
+    first = cv2.imread(paths[0])
+    reference_model(first, classes=[0], conf=conf, verbose=False)
+    onnx_model([first], conf=conf)
+
+    matched = reference_total = candidate_total = 0
+    count_diffs = []
+    reference_ms = []
+    onnx_ms = []
+    for path in paths:
+        image = cv2.imread(path)
+        started = time.perf_counter()
+        result = reference_model(image, classes=[0], conf=conf, verbose=False)[0]
+        reference_ms.append((time.perf_counter() - started) * 1000)
+        reference = result.boxes.xyxy.cpu().numpy()
+
+        started = time.perf_counter()
+        candidate, _ = onnx_model([image], conf=conf)[0]
+        onnx_ms.append((time.perf_counter() - started) * 1000)
+
+        matched += match_detections(reference, candidate, iou_threshold)
+        reference_total += len(reference)
+        candidate_total += len(candidate)
+        count_diffs.append(abs(len(reference) - len(candidate)))
+
+    precision = matched / candidate_total if candidate_total else 1.0
+    recall = matched / reference_total if reference_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    report = {
+        "images": len(paths),
+        "reference_detections": reference_total,
+        "onnx_detections": candidate_total,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "mean_count_diff": round(float(np.mean(count_diffs)), 3),
+        "torch_ms_p50": round(float(np.percentile(reference_ms, 50)), 2),
+        "onnx_ms_p50": round(float(np.percentile(onnx_ms, 50)), 2),
+        "providers": onnx_model.providers,
+    }
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+    print(("✅" if f1 >= min_f1 else "❌") + f" F1 {f1:.3f} (eşik {min_f1})")
+    return report, f1 >= min_f1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YOLOv8 ONNX export / INT8 / doğrulama")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="PyTorch ağırlıklarını ONNX'e çevir")
+    export_parser.add_argument("--weights", default="yolov8n.pt")
+    export_parser.add_argument("--output", default="yolov8n.onnx")
+    export_parser.add_argument("--imgsz", type=int, default=640)
+    export_parser.add_argument("--static", action="store_true", help="Sabit 1x3ximgszximgsz giriş (dinamik yerine)")
+    export_parser.add_argument("--opset", type=int, default=17)
+
+    quantize_parser = commands.add_parser("quantize", help="ONNX modelini INT8'e çevir")
+    quantize_parser.add_argument("--model", default="yolov8n.onnx")
+    quantize_parser.add_argument("--output", default="yolov8n-int8.onnx")
+    quantize_parser.add_argument("--mode", choices=("static", "dynamic"), default="static",
+                                 help="static önerilir; dynamic CPU'da konvolüsyonları genelde hızlandırmaz")
+    quantize_parser.add_argument("--calib-dir", help="Kalibrasyon kareleri (static mod)")
+    quantize_parser.add_argument("--calib-count", type=int, default=100)
+    quantize_parser.add_argument("--imgsz", type=int, default=640)
+    quantize_parser.add_argument("--quantize-head", action="store_true", help="Detect katmanını da INT8 yap")
+
+    validate_parser = commands.add_parser("validate", help="ONNX tespitlerini PyTorch ile karşılaştır")
+    validate_parser.add_argument("--weights", default="yolov8n.pt")
+    validate_parser.add_argument("--model", default="yolov8n.onnx")
+    validate_parser.add_argument("--images", required=True, help="Test kareleri klasörü")
+    validate_parser.add_argument("--limit", type=int)
+    validate_parser.add_argument("--conf", type=float, default=0.4)
+    validate_parser.add_argument("--iou", type=float, default=0.5, help="Eşleşme için en düşük IoU")
+    validate_parser.add_argument("--min-f1", type=float, default=0.9)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.weights, args.output, args.imgsz, not args.static, args.opset)
+    elif args.command == "quantize":
+        quantize(args.model, args.output, args.calib_dir, args.calib_count, args.imgsz, args.mode,
+                 keep_head=not args.quantize_head)
+    else:
+        _, passed = validate(args.weights, args.model, args.images, args.conf, args.iou, args.limit, args.min_f1)
+        sys.exit(0 if passed else 1)
@@ -0,0 +1,103 @@
+"""
+🧪 ESP32-CAM yerine geçen yerel test kamerası
+ESP32 sketch'indeki uçları taklit eder:
+- GET /capture : tek JPEG
+- GET /stream  : multipart/x-mixed-replace; boundary=frame (parça başına Content-Length)
+
+Kullanım:
+    python fake_camera.py --port 8081 --fps 10
+    CAMERA_POLL_TARGETS='[{"camera_id": "5", "url": "http://127.0.0.1:8081/stream", "mode": "mjpeg", "fps": 2}]' python ai_standalone.py
+"""
+
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+
+class SyntheticScene:
+    """Yatayda hareket eden basit bir figürle 640x480 kareler üretir"""
+
+    def __init__(self, width=640, height=480, image_path=None):
+        self.width = width
+        self.height = height
+        self.background = cv2.imread(image_path) if image_path else None
+        self.started = time.monotonic()
+
+    def frame(self):
+        if self.background is not None:
+            image = self.background.copy()
+        else:
+            image = np.full((self.height, self.width, 3), 90, np.uint8)
+        h, w = image.shape[:2]
+        x = int((time.monotonic() - self.started) * 80) % w
+        cv2.rectangle(image, (x, h // 3), (x + w // 10, h // 3 + h // 3), (40, 40, 200), -1)
+        cv2.putText(image, time.strftime("%H:%M:%S"), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        return encoded.tobytes()
+
+
+def make_handler(scene, fps):
+    interval = 1.0 / fps
+
+    class CameraHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.startswith("/capture"):
+                data = scene.frame()
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            elif self.path.startswith("/stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    while True:
+                        data = scene.frame()
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        self.wfile.write(f"Content-Length: {len(data)}\r\n\r\n".encode())
+                        self.wfile.write(data + b"\r\n")
+                        self.wfile.flush()
+                        time.sleep(interval)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CameraHandler
+
+
+def serve(port=8081, fps=10, image_path=None):
+    """Sunucuyu arka planda başlat (testlerden kullanım için); server nesnesini döndürür"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(SyntheticScene(image_path=image_path), fps))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ESP32-CAM test kamerası")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--image", help="Arka plan olarak kullanılacak görüntü")
+    args = parser.parse_args()
+
+    print(f"📷 Test kamerası: http://127.0.0.1:{args.port}/capture  http://127.0.0.1:{args.port}/stream ({args.fps} fps)")
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(SyntheticScene(image_path=args.image), args.fps))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
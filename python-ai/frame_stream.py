@@ -0,0 +1,130 @@
+"""
+📡 WebSocket üzerinden sürekli kare akışı
+Kamera bağlantıyı bir kez açar (camera_id ve zone query parametresi veya header ile),
+ardından binary JPEG kareleri gönderir. Her analiz edilen kare için aynı soket
+üzerinden kısa bir JSON sonuç döner.
+
+Sunucu geride kalırsa kuyruk büyümez: alıcı sadece en son kareyi tutar (tek slot),
+işlenmeyen eski kareler düşürülür ve sonuçtaki `dropped` sayacına eklenir.
+"""
+
+import asyncio
+import os
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+# Tek karenin üst sınırı (ESP32 UXGA JPEG ~200-400 KB)
+STREAM_MAX_FRAME_BYTES = int(os.getenv("STREAM_MAX_FRAME_BYTES", str(2 * 1024 * 1024)))
+
+# Soket sonucunda gönderilecek analiz alanları (tam yanıt yerine kısa özet)
+COMPACT_FIELDS = (
+    "person_count", "crowd_density", "density_level", "heatmap_url",
+    "entry_count", "exit_count", "current_occupancy", "alerts", "reused", "processing_time_ms",
+)
+
+
+def compact_result(analysis):
+    return {key: analysis[key] for key in COMPACT_FIELDS if key in analysis}
+
+
+def stream_params(websocket: WebSocket, default_camera=None, default_zone=None):
+    """camera_id/zone: önce query (?camera_id=5&zone=Giris), sonra X-Camera-ID/X-Location-Zone header"""
+    params = websocket.query_params
+    headers = websocket.headers
+    camera_id = params.get("camera_id") or headers.get("x-camera-id") or default_camera
+    location_zone = params.get("zone") or headers.get("x-location-zone") or default_zone
+    return camera_id, location_zone
+
+
+class LatestFrameSlot:
+    """Tek elemanlı kare tamponu; yeni kare gelince işlenmemiş eskisi düşer"""
+
+    def __init__(self):
+        self._frame = None
+        self._event = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame):
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self.received += 1
+        self._event.set()
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    async def take(self):
+        """Sıradaki (en son) kareyi bekle; bağlantı kapandıysa None"""
+        while self._frame is None:
+            if self.closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+
+async def serve_frame_stream(websocket: WebSocket, analyze, camera_id, location_zone):
+    """
+    Bağlantıyı kabul et ve kapanana kadar kareleri işle.
+    analyze(contents, camera_id, location_zone) -> tam yanıt sözlüğü ("analysis" alanı ile)
+    """
+    await websocket.accept()
+    slot = LatestFrameSlot()
+    print(f"📡 Stream açıldı: Camera {camera_id}, Zone {location_zone}")
+
+    async def receive():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if data is None:
+                    # Metin mesajları (ör. ping) yok sayılır
+                    continue
+                if len(data) > STREAM_MAX_FRAME_BYTES:
+                    await websocket.send_json({"success": False, "error": "Kare çok büyük"})
+                    continue
+                slot.put(data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive())
+    seq = 0
+    try:
+        while True:
+            frame = await slot.take()
+            if frame is None:
+                break
+            seq += 1
+            started = time.perf_counter()
+            try:
+                result = await analyze(frame, camera_id, location_zone)
+                if isinstance(result, dict) and "analysis" in result:
+                    message = {"success": True, "seq": seq, **compact_result(result["analysis"])}
+                else:
+                    # Analiz fonksiyonu hata yanıtı döndürdü (ör. decode edilemeyen kare)
+                    message = {"success": False, "seq": seq, "error": "Kare analiz edilemedi"}
+            except Exception as e:
+                message = {"success": False, "seq": seq, "error": str(e)}
+            message["dropped"] = slot.dropped
+            message["latency_ms"] = int((time.perf_counter() - started) * 1000)
+            try:
+                await websocket.send_json(message)
+            except (WebSocketDisconnect, RuntimeError):
+                break
+    finally:
+        receiver.cancel()
+        try:
+            await receiver
+        except asyncio.CancelledError:
+            pass
+        print(f"📡 Stream kapandı: Camera {camera_id} ({slot.received} kare, {slot.dropped} düşürüldü)")
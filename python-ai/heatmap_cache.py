@@ -0,0 +1,224 @@
+"""
+🗂️ İsteğe bağlı (lazy) heatmap üretimi
+`/analyze` sadece tespitleri ve kaynak JPEG'i saklar, heatmap URL'ini hemen döner.
+Overlay ilk `GET /static/{filename}` isteğinde üretilir ve HeatmapStore ile diske
+yazılır. Boyut sınırlı LRU sadece diskin önündeki sıcak önbellektir.
+
+İstemciye ve DB'ye verilen her URL'in dosyası sonunda diske yazılır:
+- Bekleyen kare bütçeyi aşınca düşmez; arka plan thread'i onu üretip diske yazar.
+- Kapanışta (flush) bekleyen tüm kareler üretilip yazılır.
+Sadece süreç çökerse veya arka plan kuyruğu da dolarsa (dropped) URL 404 döner.
+Yük altında açılmayan heatmap'ler hiç üretilmez.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from image_io import decode_image
+
+# eager: her karede heatmap üret ve diske yaz (eski davranış), lazy: ilk istekte üret
+HEATMAP_MODE = os.getenv("HEATMAP_MODE", "eager")
+HEATMAP_CACHE_MB = float(os.getenv("HEATMAP_CACHE_MB", "64"))
+# Henüz üretilmemiş heatmap'ler için tutulacak kaynak kare sayısı ve toplam boyut
+HEATMAP_PENDING_MAX = int(os.getenv("HEATMAP_PENDING_MAX", "2000"))
+HEATMAP_PENDING_MB = float(os.getenv("HEATMAP_PENDING_MB", "128"))
+
+
+class LazyHeatmapCache:
+    """
+    render(image, detections) -> overlay fonksiyonuyla heatmap'i ilk istekte üretir,
+    store.write_bytes(filename, jpeg) ile kalıcı hale getirir. Bekleyen kareler ve
+    üretilmiş JPEG'ler ayrı ayrı bayt bütçesiyle sınırlanır. Bütçeyi aşan en eski
+    bekleyen kare arka planda üretilip yazılır (en fazla max_pending kare sırada bekler).
+    """
+
+    def __init__(self, render, store, max_cache_bytes=HEATMAP_CACHE_MB * 1024 * 1024,
+                 max_pending=HEATMAP_PENDING_MAX, max_pending_bytes=HEATMAP_PENDING_MB * 1024 * 1024):
+        self._render = render
+        self._store_files = store
+        self.max_cache_bytes = int(max_cache_bytes)
+        self.max_pending = max_pending
+        self.max_pending_bytes = int(max_pending_bytes)
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()   # filename -> (jpeg_bytes, detections)
+        self._pending_bytes = 0
+        self._cache = OrderedDict()     # filename -> encoded jpeg
+        self._cache_bytes = 0
+        self._render_locks = {}
+        # Bütçeden taşan, arka planda diske yazılacak kareler
+        self._spilling = OrderedDict()  # filename -> (jpeg_bytes, detections)
+        self._spill_wakeup = threading.Event()
+        self._spill_thread = None
+
+        # Metrikler
+        self.hits = 0
+        self.renders = 0
+        self.misses = 0
+        self.evicted_pending = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def register(self, filename, jpeg_bytes, detections):
+        """Kaynak kareyi ve tespitleri sakla (render yok, sadece referans)"""
+        with self._lock:
+            old = self._pending.pop(filename, None)
+            if old is not None:
+                self._pending_bytes -= len(old[0])
+            old = self._cache.pop(filename, None)
+            if old is not None:
+                self._cache_bytes -= len(old)
+
+            self._pending[filename] = (bytes(jpeg_bytes), detections)
+            self._pending_bytes += len(jpeg_bytes)
+            evicted = False
+            while self._pending and (len(self._pending) > self.max_pending
+                                     or self._pending_bytes > self.max_pending_bytes):
+                old_name, entry = self._pending.popitem(last=False)
+                self._pending_bytes -= len(entry[0])
+                self._spilling[old_name] = entry
+                self.evicted_pending += 1
+                evicted = True
+            while len(self._spilling) > self.max_pending:
+                dropped_name, _ = self._spilling.popitem(last=False)
+                self.dropped += 1
+                print(f"⚠️ Lazy heatmap kuyruğu dolu, üretilmeden düştü: {dropped_name}")
+        if evicted:
+            self._wake_spill()
+
+    def _wake_spill(self):
+        if self._spill_thread is None:
+            self._spill_thread = threading.Thread(target=self._spill_loop, name="heatmap-spill", daemon=True)
+            self._spill_thread.start()
+        self._spill_wakeup.set()
+
+    def _spill_loop(self):
+        while True:
+            self._spill_wakeup.wait()
+            self._spill_wakeup.clear()
+            self._drain_spill()
+
+    def _drain_spill(self):
+        """Taşan kareleri sırayla üret ve diske yaz"""
+        while True:
+            with self._lock:
+                if not self._spilling:
+                    return
+                filename = next(iter(self._spilling))
+            try:
+                written = self.get(filename) is not None and filename not in self._spilling
+            except Exception as e:
+                print(f"❌ Lazy heatmap üretilemedi ({filename}): {e}")
+                written = False
+            with self._lock:
+                # Başarısız kayıt tekrar denenmez (kuyruk tıkanmasın)
+                self._spilling.pop(filename, None)
+                if written:
+                    self.spilled += 1
+
+    def flush(self):
+        """
+        Bekleyen tüm heatmap'leri üret ve diske yaz (kapanışta, URL'ler restart
+        sonrası geçerli kalsın diye). Bloklayan bir çağrıdır.
+        """
+        with self._lock:
+            for filename, entry in self._pending.items():
+                self._spilling[filename] = entry
+            self._pending.clear()
+            self._pending_bytes = 0
+            count = len(self._spilling)
+        if count:
+            print(f"🗂️ {count} bekleyen lazy heatmap diske yazılıyor...")
+        self._drain_spill()
+
+    def _store(self, filename, encoded):
+        if len(encoded) > self.max_cache_bytes:
+            return
+        self._cache[filename] = encoded
+        self._cache_bytes += len(encoded)
+        while self._cache_bytes > self.max_cache_bytes:
+            _, data = self._cache.popitem(last=False)
+            self._cache_bytes -= len(data)
+
+    def get(self, filename):
+        """
+        JPEG baytlarını döndür; gerekirse üret. Bilinmeyen dosya için None.
+        Bloklayan bir çağrıdır, executor üzerinden çağrılmalıdır.
+        """
+        with self._lock:
+            if filename in self._cache:
+                self._cache.move_to_end(filename)
+                self.hits += 1
+                return self._cache[filename]
+            if filename not in self._pending and filename not in self._spilling:
+                self.misses += 1
+                return None
+            render_lock = self._render_locks.setdefault(filename, threading.Lock())
+
+        # Aynı heatmap'e gelen eşzamanlı istekler tek render'ı bekler
+        with render_lock:
+            try:
+                return self._render_pending(filename)
+            finally:
+                with self._lock:
+                    self._render_locks.pop(filename, None)
+
+    def _render_pending(self, filename):
+        with self._lock:
+            if filename in self._cache:
+                self._cache.move_to_end(filename)
+                self.hits += 1
+                return self._cache[filename]
+            entry = self._pending.get(filename) or self._spilling.get(filename)
+        if entry is None:
+            return None
+
+        jpeg_bytes, detections = entry
+        # Analizdeki ile aynı ölçekte decode edilir; tespitler bu ölçektedir
+        image, _ = decode_image(jpeg_bytes)
+        if image is None:
+            return None
+        overlay = self._render(image, detections)
+        ok, encoded = cv2.imencode(".jpg", overlay)
+        if not ok:
+            return None
+        encoded = encoded.tobytes()
+
+        # Önce diske: kaynak kare ancak dosya yazıldıktan sonra bırakılır
+        try:
+            self._store_files.write_bytes(filename, encoded)
+        except Exception as e:
+            print(f"❌ Lazy heatmap diske yazılamadı ({filename}): {e}")
+            with self._lock:
+                self.write_errors += 1
+            return encoded
+
+        with self._lock:
+            if self._pending.pop(filename, None) is not None:
+                self._pending_bytes -= len(jpeg_bytes)
+            self._spilling.pop(filename, None)
+            self._store(filename, encoded)
+            self.renders += 1
+        return encoded
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "pending_bytes": self._pending_bytes,
+                "cached": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "max_cache_bytes": self.max_cache_bytes,
+                "hits": self.hits,
+                "renders": self.renders,
+                "misses": self.misses,
+                "evicted_pending": self.evicted_pending,
+                "spilling": len(self._spilling),
+                "spilled": self.spilled,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+            }
@@ -0,0 +1,281 @@
+"""
+💾 Heatmap dosya deposu
+- Çakışmasız isimler: saniye damgası + rastgele sonek (aynı saniyedeki kareler ezilmez)
+- Parçalı klasörler: static/<camera_id>/<YYYYMMDD>/heatmap_<zone>_<HHMMSS>_<id>.jpg
+- Arka planda çalışan temizleyici yaş ve disk bütçesini uygular
+- Dosya yazma ve disk taraması event loop dışında (thread havuzunda) yapılır
+- Yanıtlar ETag/Cache-Control taşır, If-None-Match ile 304 döner
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+import cv2
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+
+from executors import run_in_thread
+
+HEATMAP_DIR = os.getenv("HEATMAP_DIR", "static")
+HEATMAP_MAX_DISK_MB = float(os.getenv("HEATMAP_MAX_DISK_MB", "2048"))   # 0 = sınırsız
+HEATMAP_MAX_AGE_HOURS = float(os.getenv("HEATMAP_MAX_AGE_HOURS", "72"))  # 0 = sınırsız
+HEATMAP_SWEEP_INTERVAL = float(os.getenv("HEATMAP_SWEEP_INTERVAL", "300"))
+HEATMAP_CACHE_MAX_AGE = int(os.getenv("HEATMAP_CACHE_MAX_AGE", "86400"))
+
+_SAFE_PART = re.compile(r"[^A-Za-z0-9_-]+")
+_DAY_DIR = re.compile(r"^\d{8}$")
+
+
+def _safe(value, default):
+    value = _SAFE_PART.sub("_", str(value)).strip("_") if value is not None else ""
+    return value[:48] or default
+
+
+class HeatmapStore:
+    """Heatmap JPEG'lerini isimlendirir, yazar, servis eder ve bütçe içinde tutar"""
+
+    def __init__(self, root=HEATMAP_DIR, max_disk_mb=HEATMAP_MAX_DISK_MB,
+                 max_age_hours=HEATMAP_MAX_AGE_HOURS, sweep_interval=HEATMAP_SWEEP_INTERVAL,
+                 cache_max_age=HEATMAP_CACHE_MAX_AGE):
+        self.root = os.path.abspath(root)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.max_age_s = max_age_hours * 3600
+        self.sweep_interval = sweep_interval
+        self.cache_control = f"public, max-age={cache_max_age}, immutable"
+
+        self._task = None
+        self._wake = None
+        self._loop = None
+        self._stopping = False
+
+        # Metrikler (disk_bytes yazmalarla artar, her taramada yeniden hesaplanır)
+        self.files = 0
+        self.disk_bytes = 0
+        self.written = 0
+        self.removed = 0
+        self.last_sweep_ms = None
+
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- İsimlendirme ---
+
+    def new_name(self, camera_id, location_zone=None):
+        """Yeni heatmap için static/ altına göreli yol üret"""
+        now = datetime.now()
+        camera = _safe(camera_id, "unknown")
+        zone = _safe(location_zone, "zone")
+        return f"{camera}/{now:%Y%m%d}/heatmap_{zone}_{now:%H%M%S}_{uuid.uuid4().hex[:12]}.jpg"
+
+    @staticmethod
+    def url(relpath):
+        return f"/static/{relpath}"
+
+    def resolve(self, relpath):
+        """Göreli yolu mutlak yola çevir; kök dışına çıkan yollar için None"""
+        path = os.path.abspath(os.path.join(self.root, relpath))
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    # --- Yazma ---
+
+    def write(self, relpath, image):
+        """Overlay'i JPEG olarak yaz (bloklayan). Önce geçici dosyaya, sonra atomik rename."""
+        ok, encoded = cv2.imencode(".jpg", image)
+        if not ok:
+            raise RuntimeError("Heatmap JPEG'e çevrilemedi")
+        self.write_bytes(relpath, encoded.tobytes())
+
+    def write_bytes(self, relpath, data):
+        """Encode edilmiş JPEG'i yaz (bloklayan; lazy heatmap'ler ilk render'da buradan diske iner)"""
+        path = self.resolve(relpath)
+        if path is None:
+            raise ValueError(f"Geçersiz heatmap yolu: {relpath}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self.files += 1
+        self.disk_bytes += len(data)
+        self.written += 1
+        if self.max_disk_bytes and self.disk_bytes > self.max_disk_bytes and self._task is not None:
+            # Thread havuzundan çağrılabilir; event loop'a güvenli bildirim
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def save(self, image, camera_id, location_zone=None):
+        """Overlay'i thread havuzunda yaz ve URL'ini döndür"""
+        relpath = self.new_name(camera_id, location_zone)
+        await run_in_thread(self.write, relpath, image)
+        return self.url(relpath)
+
+    # --- Servis ---
+
+    def _headers(self, etag):
+        return {"ETag": etag, "Cache-Control": self.cache_control}
+
+    @staticmethod
+    def _not_modified(request, etag):
+        if request is None:
+            return False
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+    async def serve(self, relpath, request=None, lazy=None):
+        """
+        GET /static/{path} yanıtı. lazy verilirse (LazyHeatmapCache) önce oradan bakılır.
+        İsimler benzersiz olduğu için içerik değişmez; yanıtlar immutable olarak önbelleklenir.
+        """
+        path = self.resolve(relpath)
+        if path is None or not path.endswith(".jpg"):
+            raise HTTPException(status_code=404, detail="Heatmap bulunamadı")
+
+        if lazy is not None:
+            data = await run_in_thread(lazy.get, relpath)
+            if data is not None:
+                etag = f'"{zlib.crc32(data):08x}-{len(data):x}"'
+                if self._not_modified(request, etag):
+                    return Response(status_code=304, headers=self._headers(etag))
+                return Response(content=data, media_type="image/jpeg", headers=self._headers(etag))
+
+        try:
+            stat = await run_in_thread(os.stat, path)
+        except OSError:
+            raise HTTPException(status_code=404, detail="Heatmap bulunamadı")
+
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if self._not_modified(request, etag):
+            return Response(status_code=304, headers=self._headers(etag))
+        return FileResponse(path, media_type="image/jpeg", stat_result=stat, headers=self._headers(etag))
+
+    # --- Temizlik ---
+
+    def sweep(self):
+        """
+        Yaş ve disk bütçesini uygula (bloklayan).
+        Yaş sınırını tamamen aşan gün klasörleri tek seferde silinir; kalan dosyalar
+        disk bütçesi aşılıyorsa en eskiden başlanarak silinir.
+        """
+        started = time.perf_counter()
+        now = time.time()
+        cutoff = now - self.max_age_s if self.max_age_s > 0 else None
+        cutoff_day = datetime.fromtimestamp(cutoff).strftime("%Y%m%d") if cutoff else None
+        removed = 0
+        entries = []
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # Tamamı eski olan gün klasörlerini dosya dosya gezmeden sil
+            for name in list(dirnames):
+                if cutoff_day and _DAY_DIR.match(name) and name < cutoff_day:
+                    day_path = os.path.join(dirpath, name)
+                    removed += sum(len(files) for _, _, files in os.walk(day_path))
+                    shutil.rmtree(day_path, ignore_errors=True)
+                    dirnames.remove(name)
+
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp") and now - stat.st_mtime > 60:
+                    self._remove(path)
+                    continue
+                if cutoff and stat.st_mtime < cutoff:
+                    if self._remove(path):
+                        removed += 1
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_disk_bytes and total > self.max_disk_bytes:
+            entries.sort()
+            remaining = []
+            for index, (mtime, size, path) in enumerate(entries):
+                if total <= self.max_disk_bytes:
+                    remaining.extend(entries[index:])
+                    break
+                if self._remove(path):
+                    total -= size
+                    removed += 1
+                else:
+                    remaining.append((mtime, size, path))
+            entries = remaining
+
+        self._prune_empty_dirs()
+
+        self.files = len(entries)
+        self.disk_bytes = total
+        self.removed += removed
+        self.last_sweep_ms = round((time.perf_counter() - started) * 1000, 1)
+        if removed:
+            print(f"🧹 Heatmap temizliği: {removed} dosya silindi, {total / 1024 / 1024:.1f} MB kaldı "
+                  f"({self.last_sweep_ms}ms)")
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _prune_empty_dirs(self):
+        # Bugünün klasörlerine dokunulmaz (yazma sırasında silinmesin diye)
+        today = datetime.now().strftime("%Y%m%d")
+        for dirpath, _, _ in os.walk(self.root, topdown=False):
+            name = os.path.basename(dirpath)
+            if _DAY_DIR.match(name) and name < today:
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+
+    async def _sweep_loop(self):
+        while not self._stopping:
+            try:
+                await run_in_thread(self.sweep)
+            except Exception as e:
+                print(f"❌ Heatmap temizlik hatası: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "files": self.files,
+            "disk_bytes": self.disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "max_age_hours": self.max_age_s / 3600,
+            "written": self.written,
+            "removed": self.removed,
+            "last_sweep_ms": self.last_sweep_ms,
+        }
@@ -0,0 +1,343 @@
+"""
+🕐 Saatlik analiz özeti (iot_ai_hourly_rollup)
+Her analiz bellekteki (camera_id, location_zone, saat) kısmi toplamına eklenir.
+Kısmi toplamlar belirli aralıklarla tek `executemany` ile UPSERT edilir; mevcut satırla
+sayılar toplanır, min/max birleştirilir. Grafikler milyonlarca ham satır yerine saat
+başına bir satır okur.
+
+Saat sınırları database saatidir, v_ai_hourly_stats ile aynı: DATE_TRUNC('hour', created_at).
+Canlı yol servis saatini kullanmaz; database'in UTC farkını (session saat dilimi) her
+flush'ta okur ve UTC zamana ekler, böylece kare NOW() ile yazılacağı saate düşer.
+
+Kaynak: ai_standalone satırlarına source = 'ai_standalone' yazar
+(database/add_ai_analysis_source.sql). Migration'dan sonra diğer yazanların satırları
+(Next.js /api/iot/ai-analysis) 'other' olur ve canlı özete girmediği için backfill'e de
+girmez. Migration'dan önceki satırlar (source NULL) ayırt edilemez; geçmiş olarak dahil edilir.
+Giriş/çıkış ve doluluk canlı yolda tracker'dan, backfill'de bu satırlara bağlı
+iot_entry_exit_logs kayıtlarından gelir.
+
+Mevcut veriler için:
+    python hourly_rollup.py backfill [--since 2024-01-01] [--until 2024-06-01]
+
+Tablo: database/create_ai_hourly_rollup.sql
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# Varsayılan kapalı: database/add_ai_analysis_source.sql migration'ı gerektirir
+HOURLY_ROLLUP_ENABLED = os.getenv("HOURLY_ROLLUP", "off") == "on"
+HOURLY_ROLLUP_FLUSH_INTERVAL = float(os.getenv("HOURLY_ROLLUP_FLUSH_INTERVAL", "30"))
+# Canlı özeti besleyen servis (ai_standalone SERVICE_NAME); backfill bu değeri ve NULL satırları okur
+ROLLUP_SOURCE = "ai_standalone"
+
+UPSERT_ROLLUP_SQL = """
+    INSERT INTO iot_ai_hourly_rollup AS r
+    (camera_id, location_zone, hour, analysis_count,
+     person_count_sum, person_count_min, person_count_max,
+     crowd_density_sum, crowd_density_min, crowd_density_max,
+     entry_count_sum, exit_count_sum, occupancy_max, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, NOW())
+    ON CONFLICT (camera_id, location_zone, hour) DO UPDATE SET
+        analysis_count = r.analysis_count + EXCLUDED.analysis_count,
+        person_count_sum = r.person_count_sum + EXCLUDED.person_count_sum,
+        person_count_min = LEAST(r.person_count_min, EXCLUDED.person_count_min),
+        person_count_max = GREATEST(r.person_count_max, EXCLUDED.person_count_max),
+        crowd_density_sum = r.crowd_density_sum + EXCLUDED.crowd_density_sum,
+        crowd_density_min = LEAST(r.crowd_density_min, EXCLUDED.crowd_density_min),
+        crowd_density_max = GREATEST(r.crowd_density_max, EXCLUDED.crowd_density_max),
+        entry_count_sum = r.entry_count_sum + EXCLUDED.entry_count_sum,
+        exit_count_sum = r.exit_count_sum + EXCLUDED.exit_count_sum,
+        occupancy_max = GREATEST(r.occupancy_max, EXCLUDED.occupancy_max),
+        updated_at = NOW()
+"""
+
+# Database'in yerel saati ile UTC arasındaki fark (created_at = NOW()::timestamp)
+CLOCK_OFFSET_SQL = "SELECT NOW()::timestamp - (NOW() AT TIME ZONE 'UTC')"
+
+# Backfill: aralıktaki saatler ham tablodan yeniden hesaplanır (toplanmaz, değiştirilir).
+# Kaynak: migration öncesi satırlar (NULL) + canlı özeti besleyen servis
+BACKFILL_ANALYSIS_SQL = """
+    INSERT INTO iot_ai_hourly_rollup
+    (camera_id, location_zone, hour, analysis_count,
+     person_count_sum, person_count_min, person_count_max,
+     crowd_density_sum, crowd_density_min, crowd_density_max, updated_at)
+    SELECT
+        camera_id,
+        COALESCE(location_zone, 'Unknown'),
+        DATE_TRUNC('hour', created_at),
+        COUNT(*),
+        COALESCE(SUM(person_count), 0), MIN(person_count), MAX(person_count),
+        COALESCE(SUM(crowd_density), 0), MIN(crowd_density), MAX(crowd_density),
+        NOW()
+    FROM iot_ai_analysis
+    WHERE created_at >= $1 AND created_at < $2
+      AND (source IS NULL OR source = $3)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (camera_id, location_zone, hour) DO UPDATE SET
+        analysis_count = EXCLUDED.analysis_count,
+        person_count_sum = EXCLUDED.person_count_sum,
+        person_count_min = EXCLUDED.person_count_min,
+        person_count_max = EXCLUDED.person_count_max,
+        crowd_density_sum = EXCLUDED.crowd_density_sum,
+        crowd_density_min = EXCLUDED.crowd_density_min,
+        crowd_density_max = EXCLUDED.crowd_density_max,
+        updated_at = NOW()
+"""
+# Giriş/çıkış: backfill'e giren analiz satırlarına bağlı loglar (analysis_id yoksa geçmiş kayıt)
+BACKFILL_TRAFFIC_SQL = """
+    UPDATE iot_ai_hourly_rollup r SET
+        entry_count_sum = t.entries,
+        exit_count_sum = t.exits,
+        occupancy_max = t.peak
+    FROM (
+        SELECT
+            l.camera_id,
+            COALESCE(l.location_zone, 'Unknown') AS location_zone,
+            DATE_TRUNC('hour', l.timestamp) AS hour,
+            COALESCE(SUM(l.entry_count), 0) AS entries,
+            COALESCE(SUM(l.exit_count), 0) AS exits,
+            MAX(l.current_occupancy) AS peak
+        FROM iot_entry_exit_logs l
+        LEFT JOIN iot_ai_analysis a ON a.id = l.analysis_id
+        WHERE l.timestamp >= $1 AND l.timestamp < $2
+          AND (a.id IS NULL OR a.source IS NULL OR a.source = $3)
+        GROUP BY 1, 2, 3
+    ) t
+    WHERE r.camera_id = t.camera_id AND r.location_zone = t.location_zone AND r.hour = t.hour
+"""
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _Partial:
+    __slots__ = ("count", "person_sum", "person_min", "person_max", "density_sum",
+                 "density_min", "density_max", "entries", "exits", "occupancy_max")
+
+    def __init__(self):
+        self.count = 0
+        self.person_sum = 0
+        self.person_min = None
+        self.person_max = None
+        self.density_sum = 0.0
+        self.density_min = None
+        self.density_max = None
+        self.entries = 0
+        self.exits = 0
+        self.occupancy_max = None
+
+    def add(self, person_count, crowd_density, entries, exits, occupancy):
+        self.count += 1
+        self.person_sum += person_count
+        self.person_min = person_count if self.person_min is None else min(self.person_min, person_count)
+        self.person_max = person_count if self.person_max is None else max(self.person_max, person_count)
+        self.density_sum += crowd_density
+        self.density_min = crowd_density if self.density_min is None else min(self.density_min, crowd_density)
+        self.density_max = crowd_density if self.density_max is None else max(self.density_max, crowd_density)
+        self.entries += entries
+        self.exits += exits
+        if occupancy is not None:
+            self.occupancy_max = occupancy if self.occupancy_max is None else max(self.occupancy_max, occupancy)
+
+    def merge(self, other):
+        """Yazılamayan kısmi toplamı yeni gelenlerle birleştir"""
+        self.count += other.count
+        self.person_sum += other.person_sum
+        self.density_sum += other.density_sum
+        self.entries += other.entries
+        self.exits += other.exits
+        for name, pick in (("person_min", min), ("person_max", max), ("density_min", min),
+                           ("density_max", max), ("occupancy_max", max)):
+            values = [v for v in (getattr(self, name), getattr(other, name)) if v is not None]
+            setattr(self, name, pick(values) if values else None)
+
+    def record(self, key):
+        camera_id, location_zone, hour = key
+        return (camera_id, location_zone, hour, self.count,
+                self.person_sum, self.person_min, self.person_max,
+                self.density_sum, self.density_min, self.density_max,
+                self.entries, self.exits, self.occupancy_max)
+
+
+class HourlyRollup:
+    """Bellekte kısmi saatlik toplamlar + periyodik UPSERT"""
+
+    def __init__(self, db_pool, flush_interval=HOURLY_ROLLUP_FLUSH_INTERVAL):
+        self.db_pool = db_pool
+        self.flush_interval = flush_interval
+        self._partials = {}
+        self._wakeup = None
+        self._task = None
+        self._stopping = False
+        # Database yerel saati - UTC; start/flush'ta database'den okunur
+        self.clock_offset = timedelta(0)
+
+        # Metrikler
+        self.added_total = 0
+        self.upserted_rows = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+
+    def add(self, camera_id, location_zone, person_count, crowd_density,
+            entries=0, exits=0, occupancy=None, now=None):
+        """Analizi kısmi toplama ekle (O(1), await gerektirmez)"""
+        now = now or utc_now() + self.clock_offset
+        key = (int(camera_id), location_zone or "Unknown", hour_start(now))
+        partial = self._partials.get(key)
+        if partial is None:
+            partial = self._partials[key] = _Partial()
+        partial.add(person_count, crowd_density, entries, exits, occupancy)
+        self.added_total += 1
+
+    async def sync_clock(self, conn=None):
+        """created_at ile aynı saat için database'in UTC farkını oku (yaz saati değişimi dahil)"""
+        if conn is None:
+            async with self.db_pool.acquire() as conn:
+                self.clock_offset = await conn.fetchval(CLOCK_OFFSET_SQL)
+        else:
+            self.clock_offset = await conn.fetchval(CLOCK_OFFSET_SQL)
+
+    async def start(self):
+        if self._task is None:
+            try:
+                await self.sync_clock()
+            except Exception as e:
+                print(f"⚠️ Database saat farkı okunamadı, UTC kullanılıyor: {e}")
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush görevini durdur ve kalan kısmi toplamları yaz"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+        if self._partials and not await self.flush():
+            print(f"⚠️ Kapanışta {len(self._partials)} saatlik özet satırı yazılamadı")
+
+    async def flush(self):
+        """Kısmi toplamları tek executemany ile UPSERT et"""
+        if not self._partials:
+            return True
+        partials, self._partials = self._partials, {}
+        started = time.perf_counter()
+        try:
+            async with self.db_pool.acquire() as conn:
+                await conn.executemany(
+                    UPSERT_ROLLUP_SQL, [partial.record(key) for key, partial in partials.items()]
+                )
+                await self.sync_clock(conn)
+        except Exception as e:
+            # Bu arada gelenlerle birleştirip bir sonraki turda tekrar dene
+            for key, partial in partials.items():
+                current = self._partials.get(key)
+                if current is not None:
+                    partial.merge(current)
+                self._partials[key] = partial
+            self.flush_errors += 1
+            print(f"❌ Saatlik özet flush hatası ({len(partials)} satır): {e}")
+            return False
+
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        self.upserted_rows += len(partials)
+        self.flush_count += 1
+        return True
+
+    def stats(self):
+        return {
+            "pending_rows": len(self._partials),
+            "flush_interval_s": self.flush_interval,
+            "added_total": self.added_total,
+            "upserted_rows": self.upserted_rows,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "clock_offset_s": self.clock_offset.total_seconds(),
+        }
+
+
+async def backfill(dsn, since=None, until=None, step=timedelta(days=1), source=ROLLUP_SOURCE):
+    """
+    Ham tablodan saatlik özeti yeniden hesapla; gün gün, her gün ayrı transaction.
+    since/until database saatidir (created_at gibi). until varsayılanı içinde bulunulan
+    saatin başıdır: servis o saate canlı olarak eklemeye devam eder, böylece aynı kare
+    iki kez sayılmaz. source NULL (migration öncesi) veya source eşleşen satırlar sayılır.
+    """
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        has_source = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'iot_ai_analysis' AND column_name = 'source')"
+        )
+        if not has_source:
+            print("❌ iot_ai_analysis.source yok: önce database/add_ai_analysis_source.sql çalıştırılmalı")
+            return 0
+        if since is None:
+            since = await conn.fetchval(
+                "SELECT MIN(created_at) FROM iot_ai_analysis WHERE source IS NULL OR source = $1", source
+            )
+            if since is None:
+                print("ℹ️ iot_ai_analysis boş, backfill gerekmiyor")
+                return 0
+        since = hour_start(since)
+        until = until or hour_start(await conn.fetchval("SELECT NOW()::timestamp"))
+        has_traffic = await conn.fetchval("SELECT to_regclass('iot_entry_exit_logs') IS NOT NULL")
+
+        total = 0
+        cursor = since
+        while cursor < until:
+            end = min(cursor + step, until)
+            started = time.perf_counter()
+            async with conn.transaction():
+                status = await conn.execute(BACKFILL_ANALYSIS_SQL, cursor, end, source)
+                if has_traffic:
+                    await conn.execute(BACKFILL_TRAFFIC_SQL, cursor, end, source)
+            rows = int(status.split()[-1])
+            total += rows
+            print(f"🕐 {cursor:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M}: {rows} saat satırı "
+                  f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+            cursor = end
+        print(f"✅ Backfill tamamlandı: {total} satır")
+        return total
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="iot_ai_hourly_rollup bakım komutları")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = commands.add_parser("backfill", help="Mevcut analizlerden saatlik özeti hesapla")
+    backfill_parser.add_argument("--since", type=datetime.fromisoformat, help="Başlangıç (varsayılan: ilk analiz)")
+    backfill_parser.add_argument("--until", type=datetime.fromisoformat, help="Bitiş (varsayılan: bu saatin başı)")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL") or os.getenv("POSTGRES_URL")
+    if not dsn:
+        raise SystemExit("❌ DATABASE_URL bulunamadı")
+    asyncio.run(backfill(dsn, args.since, args.until))
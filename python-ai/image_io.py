@@ -0,0 +1,105 @@
+"""
+📥 Kare alma ve decode
+- `/analyze` hem multipart `file` alanını hem de ham `image/jpeg` body'yi kabul eder
+- `AI_DECODE_MAX_SIDE > 0` ise JPEG doğrudan küçültülmüş decode edilir
+  (IMREAD_REDUCED_COLOR_2/4/8); tam çözünürlükte decode edip sonra küçültmek yerine
+  libjpeg DCT aşamasında 1/2, 1/4 veya 1/8 ölçek kullanır. Uzun kenar hiçbir zaman
+  AI_DECODE_MAX_SIDE değerinin altına inmez.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+DECODE_MAX_SIDE = int(os.getenv("AI_DECODE_MAX_SIDE", "0"))  # 0 = tam çözünürlük
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# SOF marker'ları (DHT=C4, JPG=C8, DAC=CC hariç)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """JPEG başlığından (width, height) oku; decode yapmaz. JPEG değilse None."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+def reduction_factor(width, height, max_side):
+    """Uzun kenarı max_side altına düşürmeyen en büyük 1/2^k ölçeği"""
+    if max_side <= 0:
+        return 1
+    longest = max(width, height)
+    for factor, _ in _REDUCED_FLAGS:
+        if longest / factor >= max_side:
+            return factor
+    return 1
+
+
+def decode_image(data, max_side=DECODE_MAX_SIDE):
+    """
+    Baytları BGR görüntüye çevir.
+    (image, (original_width, original_height)) döner; decode başarısızsa image None.
+    """
+    if not data:
+        return None, None
+    buffer = np.frombuffer(data, np.uint8)
+    size = jpeg_size(data) if max_side > 0 else None
+    if size is not None:
+        factor = reduction_factor(size[0], size[1], max_side)
+        if factor > 1:
+            image = cv2.imdecode(buffer, dict(_REDUCED_FLAGS)[factor])
+            return (image, size) if image is not None else (None, None)
+
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        return None, None
+    return image, (image.shape[1], image.shape[0])
+
+
+def scale_detections(detections, scale_x, scale_y):
+    """Decode ölçeğindeki tespitleri (bbox/center/area) orijinal görüntü koordinatlarına çevir"""
+    if scale_x == 1 and scale_y == 1:
+        return detections
+    scaled = []
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        bbox = [int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)]
+        scaled.append({
+            **det,
+            "bbox": bbox,
+            "center": [int(det["center"][0] * scale_x), int(det["center"][1] * scale_y)],
+            "area": (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]),
+        })
+    return scaled
+
+
+async def read_frame(request, file=None):
+    """Multipart `file` alanı varsa onu, yoksa ham body'yi (image/jpeg) oku"""
+    if file is not None:
+        return await file.read()
+    return await request.body()
@@ -0,0 +1,234 @@
+"""
+📐 Kamera başına çıkarım boyutu ve döşemeli (tiled) çıkarım
+Her kare için model giriş boyutu (imgsz) seçilir:
+- Sabit: kamera kuralında sayı (ör. 960)
+- "auto": son karelerdeki kalabalığa göre; seyrek sahnede küçülür, küçük (uzak)
+  kişiler çoğaldıkça büyür
+- Her iki durumda kare kendi çözünürlüğünün üzerine büyütülmez (QVGA -> 320)
+
+Döşemeli modda yüksek çözünürlüklü kare örtüşen parçalara bölünür; parçalar ve
+küçültülmüş tam kare tek model çağrısında işlenir, sonuçlar NMS ile birleştirilir.
+Parça kenarına değen kutular atılır (örtüşme sayesinde komşu parça veya tam kare
+kişiyi bütün görür).
+
+INFER_POLICY örneği ("default" tüm kameralar, diğer anahtarlar camera_id):
+    {"default": {"imgsz": "auto"}, "5": {"imgsz": 960, "tiles": "auto"}}
+"""
+
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from nms import non_max_suppression
+
+INFER_SIZES = sorted(int(v) for v in os.getenv("INFER_SIZES", "320,480,640,960,1280").split(","))
+INFER_DEFAULT_SIZE = int(os.getenv("INFER_DEFAULT_SIZE", "640"))
+# Parça örtüşmesi (parça boyutuna oran)
+INFER_TILE_OVERLAP = float(os.getenv("INFER_TILE_OVERLAP", "0.2"))
+# Tam kare dahil bir karedeki en fazla parça
+INFER_MAX_TILES = int(os.getenv("INFER_MAX_TILES", "7"))
+# tiles=auto: ortalama kişi sayısı bunu geçerse veya kişilerin çoğu küçükse döşenir
+INFER_TILE_MIN_PERSONS = float(os.getenv("INFER_TILE_MIN_PERSONS", "15"))
+# Model girişinde bu yükseklikten (px) kısa kişi kutusu "küçük" sayılır
+INFER_SMALL_BOX_PX = float(os.getenv("INFER_SMALL_BOX_PX", "32"))
+INFER_TILE_MERGE_IOU = float(os.getenv("INFER_TILE_MERGE_IOU", "0.5"))
+
+DEFAULT_POLICY = {"imgsz": INFER_DEFAULT_SIZE, "tiles": "off"}
+STRIDE = 32
+EMA_ALPHA = 0.2
+
+
+def load_policy(raw=None):
+    """INFER_POLICY JSON'unu {camera_id | "default": kural} sözlüğüne çevir"""
+    raw = os.getenv("INFER_POLICY", "") if raw is None else raw
+    config = {}
+    if raw.strip():
+        try:
+            config = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"INFER_POLICY geçerli JSON değil: {e}")
+
+    default = {**DEFAULT_POLICY, **config.pop("default", {})}
+    rules = {"default": default}
+    for camera_id, rule in [("default", default)] + list(config.items()):
+        rule = {**default, **rule}
+        if rule["imgsz"] != "auto" and not isinstance(rule["imgsz"], int):
+            raise ValueError(f"INFER_POLICY[{camera_id}].imgsz sayı veya 'auto' olmalı")
+        if rule["tiles"] not in ("off", "on", "auto"):
+            raise ValueError(f"INFER_POLICY[{camera_id}].tiles off | on | auto olmalı")
+        rules[str(camera_id)] = rule
+    return rules
+
+
+def native_size(width, height):
+    """Karenin kendi uzun kenarı (32'ye yuvarlanmış); bunun üzerine büyütülmez"""
+    return int(math.ceil(max(width, height) / STRIDE) * STRIDE)
+
+
+def tile_grid(width, height, tile, overlap=INFER_TILE_OVERLAP, max_tiles=INFER_MAX_TILES - 1):
+    """
+    Kareyi örtüşen kare parçalara böl: [(x0, y0, x1, y1), ...].
+    Parça sayısı max_tiles'ı aşarsa parçalar büyütülür (model girişinde küçültülür).
+    """
+    while True:
+        step = max(1, int(tile * (1 - overlap)))
+        cols = max(1, math.ceil((width - tile) / step) + 1) if width > tile else 1
+        rows = max(1, math.ceil((height - tile) / step) + 1) if height > tile else 1
+        if cols * rows <= max_tiles:
+            break
+        tile = int(tile * 1.25)
+
+    tiles = []
+    for row in range(rows):
+        y0 = 0 if rows == 1 else min(row * step, height - tile)
+        for col in range(cols):
+            x0 = 0 if cols == 1 else min(col * step, width - tile)
+            tiles.append((x0, y0, min(x0 + tile, width), min(y0 + tile, height)))
+    return tiles
+
+
+def merge_tile_detections(tiles, tile_results, full_result, width, height, iou_threshold=INFER_TILE_MERGE_IOU):
+    """
+    Parça (tile koordinatlı) ve tam kare sonuçlarını kare koordinatlarında birleştir.
+    Sonuçlar (boxes Nx4 [x1, y1, x2, y2], scores N) biçimindedir.
+    """
+    boxes = [full_result[0]]
+    scores = [full_result[1]]
+    for (x0, y0, x1, y1), (tile_boxes, tile_scores) in zip(tiles, tile_results):
+        if len(tile_boxes) == 0:
+            continue
+        shifted = tile_boxes + np.array([x0, y0, x0, y0], dtype=np.float32)
+        # Karenin değil parçanın iç kenarına değen kutu kesik kişi olabilir
+        margin = 2
+        cut = np.zeros(len(shifted), dtype=bool)
+        if x0 > 0:
+            cut |= shifted[:, 0] <= x0 + margin
+        if y0 > 0:
+            cut |= shifted[:, 1] <= y0 + margin
+        if x1 < width:
+            cut |= shifted[:, 2] >= x1 - margin
+        if y1 < height:
+            cut |= shifted[:, 3] >= y1 - margin
+        boxes.append(shifted[~cut])
+        scores.append(tile_scores[~cut])
+
+    boxes = np.concatenate(boxes).astype(np.float32).reshape(-1, 4)
+    scores = np.concatenate(scores).astype(np.float32)
+    if len(boxes) == 0:
+        return boxes, scores
+    xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+    keep = non_max_suppression(xywh, scores, iou_threshold=iou_threshold, containment_threshold=0.8)
+    return boxes[keep], scores[keep]
+
+
+class InferencePlan:
+    __slots__ = ("imgsz", "tiles", "reason")
+
+    def __init__(self, imgsz, tiles=None, reason="fixed"):
+        self.imgsz = imgsz
+        self.tiles = tiles
+        self.reason = reason
+
+    def as_dict(self):
+        return {
+            "imgsz": self.imgsz,
+            "tiles": len(self.tiles) + 1 if self.tiles else 0,
+            "reason": self.reason,
+        }
+
+
+class _CameraLoad:
+    __slots__ = ("persons", "small_ratio")
+
+    def __init__(self):
+        self.persons = None
+        self.small_ratio = 0.0
+
+
+class InferencePolicy:
+    """Kamera kuralları + son karelerin kalabalık ortalaması (EMA)"""
+
+    def __init__(self, rules=None, sizes=INFER_SIZES):
+        self.rules = load_policy() if rules is None else rules
+        self.sizes = sizes
+        self._cameras = {}
+        self._lock = threading.Lock()
+
+    def rule_for(self, camera_id):
+        return self.rules.get(str(camera_id), self.rules["default"])
+
+    def _load(self, camera_id):
+        with self._lock:
+            load = self._cameras.get(camera_id)
+            if load is None:
+                load = self._cameras[camera_id] = _CameraLoad()
+            return load
+
+    def _step(self, size, steps):
+        index = min(range(len(self.sizes)), key=lambda i: abs(self.sizes[i] - size))
+        return self.sizes[max(0, min(len(self.sizes) - 1, index + steps))]
+
+    def plan(self, camera_id, width, height):
+        """Bu kare için giriş boyutu ve (varsa) parçalar"""
+        camera_id = str(camera_id)
+        rule = self.rule_for(camera_id)
+        load = self._load(camera_id)
+        native = native_size(width, height)
+
+        reason = "fixed"
+        imgsz = rule["imgsz"]
+        if imgsz == "auto":
+            imgsz, reason = INFER_DEFAULT_SIZE, "auto"
+            if load.persons is not None:
+                if load.small_ratio > 0.3:
+                    imgsz, reason = self._step(imgsz, 1), "small_persons"
+                elif load.persons < 0.5:
+                    imgsz, reason = self._step(imgsz, -2), "empty"
+                elif load.persons < 2:
+                    imgsz, reason = self._step(imgsz, -1), "sparse"
+        if imgsz >= native:
+            imgsz, reason = native, "native" if reason == "fixed" else reason
+
+        tiles = None
+        dense = load.persons is not None and (
+            load.persons >= INFER_TILE_MIN_PERSONS or load.small_ratio > 0.5
+        )
+        if max(width, height) > 1.5 * imgsz and (rule["tiles"] == "on" or (rule["tiles"] == "auto" and dense)):
+            tiles = tile_grid(width, height, imgsz)
+            reason = "tiled"
+        return InferencePlan(imgsz, tiles, reason)
+
+    def observe(self, camera_id, person_count, boxes, plan, width, height):
+        """
+        Kare sonucu ile kamera kalabalık ortalamasını güncelle.
+        boxes: bu çıkarımın kutuları (width x height girişte), person_count: karedeki toplam
+        """
+        load = self._load(str(camera_id))
+        count = person_count
+        if len(boxes):
+            # Kutu yüksekliği tam kare model girişi ölçeğinde
+            scale = plan.imgsz / max(width, height)
+            heights = (np.asarray(boxes)[:, 3] - np.asarray(boxes)[:, 1]) * scale
+            small_ratio = float(np.mean(heights < INFER_SMALL_BOX_PX))
+        else:
+            small_ratio = 0.0
+        with self._lock:
+            if load.persons is None:
+                load.persons, load.small_ratio = float(count), small_ratio
+            else:
+                load.persons += EMA_ALPHA * (count - load.persons)
+                load.small_ratio += EMA_ALPHA * (small_ratio - load.small_ratio)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rules": self.rules,
+                "sizes": self.sizes,
+                "cameras": {
+                    camera_id: {"persons": round(load.persons or 0.0, 2), "small_ratio": round(load.small_ratio, 3)}
+                    for camera_id, load in self._cameras.items()
+                },
+            }
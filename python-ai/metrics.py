@@ -0,0 +1,257 @@
+"""
+📊 Prometheus metrikleri (bağımlılıksız)
+Counter / Gauge / Histogram ve Prometheus text formatı (0.0.4). prometheus_client
+gerekmez; her ölçüm bir kilit + sözlük güncellemesidir, production'da açık kalabilir.
+
+Kare başına aşama süreleri FrameMetrics ile ölçülür: aynı değerler hem
+`cityv_stage_duration_seconds` histogramına hem de yanıttaki `analysis.stages_ms`
+alanına yazılır.
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS", "on") == "on"
+# Histogramlarda kamera etiketi (kamera x aşama x bucket seri sayısını büyütür)
+METRICS_HISTOGRAM_CAMERA = os.getenv("METRICS_HISTOGRAM_CAMERA", "off") == "on"
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Değer okuma anında hesaplanır: function() -> {etiket tuple'ı: değer}"""
+        self._function = function
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        if self._function is not None:
+            try:
+                items += [(tuple(str(v) for v in key), value) for key, value in self._function().items()]
+            except Exception as e:
+                print(f"⚠️ {self.name} okunamadı: {e}")
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Bucket sayaçları (son eleman +Inf), toplam
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            return self._metrics[metric.name]
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+FRAMES = registry.counter(
+    "cityv_frames_total", "Analiz edilen kareler (result: analyzed, reused, error)",
+    ("service", "camera", "backend", "result"))
+PERSONS = registry.counter(
+    "cityv_persons_detected_total", "Tespit edilen kişi toplamı", ("service", "camera", "backend"))
+PERSONS_CURRENT = registry.gauge(
+    "cityv_persons_current", "Son karedeki kişi sayısı", ("service", "camera"))
+ERRORS = registry.counter(
+    "cityv_errors_total", "Kare analizinde hata (type: istisna sınıfı)", ("service", "camera", "type"))
+INFLIGHT = registry.gauge(
+    "cityv_inflight_frames", "Şu an analiz edilen kareler", ("service",))
+QUEUE_DEPTH = registry.gauge(
+    "cityv_queue_depth", "Kuyruk/tampon doluluğu", ("service", "queue"))
+STAGE_SECONDS = registry.histogram(
+    "cityv_stage_duration_seconds", "Kare başına aşama süresi",
+    ("service", "stage", "backend", "camera") if METRICS_HISTOGRAM_CAMERA else ("service", "stage", "backend"))
+
+
+class FrameMetrics:
+    """Bir karenin aşama süreleri; finish() ile metriklere yazılır"""
+
+    __slots__ = ("service", "camera", "backend", "stages", "started")
+
+    def __init__(self, service, camera_id, backend):
+        self.service = service
+        self.camera = camera_id or "0"
+        self.backend = backend
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - began) * 1000)
+
+    def add(self, name, elapsed_ms):
+        """Dışarıda ölçülmüş süre (ör. batch bekleme) veya aynı aşamanın tekrarı"""
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def as_dict(self):
+        return {name: round(ms, 2) for name, ms in self.stages.items()}
+
+    def finish(self, result, person_count=None):
+        """Aşama histogramları, kare ve kişi sayaçları"""
+        self.stages["total"] = (time.perf_counter() - self.started) * 1000
+        if not METRICS_ENABLED:
+            return
+        labels = {"service": self.service, "backend": self.backend}
+        if METRICS_HISTOGRAM_CAMERA:
+            labels["camera"] = self.camera
+        for name, elapsed_ms in self.stages.items():
+            STAGE_SECONDS.observe(elapsed_ms / 1000, stage=name, **labels)
+        FRAMES.inc(service=self.service, camera=self.camera, backend=self.backend, result=result)
+        if person_count is not None:
+            PERSONS.inc(person_count, service=self.service, camera=self.camera, backend=self.backend)
+            PERSONS_CURRENT.set(person_count, service=self.service, camera=self.camera)
+
+
+def track_frames(service, backend):
+    """
+    analyze_frame(contents, camera_id, ...) sarmalayıcısı: eşzamanlı kare sayısı
+    ve hata sayaçları (HTTP, WebSocket ve yoklayıcı yolları birlikte sayılır)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            camera_id = args[1] if len(args) > 1 else kwargs.get("camera_id")
+            INFLIGHT.inc(service=service)
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if METRICS_ENABLED:
+                    ERRORS.inc(service=service, camera=camera_id or "0", type=type(e).__name__)
+                    FRAMES.inc(service=service, camera=camera_id or "0", backend=backend, result="error")
+                raise
+            finally:
+                INFLIGHT.dec(service=service)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    return registry.render()
@@ -0,0 +1,204 @@
+"""
+🎞️ Kamera başına hareket kapısı
+Her kamera için son analiz edilen karenin küçük (varsayılan 64px genişlik) gri bir
+kopyası tutulur. Yeni kare JPEG'den doğrudan 1/8 ölçekte gri decode edilip bu
+referansla karşılaştırılır:
+- Değişen piksel oranı eşiğin altındaysa son analiz yeniden kullanılır
+  (tam decode ve tespit hiç yapılmaz).
+- Değişim küçük bir bölgedeyse tespit sadece o bölgede (ROI) çalıştırılır,
+  bölge dışındaki önceki tespitler korunur. İkisi NMS ile birleştirilir; ROI
+  sınırındaki kişi iki kez sayılmaz.
+- Aksi halde tam analiz yapılır.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from nms import non_max_suppression
+
+MOTION_GATE = os.getenv("MOTION_GATE", "off") == "on"
+MOTION_GATE_WIDTH = int(os.getenv("MOTION_GATE_WIDTH", "64"))
+# Gri seviye farkı bu değerden büyük olan piksel "değişmiş" sayılır
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "25"))
+# Değişen piksel oranı bunun altındaysa kare statik sayılır
+MOTION_CHANGED_RATIO = float(os.getenv("MOTION_CHANGED_RATIO", "0.01"))
+# Değişen bölge karenin bu oranından küçükse sadece o bölgede tespit yapılır (0 = kapalı)
+MOTION_ROI_MAX_RATIO = float(os.getenv("MOTION_ROI_MAX_RATIO", "0.35"))
+# Son tam analizden bu kadar süre geçtiyse hareket olmasa da tam analiz yapılır
+MOTION_MAX_REUSE_S = float(os.getenv("MOTION_MAX_REUSE_S", "60"))
+# ROI kenar boşluğu (kare boyutuna oran)
+MOTION_ROI_PADDING = 0.08
+
+
+def tiny_frame(data, width=MOTION_GATE_WIDTH):
+    """JPEG'den küçük, hafif bulanık gri kare üret (tam decode yapmadan)"""
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8) if data else None
+    if gray is None:
+        return None
+    height = max(1, round(gray.shape[0] * width / gray.shape[1]))
+    tiny = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(tiny, (3, 3), 0)
+
+
+class MotionDecision:
+    """
+    probe() sonucu.
+    reused: önceki analiz kullanılabilir (payload dolu)
+    roi: (x0, y0, x1, y1) kare oranı cinsinden değişen bölge veya None (tam kare)
+    """
+
+    def __init__(self, tiny, changed_ratio, reused=False, roi=None, payload=None, age_ms=None):
+        self.tiny = tiny
+        self.changed_ratio = changed_ratio
+        self.reused = reused
+        self.roi = roi
+        self.payload = payload
+        self.age_ms = age_ms
+
+    def roi_pixels(self, width, height):
+        """ROI'yi verilen görüntü boyutunda piksel kutusuna çevir: (x0, y0, x1, y1)"""
+        x0, y0, x1, y1 = self.roi
+        return int(x0 * width), int(y0 * height), int(np.ceil(x1 * width)), int(np.ceil(y1 * height))
+
+    def reuse_analysis(self, start_time, **overrides):
+        """Önceki analiz sonucunu bu kare için güncel zaman ve süreyle döndür"""
+        return {
+            **self.payload["analysis"],
+            **overrides,
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+            "timestamp": datetime.now().isoformat(),
+            "reused": True,
+            "motion": self.as_dict(),
+        }
+
+    def as_dict(self):
+        return {
+            "reused": self.reused,
+            "changed_ratio": round(float(self.changed_ratio), 4),
+            "roi": [round(v, 3) for v in self.roi] if self.roi else None,
+            "age_ms": self.age_ms,
+        }
+
+
+def outside_roi(center, roi_pixels):
+    """Tespit merkezi ROI dışında mı (ROI analizinde korunacak önceki tespitler)"""
+    x0, y0, x1, y1 = roi_pixels
+    return not (x0 <= center[0] < x1 and y0 <= center[1] < y1)
+
+
+def merge_roi_detections(kept, fresh, box=None):
+    """
+    ROI dışından korunan önceki tespitlerle ROI'deki yeni tespitleri NMS ile birleştir
+    (merge_tile_detections gibi). Sınırı aşan kişi iki listede de olabilir; çakışmada
+    yeni tespit kalır. box(det) -> [x, y, w, h] (varsayılan: tespit zaten xywh).
+    Sıra korunur: önce eski, sonra yeni tespitler.
+    """
+    detections = list(kept) + list(fresh)
+    if not kept or not fresh:
+        return detections
+    boxes = [box(det) if box else det for det in detections]
+    scores = [0.0] * len(kept) + [1.0] * len(fresh)
+    keep = non_max_suppression(boxes, scores, score_threshold=0.0)
+    return [detections[i] for i in sorted(keep.tolist())]
+
+
+def bbox_xywh(det):
+    """{"bbox": [x1, y1, x2, y2]} tespitinden [x, y, w, h]"""
+    x1, y1, x2, y2 = det["bbox"]
+    return [x1, y1, x2 - x1, y2 - y1]
+
+
+class _CameraState:
+    __slots__ = ("reference", "payload", "analyzed_at", "full_at")
+
+    def __init__(self, reference, payload, analyzed_at, full_at):
+        self.reference = reference
+        self.payload = payload
+        self.analyzed_at = analyzed_at
+        self.full_at = full_at
+
+
+class MotionGate:
+    """Kamera başına referans kare ve son analiz sonucunu tutar"""
+
+    def __init__(self, pixel_threshold=MOTION_PIXEL_THRESHOLD, changed_ratio=MOTION_CHANGED_RATIO,
+                 roi_max_ratio=MOTION_ROI_MAX_RATIO, max_reuse_s=MOTION_MAX_REUSE_S):
+        self.pixel_threshold = pixel_threshold
+        self.changed_ratio = changed_ratio
+        self.roi_max_ratio = roi_max_ratio
+        self.max_reuse_s = max_reuse_s
+
+        self._lock = threading.Lock()
+        self._states = {}
+
+        # Metrikler
+        self.frames = 0
+        self.reused = 0
+        self.roi = 0
+        self.full = 0
+
+    def probe(self, camera_id, data):
+        """Kareyi referansla karşılaştır (bloklayan, executor üzerinden çağrılmalı)"""
+        tiny = tiny_frame(data)
+        with self._lock:
+            self.frames += 1
+            state = self._states.get(camera_id)
+
+        now = time.monotonic()
+        if (tiny is None or state is None or state.reference.shape != tiny.shape
+                or now - state.full_at > self.max_reuse_s):
+            self._count("full")
+            return MotionDecision(tiny, 1.0)
+
+        mask = cv2.absdiff(tiny, state.reference) > self.pixel_threshold
+        changed_ratio = float(mask.mean())
+        if changed_ratio < self.changed_ratio:
+            self._count("reused")
+            return MotionDecision(tiny, changed_ratio, reused=True, payload=state.payload,
+                                  age_ms=int((now - state.analyzed_at) * 1000))
+
+        roi = self._changed_region(mask) if self.roi_max_ratio > 0 else None
+        self._count("roi" if roi else "full")
+        return MotionDecision(tiny, changed_ratio, roi=roi, payload=state.payload if roi else None)
+
+    def _changed_region(self, mask):
+        ys, xs = np.nonzero(mask)
+        height, width = mask.shape
+        x0 = max(0.0, xs.min() / width - MOTION_ROI_PADDING)
+        y0 = max(0.0, ys.min() / height - MOTION_ROI_PADDING)
+        x1 = min(1.0, (xs.max() + 1) / width + MOTION_ROI_PADDING)
+        y1 = min(1.0, (ys.max() + 1) / height + MOTION_ROI_PADDING)
+        if (x1 - x0) * (y1 - y0) > self.roi_max_ratio:
+            return None
+        return (x0, y0, x1, y1)
+
+    def _count(self, kind):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def commit(self, camera_id, decision, payload):
+        """Analiz edilen kareyi yeni referans, sonucunu yeniden kullanılacak sonuç yap"""
+        if decision.tiny is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            previous = self._states.get(camera_id)
+            # ROI analizinde bölge dışı eski tespitler taşındığı için tam analiz zamanı korunur
+            full_at = previous.full_at if decision.roi and previous is not None else now
+            self._states[camera_id] = _CameraState(decision.tiny, payload, now, full_at)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cameras": len(self._states),
+                "frames": self.frames,
+                "reused": self.reused,
+                "roi": self.roi,
+                "full": self.full,
+                "reuse_ratio": round(self.reused / self.frames, 3) if self.frames else 0.0,
+            }
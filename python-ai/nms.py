@@ -0,0 +1,66 @@
+"""
+🎯 Vektörel non-maximum suppression
+Kutular NumPy dizileri üzerinde karşılaştırılır; her adımda seçilen kutu kalan
+tüm kutularla tek seferde kıyaslanır. IoU kutu boyutuna göre ölçeklendiği için
+uzaktaki küçük kişiler birbirine yakın olsa da birleştirilmez.
+"""
+
+import os
+
+import numpy as np
+
+NMS_IOU_THRESHOLD = float(os.getenv("NMS_IOU_THRESHOLD", "0.4"))
+NMS_SCORE_THRESHOLD = float(os.getenv("NMS_SCORE_THRESHOLD", "0.0"))
+# Küçük kutunun bu oranı büyük kutunun içindeyse aynı kişi sayılır
+# (ör. upperbody kutusu fullbody kutusunun içinde). 1.0 = kapalı
+NMS_CONTAINMENT_THRESHOLD = float(os.getenv("NMS_CONTAINMENT_THRESHOLD", "0.7"))
+
+
+def non_max_suppression(boxes, scores, iou_threshold=NMS_IOU_THRESHOLD,
+                        score_threshold=NMS_SCORE_THRESHOLD,
+                        containment_threshold=NMS_CONTAINMENT_THRESHOLD):
+    """
+    boxes: Nx4 [x, y, w, h], scores: N
+    Tutulan kutuların indekslerini skora göre azalan sırada döndürür.
+    Eşit skorlarda giriş sırası korunur.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    candidates = np.flatnonzero(scores >= score_threshold)
+    if len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1 = boxes[:, 0]
+    y1 = boxes[:, 1]
+    x2 = x1 + boxes[:, 2]
+    y2 = y1 + boxes[:, 3]
+    areas = np.maximum(boxes[:, 2], 0) * np.maximum(boxes[:, 3], 0)
+
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    keep = []
+    while len(order) > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        if len(rest) == 0:
+            break
+
+        inter_w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        inter_h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = inter_w * inter_h
+
+        union = areas[i] + areas[rest] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        suppress = iou > iou_threshold
+
+        if containment_threshold < 1.0:
+            smaller = np.minimum(areas[i], areas[rest])
+            contained = np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0)
+            suppress |= contained > containment_threshold
+
+        order = rest[~suppress]
+
+    return np.asarray(keep, dtype=np.int64)
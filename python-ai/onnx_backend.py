@@ -0,0 +1,151 @@
+"""
+🪶 ONNX Runtime YOLOv8 backend (torch/ultralytics gerektirmez)
+Model bir kez `python export_onnx.py export` ile ONNX'e çevrilir; production'da
+sadece onnxruntime + OpenCV + NumPy kullanılır. INT8 model (`export_onnx.py quantize`)
+aynı şekilde yüklenir.
+
+Ön işleme ultralytics ile aynıdır (letterbox, 114 dolgu, RGB, /255). Dinamik boyutlu
+modellerde kare en yakın 32 katına dolgulanır (640x480 -> 640x480, kare yerine),
+böylece 4:3 karelerde gereksiz piksel işlenmez. Çıktı (xyxy, skor) dizileridir.
+
+ONNX_PROVIDER=openvino, onnxruntime-openvino paketi kuruluysa OpenVINO execution
+provider'ı kullanır (Intel CPU'larda ek hızlanma), yoksa CPU provider'a düşer.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from nms import non_max_suppression
+
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "yolov8n.onnx")
+ONNX_PROVIDER = os.getenv("ONNX_PROVIDER", "cpu")
+# Inference başına ORT thread sayısı (0 = onnxruntime varsayılanı, tüm çekirdekler)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+ONNX_IMGSZ = int(os.getenv("ONNX_IMGSZ", "640"))
+# ultralytics predict varsayılanı ile aynı
+ONNX_IOU_THRESHOLD = float(os.getenv("ONNX_IOU_THRESHOLD", "0.7"))
+ONNX_MAX_DET = int(os.getenv("ONNX_MAX_DET", "300"))
+
+PROVIDERS = {
+    "cpu": ["CPUExecutionProvider"],
+    "openvino": ["OpenVINOExecutionProvider", "CPUExecutionProvider"],
+}
+
+PERSON_CLASS = 0
+STRIDE = 32
+
+
+def letterbox(image, new_shape, pad_value=114):
+    """
+    Oranı koruyarak new_shape (h, w) içine sığdır ve ortala.
+    (görüntü, ölçek, (pad_x, pad_y)) döner.
+    """
+    height, width = image.shape[:2]
+    scale = min(new_shape[0] / height, new_shape[1] / width)
+    resized_w, resized_h = int(round(width * scale)), int(round(height * scale))
+    pad_x = (new_shape[1] - resized_w) / 2
+    pad_y = (new_shape[0] - resized_h) / 2
+    if (resized_w, resized_h) != (width, height):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(pad_value, pad_value, pad_value))
+    return image, scale, (left, top)
+
+
+def rect_shape(image_shape, imgsz):
+    """Uzun kenarı imgsz olacak şekilde, 32'nin katına yuvarlanmış giriş boyutu (h, w)"""
+    height, width = image_shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    return (int(np.ceil(height * scale / STRIDE) * STRIDE),
+            int(np.ceil(width * scale / STRIDE) * STRIDE))
+
+
+class OnnxYolo:
+    """YOLOv8 ONNX oturumu; çağrı başına bir veya daha fazla BGR kare işler"""
+
+    def __init__(self, path=ONNX_MODEL_PATH, provider=ONNX_PROVIDER, threads=ONNX_THREADS,
+                 imgsz=ONNX_IMGSZ, iou_threshold=ONNX_IOU_THRESHOLD, max_det=ONNX_MAX_DET):
+        import onnxruntime as ort
+
+        if provider not in PROVIDERS:
+            raise ValueError(f"Bilinmeyen ONNX_PROVIDER: {provider} ({', '.join(PROVIDERS)})")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        available = set(ort.get_available_providers())
+        providers = [p for p in PROVIDERS[provider] if p in available]
+
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        _, _, height, width = model_input.shape
+        # Sabit boyutlu export'ta (dynamic=False) giriş hep aynı boyuttadır
+        self.fixed_shape = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+        batch = model_input.shape[0]
+        self.max_batch = batch if isinstance(batch, int) else None
+        self.imgsz = self.fixed_shape[1] if self.fixed_shape else imgsz
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+        self.providers = self.session.get_providers()
+        print(f"🪶 ONNX model yüklendi: {path} ({', '.join(self.providers)})")
+
+    def preprocess(self, image, imgsz=None):
+        shape = self.fixed_shape or rect_shape(image.shape, imgsz or self.imgsz)
+        padded, scale, pad = letterbox(image, shape)
+        blob = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, scale, pad
+
+    def __call__(self, images, conf=0.25, imgsz=None):
+        """
+        images: BGR kare listesi. imgsz sadece dinamik boyutlu modellerde uygulanır.
+        Her kare için (boxes Nx4 [x1, y1, x2, y2] float32, scores N float32) döner.
+        """
+        prepared = [self.preprocess(image, imgsz) for image in images]
+
+        # Aynı giriş boyutundaki kareler tek çağrıda işlenir
+        groups = {}
+        for i, (blob, _, _) in enumerate(prepared):
+            groups.setdefault(blob.shape, []).append(i)
+
+        outputs = [None] * len(images)
+        for indices in groups.values():
+            chunk = self.max_batch or len(indices)
+            for start in range(0, len(indices), chunk):
+                part = indices[start:start + chunk]
+                batch = np.stack([prepared[i][0] for i in part])
+                predictions = self.session.run(None, {self.input_name: batch})[0]
+                for i, prediction in zip(part, predictions):
+                    outputs[i] = self.postprocess(prediction, prepared[i][1], prepared[i][2],
+                                                  images[i].shape, conf)
+        return outputs
+
+    def postprocess(self, prediction, scale, pad, image_shape, conf):
+        """prediction: (4 + sınıf, N) -> orijinal kare koordinatlarında kişi kutuları"""
+        scores = prediction[4 + PERSON_CLASS]
+        # Sadece kişi sınıfının en olası sınıf olduğu adaylar (ultralytics classes=[0] ile aynı)
+        candidates = np.flatnonzero((scores >= conf) & (prediction[4:].argmax(axis=0) == PERSON_CLASS))
+        if len(candidates) == 0:
+            return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32)
+
+        cx, cy, w, h = prediction[:4, candidates]
+        scores = scores[candidates]
+        xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        keep = non_max_suppression(xywh, scores, iou_threshold=self.iou_threshold,
+                                   score_threshold=conf, containment_threshold=1.0)[:self.max_det]
+        xywh = xywh[keep]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = (xywh[:, 0] - pad[0]) / scale
+        boxes[:, 1] = (xywh[:, 1] - pad[1]) / scale
+        boxes[:, 2] = boxes[:, 0] + xywh[:, 2] / scale
+        boxes[:, 3] = boxes[:, 1] + xywh[:, 3] / scale
+        height, width = image_shape[:2]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+        return boxes.astype(np.float32), scores[keep].astype(np.float32)
@@ -0,0 +1,93 @@
+"""
+🚦 Başlangıç durumu: liveness (/) ve readiness (/ready)
+Port hemen açılır; model yükleme, ısıtma ve bağlantılar arka planda yapılır.
+Hazır olana kadar `/ready` ve analiz endpoint'leri 503 + Retry-After döner, böylece
+rolling restart / autoscale sırasında yeni worker'a kare gönderilmez. Yükleme
+başarısız olursa liveness da 503 döner ve orkestratör process'i yeniden başlatır.
+
+Her fazın (import, model, ısıtma, database ...) süresi loglanır ve `/ready`
+yanıtında `phases_ms` olarak görünür.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+READY_RETRY_AFTER_S = int(os.getenv("READY_RETRY_AFTER_S", "1"))
+
+
+class Startup:
+    """Arka plan yükleme görevi ve faz süreleri"""
+
+    def __init__(self, service, started=None):
+        self.service = service
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+        self.ready = False
+        self.error = None
+        self.ready_after_ms = None
+        self._task = None
+
+    def record(self, name, elapsed_ms):
+        self.phases[name] = round(elapsed_ms, 1)
+        print(f"⏱️ {self.service} başlangıç fazı {name}: {elapsed_ms:.0f}ms")
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - began) * 1000)
+
+    def run(self, load):
+        """load: async fonksiyon; arka planda çalışır, bitince servis hazır olur"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._load(load))
+
+    async def _load(self, load):
+        try:
+            await load()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ {self.service} başlatılamadı: {self.error}")
+            return
+        self.ready = True
+        self.ready_after_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        print(f"✅ {self.service} hazır ({self.ready_after_ms:.0f}ms)")
+
+    async def stop(self):
+        """Yükleme sürüyorsa iptal et (kapanış)"""
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "ready_after_ms": self.ready_after_ms,
+            "phases_ms": dict(self.phases),
+        }
+
+    def not_ready(self):
+        """Hazır değilken analiz isteklerine verilecek yanıt"""
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(READY_RETRY_AFTER_S)},
+            content={"success": False, "error": "Servis henüz hazır değil", **self.status()},
+        )
+
+    def readiness(self):
+        if self.ready:
+            return self.status()
+        return self.not_ready()
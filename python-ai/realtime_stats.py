@@ -0,0 +1,160 @@
+"""
+⏱️ Bellekte kayan pencere istatistikleri
+Kamera ve bölge başına person_count / crowd_density için 1 dakika, 5 dakika ve
+1 saatlik halka tamponlar tutulur. Her kare O(1) günceller; sorgu sadece sabit
+sayıda dilimi toplar, veritabanına gitmez.
+
+Her pencere 60 dilimden oluşur (1m: 1 sn, 5m: 5 sn, 1h: 60 sn). Dilim sırası
+geldiğinde içindeki eski değerler sıfırlanır, böylece süresi dolan kareler
+ayrıca silinmez.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+REALTIME_STATS_ENABLED = os.getenv("REALTIME_STATS", "on") == "on"
+# Bu kadar saniye kare gelmeyen kamera/bölge serisi bellekten atılır
+REALTIME_STATS_IDLE_S = float(os.getenv("REALTIME_STATS_IDLE_S", "3600"))
+
+# (ad, dilim sayısı, dilim süresi sn)
+WINDOWS = (("1m", 60, 1), ("5m", 60, 5), ("1h", 60, 60))
+
+
+class RingWindow:
+    """Sabit sayıda zaman dilimli halka tampon"""
+
+    __slots__ = ("slots", "resolution", "buckets", "count", "person_sum", "person_max",
+                 "density_sum", "density_max")
+
+    def __init__(self, slots, resolution):
+        self.slots = slots
+        self.resolution = resolution
+        self.buckets = [-1] * slots
+        self.count = [0] * slots
+        self.person_sum = [0] * slots
+        self.person_max = [0] * slots
+        self.density_sum = [0.0] * slots
+        self.density_max = [0.0] * slots
+
+    def add(self, now, person_count, crowd_density):
+        bucket = int(now // self.resolution)
+        i = bucket % self.slots
+        if self.buckets[i] != bucket:
+            # Dilim bir tur önceki veriyi tutuyor; yeni dilim olarak sıfırla
+            self.buckets[i] = bucket
+            self.count[i] = 1
+            self.person_sum[i] = self.person_max[i] = person_count
+            self.density_sum[i] = self.density_max[i] = crowd_density
+            return
+        self.count[i] += 1
+        self.person_sum[i] += person_count
+        self.density_sum[i] += crowd_density
+        if person_count > self.person_max[i]:
+            self.person_max[i] = person_count
+        if crowd_density > self.density_max[i]:
+            self.density_max[i] = crowd_density
+
+    def summary(self, now):
+        oldest = int(now // self.resolution) - self.slots
+        count = person_sum = person_max = 0
+        density_sum = density_max = 0.0
+        for i, bucket in enumerate(self.buckets):
+            if bucket <= oldest:
+                continue
+            count += self.count[i]
+            person_sum += self.person_sum[i]
+            density_sum += self.density_sum[i]
+            person_max = max(person_max, self.person_max[i])
+            density_max = max(density_max, self.density_max[i])
+        if count == 0:
+            return {"analysis_count": 0, "avg_person_count": None, "max_person_count": None,
+                    "avg_crowd_density": None, "max_crowd_density": None}
+        return {
+            "analysis_count": count,
+            "avg_person_count": round(person_sum / count, 2),
+            "max_person_count": person_max,
+            "avg_crowd_density": round(density_sum / count, 4),
+            "max_crowd_density": round(density_max, 4),
+        }
+
+
+class _Series:
+    __slots__ = ("windows", "last_person_count", "last_crowd_density", "last_update")
+
+    def __init__(self):
+        self.windows = [RingWindow(slots, resolution) for _, slots, resolution in WINDOWS]
+        self.last_person_count = 0
+        self.last_crowd_density = 0.0
+        self.last_update = 0.0
+
+    def add(self, now, person_count, crowd_density):
+        for window in self.windows:
+            window.add(now, person_count, crowd_density)
+        self.last_person_count = person_count
+        self.last_crowd_density = crowd_density
+        self.last_update = now
+
+    def summary(self, now):
+        windows = {name: window.summary(now) for (name, _, _), window in zip(WINDOWS, self.windows)}
+        five_min = windows["5m"]
+        return {
+            # v_ai_realtime_stats ile aynı anlam: son 5 dakikanın ortalaması
+            "current_person_count": round(five_min["avg_person_count"]) if five_min["analysis_count"] else None,
+            "current_crowd_density": five_min["avg_crowd_density"],
+            "last_person_count": self.last_person_count,
+            "last_crowd_density": round(self.last_crowd_density, 4),
+            "last_update": datetime.fromtimestamp(self.last_update).isoformat(),
+            "windows": windows,
+        }
+
+
+class RealtimeStats:
+    """(camera_id, zone) ve zone anahtarlı kayan pencere serileri"""
+
+    def __init__(self, idle_s=REALTIME_STATS_IDLE_S):
+        self.idle_s = idle_s
+        self._cameras = {}
+        self._zones = {}
+        self._lock = threading.Lock()
+
+    def record(self, camera_id, location_zone, person_count, crowd_density, now=None):
+        now = time.time() if now is None else now
+        camera_key = (str(camera_id), location_zone or "Unknown")
+        with self._lock:
+            camera = self._cameras.get(camera_key)
+            if camera is None:
+                camera = self._cameras[camera_key] = _Series()
+            zone = self._zones.get(camera_key[1])
+            if zone is None:
+                zone = self._zones[camera_key[1]] = _Series()
+            camera.add(now, person_count, crowd_density)
+            zone.add(now, person_count, crowd_density)
+
+    def snapshot(self, camera_id=None, location_zone=None, now=None):
+        """Filtrelenmiş kamera ve bölge özetleri (DB sorgusu yok)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evict(now)
+            cameras = [
+                {"camera_id": key[0], "location_zone": key[1], **series.summary(now)}
+                for key, series in self._cameras.items()
+                if (camera_id is None or key[0] == str(camera_id))
+                and (location_zone is None or key[1] == location_zone)
+            ]
+            zones = [
+                {"location_zone": zone, **series.summary(now)}
+                for zone, series in self._zones.items()
+                if location_zone is None or zone == location_zone
+            ] if camera_id is None else []
+        return {
+            "generated_at": datetime.fromtimestamp(now).isoformat(),
+            "cameras": cameras,
+            "zones": zones,
+        }
+
+    def _evict(self, now):
+        for series_map in (self._cameras, self._zones):
+            for key in [k for k, s in series_map.items() if now - s.last_update > self.idle_s]:
+                del series_map[key]
@@ -0,0 +1,425 @@
+"""
+🧩 Kameraya göre bölünmüş çok process'li çıkarım
+Tek bir ön process (uvicorn) kareleri decode eder ve N çıkarım worker process'ine
+dağıtır. Her worker modeli bir kez yükler; bellek bütçesi worker sayısıyla sabittir.
+
+- Dağıtım: camera_id tutarlı hash (consistent hashing) halkasıyla worker'a eşlenir.
+  Aynı kameranın kareleri hep aynı worker'a, sırayla gider; worker sayısı
+  değişince sadece ~1/N kamera yer değiştirir.
+- Kare aktarımı: her worker'ın `multiprocessing.shared_memory` üzerinde sabit
+  sayıda slotu vardır. Ön process decode edilmiş kareyi bir slota yazar, worker aynı
+  belleği kopyalamadan ndarray olarak okur. Kuyruktan sadece slot numarası ve şekil geçer.
+- Sonuçlar (kutular, skorlar, zamanlama) ortak bir sonuç kuyruğuyla döner.
+- Worker kendi kuyruğundaki kareleri mikro-batch'ler (InferenceBatcher ile aynı kurallar).
+
+Kişi takibi, hareket kapısı ve çıkarım politikası gibi kamera durumu ön process'te,
+tek yerde kalır. Serbest slot yoksa gönderim bekler (geri basınç).
+Ölen worker'ın bekleyen işleri hatayla biter, slotları geri verilir ve worker
+AI_SHARD_RESTART_BACKOFF_S sonra aynı paylaşımlı bellekle yeniden başlatılır.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from bisect import bisect
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batching import BatchInfo
+from executors import run_in_thread
+
+SHARD_WORKERS = int(os.getenv("AI_SHARD_WORKERS", "0"))  # 0 = kapalı (tek process, InferenceBatcher)
+SHARD_SLOTS = int(os.getenv("AI_SHARD_SLOTS", "4"))
+# Bir slota sığan en fazla piksel verisi (parçalı çıkarımda tüm parçalar + tam kare)
+SHARD_SLOT_MB = float(os.getenv("AI_SHARD_SLOT_MB", "8"))
+# Worker başına torch/ONNX thread sayısı (çekirdekler worker'lar arasında paylaşılır)
+SHARD_THREADS = int(os.getenv("AI_SHARD_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, SHARD_WORKERS)))))
+SHARD_RING_REPLICAS = int(os.getenv("AI_SHARD_RING_REPLICAS", "64"))
+SHARD_READY_TIMEOUT_S = float(os.getenv("AI_SHARD_READY_TIMEOUT_S", "120"))
+# Ölen worker'ın yeniden başlatılmadan önce beklenecek süre (model yükleme döngüsüne girmesin)
+SHARD_RESTART_BACKOFF_S = float(os.getenv("AI_SHARD_RESTART_BACKOFF_S", "5"))
+# Worker'lar bu aralıkla kontrol edilir
+SHARD_CHECK_INTERVAL_S = 1.0
+
+# Slot içindeki görüntüler bu sınıra hizalanır
+ALIGN = 64
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Tutarlı hash halkası: anahtar -> düğüm (her düğüm `replicas` sanal noktayla)"""
+
+    def __init__(self, nodes, replicas=SHARD_RING_REPLICAS):
+        points = sorted((_hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        index = bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[index]
+
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _worker_main(index, backend, shm_name, slot_bytes, threads, requests, results, max_batch_size, max_wait_ms):
+    """Worker process: modeli yükle, slotlardaki kareleri batch'leyerek işle"""
+    # Thread sayıları backend modülleri import edilmeden ayarlanmalı
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ.setdefault("ONNX_THREADS", str(threads))
+    from detectors import registry
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        started = time.perf_counter()
+        try:
+            registry.warm_up_local([backend])
+        except Exception as e:
+            results.put(("failed", index, repr(e)))
+            return
+        results.put(("ready", index, (time.perf_counter() - started) * 1000))
+
+        stopping = False
+        while not stopping:
+            first = requests.get()
+            if first is None:
+                break
+            batch = [first]
+            size = len(first[2])
+
+            # Bekleyenleri hemen al, sonra pencere dolana kadar bekle
+            deadline = first[4] + max_wait_ms / 1000.0
+            while size < max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    job = requests.get_nowait() if remaining <= 0 else requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+                size += len(job[2])
+
+            groups = {}
+            for job in batch:
+                groups.setdefault(job[3], []).append(job)
+
+            for imgsz, group in groups.items():
+                # Slot belleğine kopyasız görünümler (sığmayan kareler kuyrukla gelir)
+                images = [
+                    item if isinstance(item, np.ndarray) else
+                    np.ndarray(item[1], dtype=np.uint8, buffer=shm.buf, offset=job[1] * slot_bytes + item[0])
+                    for job in group for item in job[2]
+                ]
+                began = time.monotonic()
+                try:
+                    output = registry.detect_batch(backend, images, imgsz)
+                except Exception as e:
+                    for job in group:
+                        results.put(("error", job[0], repr(e)))
+                    continue
+                finally:
+                    del images
+                inference_ms = (time.monotonic() - began) * 1000
+                offset = 0
+                for job in group:
+                    count = len(job[2])
+                    results.put((
+                        "result", job[0], output[offset:offset + count],
+                        (began - job[4]) * 1000, inference_ms, size,
+                    ))
+                    offset += count
+    finally:
+        shm.close()
+
+
+class _Shard:
+    __slots__ = ("index", "process", "requests", "shm", "free", "pending", "restarts", "died_at")
+
+    def __init__(self, index, process, requests, shm, slots):
+        self.index = index
+        self.process = process
+        self.requests = requests
+        self.shm = shm
+        self.free = asyncio.Queue()
+        for slot in range(slots):
+            self.free.put_nowait(slot)
+        # Worker'da işlenen işler (job_id kümesi)
+        self.pending = set()
+        self.restarts = 0
+        # Ölümün fark edildiği an (yeniden başlatma bekleniyor), yoksa None
+        self.died_at = None
+
+
+class ShardedInference:
+    """
+    InferenceBatcher ile aynı arayüz (start/stop/submit/submit_many/queue_depth);
+    submit çağrılarına camera_id verilir, iş o kameranın worker'ına gider.
+    """
+
+    def __init__(
+        self,
+        backend,
+        workers=SHARD_WORKERS,
+        slots=SHARD_SLOTS,
+        slot_mb=SHARD_SLOT_MB,
+        threads=SHARD_THREADS,
+        max_batch_size=8,
+        max_wait_ms=10.0,
+    ):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.slots = max(1, slots)
+        self.slot_bytes = _aligned(int(slot_mb * 1024 * 1024))
+        self.threads = max(1, threads)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.ring = HashRing(range(self.workers))
+        self.load_times_ms = {}
+        self.inline_frames = 0
+        self._shards = []
+        self._jobs = {}
+        self._ids = itertools.count()
+        self._results = None
+        self._reader = None
+        self._loop = None
+        self._ready = {}
+        self._context = None
+
+    async def start(self):
+        if self._shards:
+            return
+        self._loop = asyncio.get_running_loop()
+        # spawn: worker'lar ön process'in thread/torch durumunu devralmaz
+        context = mp.get_context("spawn")
+        self._context = context
+        self._results = context.Queue()
+        for index in range(self.workers):
+            shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+            requests, process = self._spawn(index, shm)
+            self._shards.append(_Shard(index, process, requests, shm, self.slots))
+            self._ready[index] = self._loop.create_future()
+
+        self._reader = threading.Thread(target=self._read_results, name="cityv-shard-results", daemon=True)
+        self._reader.start()
+        try:
+            await asyncio.wait_for(asyncio.gather(*self._ready.values()), SHARD_READY_TIMEOUT_S)
+        except Exception:
+            await self.stop()
+            raise
+        print(f"🧩 {self.workers} çıkarım worker'ı hazır ({self.backend}, worker başına {self.threads} thread, "
+              f"{self.slots} x {self.slot_bytes // (1024 * 1024)} MB slot)")
+
+    def _spawn(self, index, shm):
+        """Worker process'ini başlat; (istek kuyruğu, process) döner"""
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            name=f"cityv-shard-{index}",
+            args=(index, self.backend, shm.name, self.slot_bytes, self.threads,
+                  requests, self._results, self.max_batch_size, self.max_wait_ms),
+            daemon=True,
+        )
+        process.start()
+        return requests, process
+
+    async def stop(self):
+        if not self._shards:
+            return
+        for shard in self._shards:
+            shard.requests.put(None)
+
+        def _join():
+            for shard in self._shards:
+                shard.process.join(timeout=10)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+                    shard.process.join()
+
+        await run_in_thread(_join)
+        self._results.put(None)
+        await run_in_thread(self._reader.join)
+
+        for job_id, (future, _, _) in list(self._jobs.items()):
+            if not future.done():
+                future.set_exception(RuntimeError("Çıkarım worker'ları durduruldu"))
+        self._jobs.clear()
+        for shard in self._shards:
+            shard.shm.close()
+            shard.shm.unlink()
+        self._shards = []
+
+    def queue_depth(self):
+        """Worker'larda işlenmeyi bekleyen iş sayısı"""
+        return len(self._jobs)
+
+    def worker_for(self, camera_id):
+        return self.ring.node_for(camera_id or "0")
+
+    async def submit(self, image, imgsz=None, camera_id=None):
+        results, info = await self.submit_many([image], imgsz, camera_id)
+        return results[0], info
+
+    async def submit_many(self, images, imgsz=None, camera_id=None):
+        """Görüntüleri kameranın worker'ına gönder; ([sonuç, ...], BatchInfo) döner"""
+        if not self._shards:
+            raise RuntimeError("Çıkarım worker'ları başlatılmadı")
+        shard = self._shards[self.worker_for(camera_id)]
+        if not shard.process.is_alive():
+            raise RuntimeError(f"Çıkarım worker'ı {shard.index} çalışmıyor")
+
+        slot = await shard.free.get()
+        write = asyncio.ensure_future(run_in_thread(self._write_slot, shard, slot, images))
+        try:
+            layout = await asyncio.shield(write)
+        except BaseException:
+            # İptal dahil: kopyalama thread'i bitince slot geri verilir (yarım yazım başka işe karışmaz)
+            write.add_done_callback(lambda done: self._release_slot(done, shard, slot))
+            raise
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        self._jobs[job_id] = (future, shard, slot)
+        shard.pending.add(job_id)
+        shard.requests.put((job_id, slot, layout, imgsz, time.monotonic()))
+        return await future
+
+    @staticmethod
+    def _release_slot(write, shard, slot):
+        if not write.cancelled():
+            write.exception()
+        shard.free.put_nowait(slot)
+
+    def _write_slot(self, shard, slot, images):
+        """Görüntüleri slota kopyala; [(ofset, şekil), ...] döner. Sığmazsa kuyrukla gönderilir."""
+        sizes = [_aligned(image.nbytes) for image in images]
+        if sum(sizes) > self.slot_bytes or any(image.dtype != np.uint8 for image in images):
+            self.inline_frames += 1
+            return [np.ascontiguousarray(image) for image in images]
+
+        layout = []
+        offset = 0
+        base = slot * self.slot_bytes
+        for image, size in zip(images, sizes):
+            target = np.ndarray(image.shape, dtype=np.uint8, buffer=shard.shm.buf, offset=base + offset)
+            np.copyto(target, image)
+            layout.append((offset, image.shape))
+            offset += size
+        return layout
+
+    def _read_results(self):
+        """Sonuç kuyruğunu oku (ayrı thread); event loop'a aktar, ölen worker'ları yakala"""
+        checked = time.monotonic()
+        while True:
+            try:
+                message = self._results.get(timeout=SHARD_CHECK_INTERVAL_S)
+            except queue.Empty:
+                message = False
+            if message is None:
+                return
+            if message is not False:
+                self._loop.call_soon_threadsafe(self._dispatch, message)
+            # Diğer worker'lar sonuç üretirken de ölen worker fark edilsin
+            if time.monotonic() - checked >= SHARD_CHECK_INTERVAL_S:
+                checked = time.monotonic()
+                self._loop.call_soon_threadsafe(self._check_workers)
+
+    def _dispatch(self, message):
+        kind = message[0]
+        if kind == "ready":
+            _, index, elapsed_ms = message
+            self.load_times_ms[f"shard_{index}"] = round(elapsed_ms, 1)
+            if not self._ready[index].done():
+                self._ready[index].set_result(True)
+            return
+        if kind == "failed":
+            _, index, error = message
+            if not self._ready[index].done():
+                self._ready[index].set_exception(RuntimeError(f"Çıkarım worker'ı {index} yüklenemedi: {error}"))
+            return
+
+        job = self._jobs.pop(message[1], None)
+        if job is None:
+            return
+        future, shard, slot = job
+        shard.pending.discard(message[1])
+        shard.free.put_nowait(slot)
+        if future.done():
+            return
+        if kind == "error":
+            future.set_exception(RuntimeError(message[2]))
+            return
+        _, _, output, wait_ms, inference_ms, size = message
+        future.set_result((output, BatchInfo(
+            size=size,
+            max_size=self.max_batch_size,
+            wait_ms=wait_ms,
+            max_wait_ms=self.max_wait_ms,
+            inference_ms=inference_ms,
+        )))
+
+    def _check_workers(self):
+        """Ölen worker'ın bekleyen işlerini hatayla sonlandır, slotlarını geri ver, worker'ı yeniden başlat"""
+        if not self._shards:
+            return
+        for shard in self._shards:
+            if shard.process.is_alive():
+                continue
+            ready = self._ready[shard.index]
+            if not ready.done():
+                # Başlangıçta ölen worker start() içinde hata olur, yeniden başlatılmaz
+                ready.set_exception(RuntimeError(
+                    f"Çıkarım worker'ı {shard.index} başlarken durdu (exit {shard.process.exitcode})"))
+                continue
+            if shard.died_at is None:
+                shard.died_at = time.monotonic()
+                print(f"❌ Çıkarım worker'ı {shard.index} durdu (exit {shard.process.exitcode}), "
+                      f"{SHARD_RESTART_BACKOFF_S:g}s sonra yeniden başlatılacak")
+                for job_id in list(shard.pending):
+                    future, _, slot = self._jobs.pop(job_id)
+                    shard.free.put_nowait(slot)
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"Çıkarım worker'ı {shard.index} durdu"))
+                shard.pending.clear()
+            if time.monotonic() - shard.died_at >= SHARD_RESTART_BACKOFF_S:
+                self._restart(shard)
+
+    def _restart(self, shard):
+        # Eski istek kuyruğu hatayla biten işleri içerebilir; yeni kuyruk açılır
+        shard.process.join(timeout=0)
+        shard.requests.cancel_join_thread()
+        shard.requests, shard.process = self._spawn(shard.index, shard.shm)
+        shard.restarts += 1
+        shard.died_at = None
+        print(f"🔁 Çıkarım worker'ı {shard.index} yeniden başlatıldı (pid {shard.process.pid})")
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "workers": [
+                {
+                    "index": shard.index,
+                    "pid": shard.process.pid,
+                    "alive": shard.process.is_alive(),
+                    "pending": len(shard.pending),
+                    "free_slots": shard.free.qsize(),
+                    "restarts": shard.restarts,
+                }
+                for shard in self._shards
+            ],
+            "slots": self.slots,
+            "slot_mb": round(self.slot_bytes / (1024 * 1024), 2),
+            "threads_per_worker": self.threads,
+            "inline_frames": self.inline_frames,
+            "load_times_ms": dict(self.load_times_ms),
+        }
@@ -0,0 +1,156 @@
+"""
+🧍 Deterministik sentetik kalabalık sahneleri (benchmark girdisi)
+ESP32-CAM (OV2640) çözünürlüklerinde, kişi sayısı bilinen JPEG kareler üretir.
+Aynı (seed, çözünürlük, kişi sayısı, index) her makinede aynı kareyi verir;
+internetten fotoğraf indirmeye veya çalışan bir sunucuya gerek yoktur.
+
+Sahne: duvar/zemin gradyanı, zemin çizgileri, perspektife göre ölçeklenen kişi
+figürleri (uzaktakiler küçük ve önce çizilir) ve sensör gürültüsü.
+"""
+
+import cv2
+import numpy as np
+
+# OV2640 framesize değerleri
+RESOLUTIONS = {
+    "QVGA": (320, 240),
+    "CIF": (400, 296),
+    "VGA": (640, 480),
+    "SVGA": (800, 600),
+    "XGA": (1024, 768),
+    "HD": (1280, 720),
+    "SXGA": (1280, 1024),
+    "UXGA": (1600, 1200),
+}
+
+JPEG_QUALITY = 80
+# Ufuk çizgisi (kare yüksekliğine oran) ve bu çizgide / en altta kişi boyu
+HORIZON = 0.3
+FAR_HEIGHT = 0.12
+NEAR_HEIGHT = 0.45
+
+
+def _background(rng, width, height):
+    horizon = int(height * HORIZON)
+    wall = rng.integers(120, 200, 3)
+    floor = rng.integers(60, 140, 3)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:horizon] = wall
+    shade = np.linspace(0.7, 1.1, height - horizon)[:, None, None]
+    image[horizon:] = np.clip(floor * shade, 0, 255).astype(np.uint8)
+
+    # Zemin çizgileri ufuğa doğru daralır
+    line = tuple(int(c) for c in floor // 2)
+    for x in np.linspace(-width, 2 * width, 13):
+        cv2.line(image, (width // 2, horizon), (int(x), height), line, 1, cv2.LINE_AA)
+    return image
+
+
+def _person(image, rng, foot_x, foot_y, person_height):
+    """Basit insan figürü çiz; [x1, y1, x2, y2] kutusunu döndür"""
+    h = person_height
+    w = h * 0.38
+    skin = tuple(int(c) for c in rng.integers((60, 90, 140), (140, 170, 230)))
+    shirt = tuple(int(c) for c in rng.integers(0, 256, 3))
+    pants = tuple(int(c) for c in rng.integers(0, 120, 3))
+
+    top = foot_y - h
+    head_r = max(1, int(h * 0.08))
+    head_c = (int(foot_x), int(top + head_r))
+    shoulder_y = top + 2 * head_r
+    hip_y = top + h * 0.55
+    thick = max(1, int(h * 0.06))
+
+    # Bacaklar, gövde, kollar, baş (arkadan öne)
+    stride = w * rng.uniform(0.1, 0.3)
+    cv2.line(image, (int(foot_x - w * 0.12), int(hip_y)), (int(foot_x - stride), int(foot_y)), pants, thick, cv2.LINE_AA)
+    cv2.line(image, (int(foot_x + w * 0.12), int(hip_y)), (int(foot_x + stride), int(foot_y)), pants, thick, cv2.LINE_AA)
+    cv2.rectangle(image, (int(foot_x - w * 0.3), int(shoulder_y)), (int(foot_x + w * 0.3), int(hip_y)), shirt, -1)
+    arm = max(1, thick - 1)
+    cv2.line(image, (int(foot_x - w * 0.3), int(shoulder_y)), (int(foot_x - w * 0.5), int(hip_y)), shirt, arm, cv2.LINE_AA)
+    cv2.line(image, (int(foot_x + w * 0.3), int(shoulder_y)), (int(foot_x + w * 0.5), int(hip_y)), shirt, arm, cv2.LINE_AA)
+    cv2.circle(image, head_c, head_r, skin, -1, cv2.LINE_AA)
+
+    height, width = image.shape[:2]
+    return [
+        max(0, int(foot_x - w / 2)), max(0, int(top)),
+        min(width, int(foot_x + w / 2)), min(height, int(foot_y)),
+    ]
+
+
+def generate_scene(width, height, person_count, seed=0, index=0):
+    """
+    (BGR kare, kişi kutuları [[x1, y1, x2, y2], ...]) döndürür.
+    Kutular figürün tamamını kapsar (kare kenarında kırpılır).
+    """
+    rng = np.random.default_rng([seed, width, height, person_count, index])
+    image = _background(rng, width, height)
+
+    horizon = height * HORIZON
+    # Ayak noktaları: ufuk ile alt kenar arası; uzaktakiler önce çizilir
+    depth = np.sort(rng.uniform(0.05, 1.0, person_count))
+    boxes = []
+    for d in depth:
+        foot_y = horizon + d * (height - horizon)
+        person_height = height * (FAR_HEIGHT + d * (NEAR_HEIGHT - FAR_HEIGHT))
+        foot_x = rng.uniform(0.05, 0.95) * width
+        boxes.append(_person(image, rng, foot_x, foot_y, person_height))
+
+    noise = rng.normal(0, 4, image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    return image, boxes
+
+
+def encode_jpeg(image, quality=JPEG_QUALITY):
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encode başarısız")
+    return encoded.tobytes()
+
+
+def scene_set(resolutions, person_counts, per_combination=3, seed=0):
+    """
+    Her (çözünürlük, kişi sayısı) için `per_combination` sahne.
+    resolutions: RESOLUTIONS anahtarları. Sözlük listesi döner.
+    """
+    scenes = []
+    for name in resolutions:
+        if name not in RESOLUTIONS:
+            raise ValueError(f"Bilinmeyen çözünürlük: {name} ({', '.join(RESOLUTIONS)})")
+        width, height = RESOLUTIONS[name]
+        for count in person_counts:
+            for index in range(per_combination):
+                image, boxes = generate_scene(width, height, count, seed, index)
+                scenes.append({
+                    "resolution": name,
+                    "width": width,
+                    "height": height,
+                    "person_count": count,
+                    "index": index,
+                    "image": image,
+                    "jpeg": encode_jpeg(image),
+                    "boxes": boxes,
+                })
+    return scenes
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Sentetik sahneleri klasöre yaz (görsel kontrol / kalibrasyon)")
+    parser.add_argument("--output", default="synthetic_scenes")
+    parser.add_argument("--resolutions", default="QVGA,VGA,UXGA")
+    parser.add_argument("--counts", default="0,5,20")
+    parser.add_argument("--per-combination", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scenes = scene_set(args.resolutions.split(","), [int(c) for c in args.counts.split(",")],
+                       args.per_combination, args.seed)
+    for scene in scenes:
+        name = f"{scene['resolution']}_{scene['person_count']}p_{scene['index']}.jpg"
+        with open(os.path.join(args.output, name), "wb") as f:
+            f.write(scene["jpeg"])
+    print(f"✅ {len(scenes)} sahne: {args.output}")
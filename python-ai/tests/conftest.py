@@ -0,0 +1,10 @@
+"""
+python-ai modülleri düz (flat) import edilir: `from batching import ...`.
+Testler sunucu, model veya database olmadan çalışır:
+    cd python-ai && python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, load_tiers, parse_shares
+
+
+def controller(max_inflight=4, tiers=None, shares=None, max_wait_ms=1000):
+    return AdmissionController(
+        "test", max_inflight=max_inflight, camera_tiers=tiers or {},
+        shares=shares or {"high": 1.0, "normal": 1.0, "low": 0.5}, max_wait_ms=max_wait_ms,
+    )
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_new_frame_supersedes_pending_frame_of_same_camera():
+    async def scenario():
+        gate = controller()
+        await gate.acquire(1)
+        older = asyncio.ensure_future(gate.acquire(1))
+        await asyncio.sleep(0)
+        newer = asyncio.ensure_future(gate.acquire(1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await older
+        assert rejected.value.reason == "superseded"
+
+        # İşlenen kare bitince slot doğrudan en yeni kareye geçer
+        gate.release(1)
+        await newer
+        assert gate.inflight == 1
+        gate.release(1)
+        return gate
+
+    gate = run(scenario())
+    assert gate.inflight == 0
+    assert gate.stats()["pending"] == 0
+    assert gate.stats()["results"]["normal"] == {"admitted": 1, "queued": 2, "superseded": 1}
+
+
+def test_saturated_returns_429_with_retry_after():
+    async def scenario():
+        gate = controller(max_inflight=2)
+        await gate.acquire(1)
+        await gate.acquire(2)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire(3)
+        return rejected.value
+
+    rejected = run(scenario())
+    assert rejected.reason == "saturated"
+    response = rejected.response()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert json.loads(response.body)["reason"] == "saturated"
+
+
+def test_pending_frame_times_out():
+    async def scenario():
+        gate = controller(max_wait_ms=20)
+        await gate.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire(1)
+        assert rejected.value.reason == "timeout"
+        gate.release(1)
+        return gate
+
+    gate = run(scenario())
+    assert gate.inflight == 0
+    assert gate.stats()["pending"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        gate = controller()
+        await gate.acquire(1)
+        waiter = asyncio.ensure_future(gate.acquire(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        gate.release(1)
+        return gate
+
+    gate = run(scenario())
+    assert gate.inflight == 0
+    assert gate.stats()["pending"] == 0
+
+
+def test_low_tier_leaves_room_for_high_tier():
+    async def scenario():
+        gate = controller(max_inflight=4, tiers={"1": "low", "2": "low", "3": "low", "9": "high"})
+        await gate.acquire(1)
+        await gate.acquire(2)
+        # low katmanı global sınırın yarısını (2) doldurabilir
+        with pytest.raises(AdmissionRejected):
+            await gate.acquire(3)
+        await gate.acquire(9)
+        return gate
+
+    gate = run(scenario())
+    assert gate.inflight == 3
+    assert gate.stats()["tier_limits"]["low"] == 2
+
+
+def test_requests_without_camera_only_use_global_limit():
+    async def scenario():
+        gate = controller(max_inflight=2)
+        async with gate.admit(None):
+            async with gate.admit(None):
+                with pytest.raises(AdmissionRejected):
+                    await gate.acquire(None)
+        return gate
+
+    assert run(scenario()).inflight == 0
+
+
+def test_disabled_controller_admits_everything():
+    async def scenario():
+        gate = AdmissionController("test", max_inflight=1, camera_tiers={}, shares={}, enabled=False)
+        async with gate.admit(1):
+            async with gate.admit(1):
+                pass
+        return gate
+
+    assert run(scenario()).inflight == 0
+
+
+def test_config_parsing():
+    assert parse_shares("high:1.0, low:0.25") == {"high": 1.0, "low": 0.25}
+    assert load_tiers('{"5": "high"}') == {"5": "high"}
+    assert load_tiers("") == {}
+    with pytest.raises(ValueError):
+        load_tiers("{bad")
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from batching import InferenceBatcher
+
+
+class RecordingInfer:
+    """infer_batch yerine: her çağrının görüntülerini ve imgsz'sini kaydeder"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, images, imgsz):
+        self.calls.append((list(images), imgsz))
+        if self.fail:
+            raise ValueError("model hatası")
+        return [image * 10 for image in images]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_frames_share_one_model_call():
+    infer = RecordingInfer()
+
+    async def scenario():
+        batcher = InferenceBatcher(infer, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    assert len(infer.calls) == 1
+    assert sorted(infer.calls[0][0]) == [0, 1, 2, 3, 4]
+    # Her istek kendi sonucunu alır
+    assert [result for result, _ in results] == [0, 10, 20, 30, 40]
+    assert all(info.size == 5 and info.max_size == 8 for _, info in results)
+
+
+def test_batch_is_capped_at_max_batch_size():
+    infer = RecordingInfer()
+
+    async def scenario():
+        batcher = InferenceBatcher(infer, max_batch_size=3, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    assert [len(images) for images, _ in infer.calls] == [3, 3, 1]
+    assert [result for result, _ in results] == [i * 10 for i in range(7)]
+
+
+def test_submit_many_counts_every_image_toward_the_batch():
+    infer = RecordingInfer()
+
+    async def scenario():
+        batcher = InferenceBatcher(infer, max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit_many([1, 2, 3]), batcher.submit_many([4, 5]), batcher.submit_many([6])
+            )
+        finally:
+            await batcher.stop()
+
+    (first, _), (second, _), (third, _) = run(scenario())
+    assert first == [10, 20, 30]
+    assert second == [40, 50]
+    assert third == [60]
+    # Bir karenin görüntüleri bölünmez; sınıra ulaşınca pencere kapanır
+    assert [len(images) for images, _ in infer.calls] == [5, 1]
+
+
+def test_different_input_sizes_run_in_separate_calls():
+    infer = RecordingInfer()
+
+    async def scenario():
+        batcher = InferenceBatcher(infer, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit(1, 640), batcher.submit(2, 320), batcher.submit(3, 640)
+            )
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    assert sorted((imgsz, sorted(images)) for images, imgsz in infer.calls) == [(320, [2]), (640, [1, 3])]
+    assert [result for result, _ in results] == [10, 20, 30]
+
+
+def test_model_error_fails_every_request_in_the_group():
+    infer = RecordingInfer(fail=True)
+
+    async def scenario():
+        batcher = InferenceBatcher(infer, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        try:
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_submit_before_start_raises():
+    batcher = InferenceBatcher(RecordingInfer())
+    with pytest.raises(RuntimeError):
+        run(batcher.submit(1))
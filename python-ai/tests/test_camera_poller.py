@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from camera_poller import CAMERA_POLL_DEFAULT_FPS, CameraPoller, CameraState, MjpegParser, load_targets
+from frame_stream import LatestFrameSlot
+
+FRAME_A = b"\xff\xd8" + b"A" * 50 + b"\xff\xd9"
+FRAME_B = b"\xff\xd8" + b"B" * 80 + b"\xff\xd9"
+
+
+def part(frame, length=True):
+    header = b"--frame\r\nContent-Type: image/jpeg\r\n"
+    if length:
+        header += b"Content-Length: %d\r\n" % len(frame)
+    return header + b"\r\n" + frame + b"\r\n"
+
+
+@pytest.mark.parametrize("length", [True, False])
+def test_mjpeg_parser_handles_split_chunks(length):
+    stream = part(FRAME_A, length) + part(FRAME_B, length)
+    parser = MjpegParser()
+    frames = []
+    for i in range(0, len(stream), 7):
+        frames.extend(parser.feed(stream[i:i + 7]))
+    assert frames == [FRAME_A, FRAME_B]
+
+
+def test_mjpeg_parser_uses_content_length_over_embedded_eoi():
+    # Gömülü küçük resimde (EXIF thumbnail) erken EOI olabilir
+    frame = b"\xff\xd8" + b"x" * 10 + b"\xff\xd9" + b"y" * 10 + b"\xff\xd9"
+    assert MjpegParser().feed(part(frame)) == [frame]
+
+
+def test_mjpeg_parser_resets_on_garbage():
+    parser = MjpegParser(max_frame_bytes=16)
+    assert parser.feed(b"\xff\xd8" + b"z" * 64) == []
+    assert parser.feed(part(FRAME_A, length=False)) == [FRAME_A]
+
+
+def test_load_targets_defaults_and_validation():
+    targets = load_targets('[{"camera_id": 5, "url": "http://cam/capture"}, '
+                           '{"camera_id": "6", "zone": "Salon", "url": "http://cam/stream", "mode": "mjpeg", "fps": 2}]')
+    assert targets[0] == {"camera_id": "5", "zone": "Unknown", "url": "http://cam/capture",
+                          "mode": "capture", "fps": CAMERA_POLL_DEFAULT_FPS}
+    assert targets[1]["mode"] == "mjpeg" and targets[1]["fps"] == 2.0
+    assert load_targets("") == []
+    with pytest.raises(ValueError):
+        load_targets('[{"camera_id": 1, "url": "x", "mode": "rtsp"}]')
+    with pytest.raises(ValueError):
+        load_targets("[oops")
+
+
+def test_analysis_is_capped_across_cameras_and_uses_latest_frame():
+    targets = [{"camera_id": str(i), "zone": "Z", "url": "http://cam", "mode": "capture", "fps": 1000}
+               for i in range(4)]
+    running = []
+    peak = []
+    seen = {}
+
+    async def analyze(frame, camera_id, location_zone):
+        running.append(camera_id)
+        peak.append(len(running))
+        seen.setdefault(camera_id, []).append(frame)
+        await asyncio.sleep(0.02)
+        running.remove(camera_id)
+        return {"analysis": {"person_count": len(frame)}}
+
+    async def scenario():
+        poller = CameraPoller(analyze, targets, max_inflight=2)
+        poller._inflight = asyncio.Semaphore(poller.max_inflight)
+        loops = []
+        for camera in poller.cameras:
+            camera.slot = LatestFrameSlot()
+            for frame in (b"old", b"newer", b"newest"):
+                camera.slot.put(frame)
+            loops.append(asyncio.ensure_future(poller._analyze_loop(camera)))
+        await asyncio.sleep(0.1)
+        for camera in poller.cameras:
+            camera.slot.close()
+        await asyncio.wait_for(asyncio.gather(*loops), 1)
+        return poller
+
+    poller = asyncio.run(scenario())
+    assert max(peak) == 2
+    assert all(frames == [b"newest"] for frames in seen.values())
+    stats = poller.stats()["cameras"]
+    assert [camera["analyzed"] for camera in stats] == [1, 1, 1, 1]
+    assert [camera["dropped"] for camera in stats] == [2, 2, 2, 2]
+    assert stats[0]["last_person_count"] == 6
+
+
+def test_analysis_error_is_counted_without_disconnecting():
+    camera = CameraState({"camera_id": "1", "zone": "Z", "url": "x", "mode": "capture", "fps": 1000})
+    camera.connected = True
+
+    async def analyze(frame, camera_id, location_zone):
+        raise RuntimeError("model hatası")
+
+    async def scenario():
+        poller = CameraPoller(analyze, [])
+        poller._inflight = asyncio.Semaphore(1)
+        camera.slot = LatestFrameSlot()
+        camera.slot.put(b"frame")
+        loop = asyncio.ensure_future(poller._analyze_loop(camera))
+        await asyncio.sleep(0.01)
+        camera.slot.close()
+        await asyncio.wait_for(loop, 1)
+
+    asyncio.run(scenario())
+    assert (camera.errors, camera.last_error, camera.connected) == (1, "model hatası", True)
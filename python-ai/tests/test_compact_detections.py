@@ -0,0 +1,74 @@
+import pytest
+
+from compact_detections import decode_detections, encode_detections, negotiate, with_detection_format
+
+# __tests__/detections.test.ts ile aynı fixture; iki taraf aynı byte'ları üretip okumalı
+DETECTIONS = [
+    {"bbox": [10, 20, 110, 220], "confidence": 0.91, "track_id": 7},
+    {"bbox": [300, 40, 360, 200], "confidence": 0.5, "track_id": None},
+    {"bbox": [0, 0, 32767, 1], "confidence": 1.0, "track_id": 123456},
+]
+PACKED_TRACKED = "CgAUAG4A3AAsASgAaAHIAAAAAAD/fwEA6ID/BwAAAP////9A4gEA"
+PACKED_UNTRACKED = "CgAUAG4A3AAsASgAaAHIAAAAAAD/fwEA6ID/"
+
+
+def untracked(detections):
+    return [{key: value for key, value in det.items() if key != "track_id"} for det in detections]
+
+
+@pytest.mark.parametrize("fmt", ["columnar", "columnar-b64"])
+@pytest.mark.parametrize("tracked", [True, False])
+def test_round_trip(fmt, tracked):
+    source = DETECTIONS if tracked else untracked(DETECTIONS)
+    decoded = decode_detections(encode_detections(source, fmt))
+
+    assert [det["bbox"] for det in decoded] == [det["bbox"] for det in DETECTIONS]
+    assert [det["center"] for det in decoded] == [[60, 120], [330, 120], [16383, 0]]
+    assert [det["area"] for det in decoded] == [20000, 9600, 32767]
+    for det, original in zip(decoded, DETECTIONS):
+        # Güven uint8 olarak saklanır: en fazla 1/255 sapma
+        assert abs(det["confidence"] - original["confidence"]) <= 1 / 255
+        assert det["track_id"] == (original["track_id"] if tracked else None)
+
+
+def test_b64_matches_dashboard_fixture():
+    assert encode_detections(DETECTIONS, "columnar-b64")["data"] == PACKED_TRACKED
+    assert encode_detections(untracked(DETECTIONS), "columnar-b64") == {
+        "format": "columnar-v1-b64", "n": 3, "tracks": False, "data": PACKED_UNTRACKED,
+    }
+
+
+def test_standalone_xywh_detections_and_clipping():
+    detections = [
+        {"x": 10, "y": 20, "width": 100, "height": 200, "confidence": 0.8},
+        {"bbox": [-5, 10, 40000, 50], "confidence": 1.7},
+    ]
+    encoded = encode_detections(detections, "columnar")
+    assert encoded["boxes"] == [10, 20, 110, 220, 0, 10, 32767, 50]
+    assert encoded["conf"] == [204, 255]
+    assert "track_ids" not in encoded
+
+
+def test_empty_and_full_passthrough():
+    for fmt in ("columnar", "columnar-b64"):
+        assert decode_detections(encode_detections([], fmt)) == []
+    assert encode_detections(DETECTIONS, "full") is DETECTIONS
+    assert decode_detections(DETECTIONS) is DETECTIONS
+    with pytest.raises(ValueError):
+        encode_detections(DETECTIONS, "xml")
+    with pytest.raises(ValueError):
+        decode_detections({"format": "unknown", "n": 0})
+
+
+def test_negotiate_and_response_wrapping():
+    assert negotiate(" Columnar-B64 ") == "columnar-b64"
+    assert negotiate("protobuf") == "full"
+    assert negotiate(None) == "full"
+
+    result = {"success": True, "analysis": {"person_count": 3, "detection_objects": DETECTIONS}}
+    wrapped = with_detection_format(result, "columnar")
+    assert wrapped["analysis"]["detections_format"] == "columnar"
+    assert wrapped["analysis"]["detection_objects"]["n"] == 3
+    # Saklanan sonuç değişmez
+    assert result["analysis"]["detection_objects"] is DETECTIONS
+    assert with_detection_format(result, "full") is result
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from crowd_alerts import AlertWriter, CrowdAlertEngine, load_alert_rules
+
+
+def engine(**rule):
+    return CrowdAlertEngine(load_alert_rules(json.dumps({"default": rule})))
+
+
+def actions(events):
+    return [(event["action"], event["alert_type"]) for event in events]
+
+
+def test_density_alert_raises_once_and_resolves_with_hysteresis():
+    alerts = engine(max_density_score=3, clear_ratio=0.8, cooldown_s=0)
+
+    assert actions(alerts.evaluate(1, "A", 30, 0.9, 3, now=0)) == [("raise", "high_density")]
+    # Açıkken tekrar açılmaz
+    assert alerts.evaluate(1, "A", 31, 0.9, 3, now=1) == []
+    # 2.5 < 3 * 0.8 değil: hâlâ açık
+    assert alerts.evaluate(1, "A", 20, 0.6, 2.5, now=2) == []
+    assert actions(alerts.evaluate(1, "A", 10, 0.3, 2, now=3)) == [("resolve", "high_density")]
+    assert alerts.active(1) == []
+
+
+def test_cooldown_blocks_reraise():
+    alerts = engine(max_density_score=3, cooldown_s=300)
+    alerts.evaluate(1, "A", 30, 0.9, 3, now=0)
+    alerts.evaluate(1, "A", 5, 0.1, 1, now=10)
+
+    assert alerts.evaluate(1, "A", 30, 0.9, 3, now=100) == []
+    assert actions(alerts.evaluate(1, "A", 30, 0.9, 3, now=310)) == [("raise", "high_density")]
+
+
+def test_person_rise_is_measured_against_window_minimum():
+    alerts = engine(max_density_score=0, max_rise=10, rise_window_s=60)
+
+    assert alerts.evaluate(1, "A", 5, 0.1, 1, now=0) == []
+    assert alerts.evaluate(1, "A", 12, 0.3, 1, now=20) == []
+    assert actions(alerts.evaluate(1, "A", 16, 0.4, 1, now=40)) == [("raise", "unusual_crowd")]
+
+
+def test_slow_rise_across_windows_does_not_alert():
+    alerts = engine(max_density_score=0, max_rise=10, rise_window_s=60)
+    # 120 sn'de toplam 11 kişi artış; hiçbir 60 sn'lik pencerede 10'a ulaşmaz
+    assert alerts.evaluate(1, "A", 5, 0.1, 1, now=0) == []
+    assert alerts.evaluate(1, "A", 12, 0.3, 1, now=50) == []
+    assert alerts.evaluate(1, "A", 16, 0.4, 1, now=120) == []
+
+
+def test_camera_rules_override_default():
+    rules = load_alert_rules('{"default": {"max_density_score": 3}, "5": {"max_person_count": 40}}')
+    alerts = CrowdAlertEngine(rules)
+
+    assert alerts.enabled_types(5) == {"high_density", "safety_threshold"}
+    assert alerts.enabled_types(1) == {"high_density"}
+    assert actions(alerts.evaluate(5, "A", 40, 0.5, 2, now=0)) == [("raise", "safety_threshold")]
+    assert alerts.evaluate(1, "A", 40, 0.5, 2, now=0) == []
+
+
+def test_load_alert_rules_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        load_alert_rules('{"5": {"max_people": 10}}')
+    with pytest.raises(ValueError):
+        load_alert_rules("{oops")
+
+
+def test_restored_alert_resolves_instead_of_reopening():
+    alerts = engine(max_density_score=3, cooldown_s=0)
+    alerts.restore(1, "high_density", 0)
+
+    assert alerts.evaluate(1, "A", 30, 0.9, 3, now=5) == []
+    assert actions(alerts.evaluate(1, "A", 5, 0.1, 1, now=6)) == [("resolve", "high_density")]
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def transaction(self):
+        class _Transaction:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Transaction()
+
+    async def fetch(self, sql):
+        return self.pool.open_rows
+
+    async def executemany(self, sql, records):
+        kind = "insert" if "INSERT" in sql else "resolve"
+        self.pool.calls.append((kind, list(records)))
+
+
+class FakePool:
+    def __init__(self, open_rows=()):
+        self.open_rows = list(open_rows)
+        self.calls = []
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+def test_reconcile_restores_enabled_and_closes_disabled_alerts():
+    opened = datetime(2024, 5, 1, 10)
+    pool = FakePool([
+        {"camera_id": 1, "alert_type": "high_density", "created_at": opened},
+        {"camera_id": 1, "alert_type": "unusual_crowd", "created_at": opened},
+    ])
+    alerts = engine(max_density_score=3)
+    writer = AlertWriter(pool)
+
+    assert asyncio.run(writer.reconcile(alerts))
+    assert alerts.active(1) == ["high_density"]
+    assert [(kind, [r[:2] for r in records]) for kind, records in pool.calls] == [
+        ("resolve", [(1, "unusual_crowd")])
+    ]
+    assert writer.stats()["restored"] == 1
+    assert writer.stats()["closed_stale"] == 1
+
+
+def test_writer_groups_consecutive_events_in_order():
+    alerts = engine(max_density_score=3, max_person_count=20, cooldown_s=0)
+    pool = FakePool()
+    writer = AlertWriter(pool)
+    for event in alerts.evaluate(1, "A", 30, 0.9, 3, now=0) + alerts.evaluate(1, "A", 2, 0.1, 1, now=1):
+        writer.add(event)
+
+    assert asyncio.run(writer.flush())
+    assert [(kind, len(records)) for kind, records in pool.calls] == [("insert", 2), ("resolve", 2)]
+    assert writer.stats()["written_total"] == 4
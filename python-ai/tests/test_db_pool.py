@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+import db_pool
+from db_pool import DatabasePool
+
+
+class FakePgPool:
+    """asyncpg havuzu yerine: sınırlı bağlantı, dolunca acquire bekler"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.free = asyncio.Queue()
+        for index in range(max_size):
+            self.free.put_nowait(f"conn-{index}")
+        self.closed = False
+
+    async def acquire(self, timeout=None):
+        return await asyncio.wait_for(self.free.get(), timeout)
+
+    async def release(self, conn):
+        self.free.put_nowait(conn)
+
+    def get_size(self):
+        return self.max_size
+
+    def get_idle_size(self):
+        return self.free.qsize()
+
+    async def close(self):
+        self.closed = True
+
+
+def install(monkeypatch, fail=0):
+    """create_pool'u sahtesiyle değiştirir; ilk `fail` çağrı hata verir"""
+    calls = []
+
+    async def create_pool(dsn, min_size, max_size, statement_cache_size):
+        calls.append(dsn)
+        if len(calls) <= fail:
+            raise OSError("connection refused")
+        return FakePgPool(max_size)
+
+    monkeypatch.setattr(db_pool.asyncpg, "create_pool", create_pool)
+    return calls
+
+
+def test_failed_open_backs_off_before_retrying(monkeypatch):
+    calls = install(monkeypatch, fail=1)
+    now = [100.0]
+    monkeypatch.setattr(db_pool.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(db_pool, "DB_POOL_RETRY_INTERVAL", 10.0)
+    pool = DatabasePool("postgres://test", min_size=1, max_size=2)
+
+    async def scenario():
+        assert await pool.open() is False
+        # Bekleme süresi dolmadan yeni bağlantı denenmez
+        now[0] = 105.0
+        assert await pool.open() is False
+        with pytest.raises(RuntimeError):
+            async with pool.acquire():
+                pass
+        assert len(calls) == 1
+
+        now[0] = 110.5
+        assert await pool.open() is True
+        assert await pool.open() is True
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert pool.is_open
+
+
+def test_concurrent_opens_create_one_pool(monkeypatch):
+    calls = install(monkeypatch)
+    pool = DatabasePool("postgres://test", min_size=1, max_size=2)
+
+    async def scenario():
+        return await asyncio.gather(*(pool.open() for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [True] * 5
+    assert len(calls) == 1
+
+
+def test_acquire_tracks_usage_and_timeouts(monkeypatch):
+    install(monkeypatch)
+    pool = DatabasePool("postgres://test", min_size=1, max_size=2, acquire_timeout=0.05)
+
+    async def scenario():
+        async with pool.acquire() as first, pool.acquire() as second:
+            assert {first, second} == {"conn-0", "conn-1"}
+            busy = pool.stats()
+            # Havuz dolu: üçüncü istek timeout'a düşer
+            with pytest.raises(asyncio.TimeoutError):
+                async with pool.acquire():
+                    pass
+        idle = pool.stats()
+        await pool.close()
+        return busy, idle
+
+    busy, idle = asyncio.run(scenario())
+    assert busy["in_use"] == 2 and busy["saturation"] == 1.0
+    assert idle["in_use"] == 0 and idle["waiting"] == 0
+    assert idle["acquired_total"] == 2
+    assert idle["acquire_timeouts"] == 1
+    assert not pool.is_open
+    assert pool.stats()["size"] == 0
+
+
+def test_max_size_never_below_min_size():
+    pool = DatabasePool("postgres://test", min_size=4, max_size=2)
+    assert pool.max_size == 4
+    assert pool.stats()["open"] is False
@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import pytest
+
+from detectors import DetectorRegistry, registry, resolve_backends
+
+
+class Loads:
+    """Fabrika çağrılarını sayar; her örnek ayrı bir nesnedir"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.count += 1
+        return object()
+
+
+def fake_detect(instance, image, gray):
+    return [[1, 2, 3, 4]], [0.5]
+
+
+def run_threads(target, count=4):
+    results = []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        results.append(target())
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_per_thread_backend_loads_once_per_thread():
+    loads = Loads()
+    detectors = DetectorRegistry()
+    detectors.register("haar", loads, fake_detect, per_thread=True)
+
+    def use_twice():
+        first = detectors.get("haar")
+        assert detectors.get("haar") is first
+        return first
+
+    # Örnekler listede tutulur; thread bitince id'ler yeniden kullanılmasın
+    instances = run_threads(use_twice)
+    assert len({id(instance) for instance in instances}) == 4
+    assert loads.count == 4
+
+
+def test_shared_backend_loads_once_across_threads():
+    loads = Loads()
+    detectors = DetectorRegistry()
+    detectors.register("yolo", loads, fake_detect, per_thread=False)
+
+    instances = run_threads(lambda: detectors.get("yolo"), count=8)
+    assert all(instance is instances[0] for instance in instances)
+    assert loads.count == 1
+    assert "yolo" in detectors.info()["load_times_ms"]
+
+
+def test_detect_normalizes_output_and_batch_requires_support():
+    detectors = DetectorRegistry()
+    detectors.register("haar", Loads(), fake_detect)
+    boxes, scores = detectors.detect("haar", np.zeros((8, 8, 3), np.uint8))
+
+    assert boxes.dtype == np.int32 and boxes.shape == (1, 4)
+    assert scores.dtype == np.float32 and scores.tolist() == [0.5]
+    with pytest.raises(ValueError):
+        detectors.detect_batch("haar", [])
+    with pytest.raises(ValueError):
+        detectors.get("missing")
+
+
+def test_backend_groups():
+    assert resolve_backends("haar") == ["haar_fullbody", "haar_upperbody"]
+    with pytest.raises(ValueError):
+        resolve_backends("ssd")
+    # Tüm gruplar kayıtlı backend'lere çözülür
+    for name in ("yolo", "yolo_onnx", "haar"):
+        for backend in resolve_backends(name):
+            registry.spec(backend)
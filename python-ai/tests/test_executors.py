@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+
+import executors
+from executors import run_cpu_bound, run_in_thread
+
+
+def test_blocking_work_runs_off_the_event_loop():
+    async def scenario():
+        loop_thread = threading.current_thread()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.ensure_future(ticker())
+        worker = await run_in_thread(lambda: (time.sleep(0.1), threading.current_thread())[1])
+        task.cancel()
+        return loop_thread, worker, ticks
+
+    loop_thread, worker, ticks = asyncio.run(scenario())
+    assert worker is not loop_thread
+    assert worker.name.startswith("cityv-ai")
+    # Bloklayan iş sürerken event loop çalışmaya devam eder
+    assert ticks >= 5
+
+
+def test_run_cpu_bound_falls_back_to_threads(monkeypatch):
+    monkeypatch.setattr(executors, "EXECUTOR_PROCESSES", 0)
+    monkeypatch.setattr(executors, "_process_pool", None)
+
+    async def scenario():
+        return await run_cpu_bound(lambda a, b=0: (a + b, threading.current_thread().name), 2, b=3)
+
+    total, thread_name = asyncio.run(scenario())
+    assert total == 5
+    assert thread_name.startswith("cityv-ai")
+    assert executors.get_process_pool() is None
+
+
+def test_concurrent_blocking_calls_overlap(monkeypatch):
+    # Havuz boyutu sabitlenir; test makinedeki CPU sayısına bağlı kalmaz
+    monkeypatch.setattr(executors, "EXECUTOR_THREADS", 4)
+    monkeypatch.setattr(executors, "_thread_pool", None)
+
+    async def scenario():
+        started = time.perf_counter()
+        await asyncio.gather(*(run_in_thread(time.sleep, 0.1) for _ in range(4)))
+        return time.perf_counter() - started
+
+    try:
+        assert asyncio.run(scenario()) < 0.3
+    finally:
+        executors.shutdown_executors()
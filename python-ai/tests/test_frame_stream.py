@@ -0,0 +1,116 @@
+import asyncio
+
+import frame_stream
+from frame_stream import LatestFrameSlot, compact_result, serve_frame_stream
+
+
+class FakeWebSocket:
+    """Starlette WebSocket yerine: gelen mesajlar kuyruktan okunur, gönderilenler kaydedilir"""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.accepted = False
+
+    async def accept(self):
+        self.accepted = True
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    def send_frame(self, data):
+        self.incoming.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+
+def test_slot_keeps_only_latest_frame():
+    async def scenario():
+        slot = LatestFrameSlot()
+        slot.put(b"1")
+        slot.put(b"2")
+        slot.put(b"3")
+        latest = await slot.take()
+        slot.close()
+        return slot, latest, await slot.take()
+
+    slot, latest, after_close = asyncio.run(scenario())
+    assert latest == b"3"
+    assert after_close is None
+    assert (slot.received, slot.dropped) == (3, 2)
+
+
+def test_take_waits_for_next_frame():
+    async def scenario():
+        slot = LatestFrameSlot()
+        waiter = asyncio.ensure_future(slot.take())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        slot.put(b"frame")
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == b"frame"
+
+
+def test_stream_skips_stale_frames_while_analyzing():
+    analyzed = []
+
+    async def scenario():
+        websocket = FakeWebSocket()
+        release = asyncio.Event()
+
+        async def analyze(frame, camera_id, location_zone):
+            analyzed.append(frame)
+            if frame == b"1":
+                # İlk kare işlenirken üç kare daha gelir
+                await release.wait()
+            return {"analysis": {"person_count": len(frame), "detection_objects": []}}
+
+        server = asyncio.ensure_future(serve_frame_stream(websocket, analyze, "5", "Giris"))
+        websocket.send_frame(b"1")
+        while not analyzed:
+            await asyncio.sleep(0.001)
+        for frame in (b"22", b"333", b"4444"):
+            websocket.send_frame(frame)
+        while websocket.incoming.qsize():
+            await asyncio.sleep(0.001)
+        release.set()
+        while len(websocket.sent) < 2:
+            await asyncio.sleep(0.001)
+        websocket.disconnect()
+        await asyncio.wait_for(server, 1)
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert websocket.accepted
+    assert analyzed == [b"1", b"4444"]
+    assert [message["seq"] for message in websocket.sent] == [1, 2]
+    assert websocket.sent[-1]["person_count"] == 4
+    assert websocket.sent[-1]["dropped"] == 2
+    # Özet yanıtta tespit listesi gönderilmez
+    assert "detection_objects" not in websocket.sent[-1]
+
+
+def test_stream_rejects_oversized_frames(monkeypatch):
+    monkeypatch.setattr(frame_stream, "STREAM_MAX_FRAME_BYTES", 4)
+
+    async def analyze(frame, camera_id, location_zone):
+        return {"analysis": {"person_count": 1}}
+
+    async def scenario():
+        websocket = FakeWebSocket()
+        websocket.send_frame(b"too large")
+        websocket.disconnect()
+        await asyncio.wait_for(serve_frame_stream(websocket, analyze, "5", "Giris"), 1)
+        return websocket.sent
+
+    assert asyncio.run(scenario()) == [{"success": False, "error": "Kare çok büyük"}]
+
+
+def test_compact_result_picks_known_fields():
+    analysis = {"person_count": 3, "crowd_density": 0.4, "detection_objects": [1, 2, 3], "alerts": []}
+    assert compact_result(analysis) == {"person_count": 3, "crowd_density": 0.4, "alerts": []}
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+from heatmap import blur_sigma, render_density, render_overlay
+
+
+def reference_density(shape, blobs, ksize):
+    """Eski yol: tam çözünürlükte dolu daireler + büyük GaussianBlur"""
+    heatmap = np.zeros(shape[:2], dtype=np.float32)
+    for center_x, center_y, radius, _, _ in blobs:
+        cv2.circle(heatmap, (center_x, center_y), radius, 1.0, -1)
+    heatmap = cv2.GaussianBlur(heatmap, (ksize, ksize), 0)
+    return heatmap / heatmap.max()
+
+
+def upscale(density, shape):
+    return cv2.resize(density, (shape[1], shape[0]), interpolation=cv2.INTER_LINEAR)
+
+
+BLOBS = [(300, 400, 120, 120, "disc"), (900, 500, 80, 80, "disc"), (1300, 700, 200, 200, "disc")]
+SHAPE = (1200, 1600, 3)
+
+
+def test_grid_density_matches_full_resolution_render():
+    density = render_density(SHAPE, BLOBS, blur_sigma(51), accumulate="max")
+    expected = reference_density(SHAPE, BLOBS, 51)
+
+    assert density.shape == (150, 200)
+    assert density.dtype == np.float32
+    assert np.abs(upscale(density, SHAPE) - expected).mean() < 4 / 255
+
+
+def test_density_is_normalized_and_empty_frame_is_zero():
+    density = render_density(SHAPE, BLOBS, blur_sigma(51))
+    assert density.max() == 1.0
+    assert density.min() >= 0.0
+    assert not render_density(SHAPE, [], blur_sigma(51)).any()
+
+
+def test_sum_accumulates_overlaps_and_max_merges_them():
+    # İki kişi üst üste: sum modunda çakışma tek kişiden yoğun, max modunda aynı
+    overlapping = [(400, 400, 60, 60, "disc"), (420, 400, 60, 60, "disc"), (1200, 400, 60, 60, "disc")]
+    summed = render_density(SHAPE, overlapping, blur_sigma(51), accumulate="sum")
+    merged = render_density(SHAPE, overlapping, blur_sigma(51), accumulate="max")
+
+    lone = (400 // 8, 1200 // 8)
+    assert summed[lone] < 0.7
+    assert merged[lone] == merged.max()
+
+
+def test_blobs_outside_frame_are_clipped():
+    density = render_density((240, 320), [(-30, 120, 40, 40, "rect"), (330, 10, 40, 40, "disc")], 4.0)
+    assert density.shape == (30, 40)
+    assert density[:, 0].max() > 0
+    assert density[0, -1] > 0
+
+
+def test_overlay_keeps_image_size():
+    image = np.full((240, 320, 3), 80, np.uint8)
+    density = render_density(image.shape, [(160, 120, 40, 40, "disc")], blur_sigma(51))
+    overlay = render_overlay(image, density, 0.6, 0.4)
+
+    assert overlay.shape == image.shape
+    assert overlay.dtype == np.uint8
+    # Yoğunluk merkezinde renk değişir, uzak köşede sadece JET'in taban rengi
+    assert not np.array_equal(overlay[120, 160], overlay[5, 5])
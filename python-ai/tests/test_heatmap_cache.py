@@ -0,0 +1,128 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from heatmap_cache import LazyHeatmapCache
+
+
+class MemoryStore:
+    """HeatmapStore yerine: yazılan dosyaları bellekte tutar"""
+
+    def __init__(self, fail=False):
+        self.files = {}
+        self.fail = fail
+
+    def write_bytes(self, filename, data):
+        if self.fail:
+            raise OSError("disk dolu")
+        self.files[filename] = data
+
+
+class CountingRender:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, image, detections):
+        with self.lock:
+            self.calls += 1
+        return 255 - image
+
+
+def frame():
+    ok, data = cv2.imencode(".jpg", np.full((48, 64, 3), 90, np.uint8))
+    return data.tobytes()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "zaman aşımı"
+        time.sleep(0.01)
+
+
+def test_first_get_renders_and_writes_then_cache_hits():
+    render, store = CountingRender(), MemoryStore()
+    cache = LazyHeatmapCache(render, store)
+    cache.register("a.jpg", frame(), [])
+
+    first = cache.get("a.jpg")
+    assert cache.get("a.jpg") == first
+    assert store.files == {"a.jpg": first}
+    assert render.calls == 1
+    assert cache.get("unknown.jpg") is None
+    stats = cache.stats()
+    assert (stats["pending"], stats["renders"], stats["hits"], stats["misses"]) == (0, 1, 1, 1)
+
+
+def test_concurrent_requests_share_one_render():
+    render, store = CountingRender(), MemoryStore()
+    cache = LazyHeatmapCache(render, store)
+    cache.register("a.jpg", frame(), [])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a.jpg"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert render.calls == 1
+    assert len(set(results)) == 1
+
+
+def test_evicted_pending_frame_is_written_in_background():
+    store = MemoryStore()
+    cache = LazyHeatmapCache(CountingRender(), store, max_pending=2)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        cache.register(name, frame(), [])
+
+    # Bütçeden taşan en eski kare düşmez, arka planda diske yazılır
+    wait_until(lambda: "a.jpg" in store.files)
+    wait_until(lambda: cache.stats()["spilling"] == 0)
+    assert cache.stats()["spilled"] == 1
+    assert cache.stats()["pending"] == 2
+    assert cache.get("a.jpg") == store.files["a.jpg"]
+
+
+def test_flush_writes_every_pending_frame():
+    store = MemoryStore()
+    cache = LazyHeatmapCache(CountingRender(), store)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        cache.register(name, frame(), [])
+
+    cache.flush()
+    assert sorted(store.files) == ["a.jpg", "b.jpg", "c.jpg"]
+    assert cache.stats()["pending"] == 0
+    assert cache.stats()["spilling"] == 0
+
+
+def test_spill_queue_overflow_drops_oldest():
+    store = MemoryStore()
+    cache = LazyHeatmapCache(CountingRender(), store, max_pending=1)
+    # Arka plan thread'i başlamasın; taşan kareler flush'a kadar sırada kalır
+    cache._spill_thread = object()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        cache.register(name, frame(), [])
+
+    assert cache.stats()["dropped"] == 1
+    cache.flush()
+    assert sorted(store.files) == ["b.jpg", "c.jpg"]
+
+
+def test_write_error_keeps_frame_pending():
+    store = MemoryStore(fail=True)
+    cache = LazyHeatmapCache(CountingRender(), store)
+    cache.register("a.jpg", frame(), [])
+
+    # İstek yine de cevaplanır, kaynak kare bir sonraki deneme için kalır
+    assert cache.get("a.jpg") is not None
+    assert cache.stats()["pending"] == 1
+    assert cache.stats()["write_errors"] == 1
+
+    store.fail = False
+    cache.get("a.jpg")
+    assert "a.jpg" in store.files
+    assert cache.stats()["pending"] == 0
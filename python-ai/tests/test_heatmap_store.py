@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from heatmap_store import HeatmapStore
+
+
+class FakeRequest:
+    def __init__(self, **headers):
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+
+def write(store, relpath, size=100, age_s=0):
+    store.write_bytes(relpath, b"x" * size)
+    if age_s:
+        stamp = time.time() - age_s
+        os.utime(store.resolve(relpath), (stamp, stamp))
+
+
+def test_names_are_unique_sharded_and_sanitized(tmp_path):
+    store = HeatmapStore(root=str(tmp_path))
+    names = {store.new_name(5, "Giriş Kapısı/../x") for _ in range(200)}
+
+    assert len(names) == 200
+    camera, day, filename = next(iter(names)).split("/")
+    assert camera == "5"
+    assert len(day) == 8 and day.isdigit()
+    assert filename.startswith("heatmap_Giri_Kap_s_x_") and filename.endswith(".jpg")
+    assert store.new_name(None, None).startswith("unknown/")
+
+
+def test_resolve_rejects_paths_outside_root(tmp_path):
+    store = HeatmapStore(root=str(tmp_path))
+    assert store.resolve("5/20240101/a.jpg") == os.path.join(str(tmp_path), "5", "20240101", "a.jpg")
+    assert store.resolve("../secret.jpg") is None
+    assert store.resolve("/etc/passwd") is None
+    with pytest.raises(ValueError):
+        store.write_bytes("../escape.jpg", b"x")
+
+
+def test_write_bytes_leaves_no_temp_file(tmp_path):
+    store = HeatmapStore(root=str(tmp_path))
+    store.write_bytes("1/20240101/a.jpg", b"jpeg")
+
+    assert os.listdir(tmp_path / "1" / "20240101") == ["a.jpg"]
+    assert (store.files, store.disk_bytes, store.written) == (1, 4, 1)
+
+
+def test_sweep_removes_old_files_and_day_folders(tmp_path):
+    store = HeatmapStore(root=str(tmp_path), max_disk_mb=0, max_age_hours=1)
+    write(store, "1/20000101/old_day.jpg")
+    today = time.strftime("%Y%m%d")
+    write(store, f"1/{today}/stale.jpg", age_s=2 * 3600)
+    write(store, f"1/{today}/fresh.jpg")
+
+    assert store.sweep() == 2
+    assert not (tmp_path / "1" / "20000101").exists()
+    assert os.listdir(tmp_path / "1" / today) == ["fresh.jpg"]
+    assert store.files == 1
+
+
+def test_sweep_enforces_disk_budget_oldest_first(tmp_path):
+    store = HeatmapStore(root=str(tmp_path), max_disk_mb=250 / (1024 * 1024), max_age_hours=0)
+    today = time.strftime("%Y%m%d")
+    for index, age in enumerate((300, 200, 100, 0)):
+        write(store, f"1/{today}/{index}.jpg", age_s=age)
+
+    assert store.sweep() == 2
+    assert sorted(os.listdir(tmp_path / "1" / today)) == ["2.jpg", "3.jpg"]
+    assert store.disk_bytes == 200
+
+
+def test_serve_returns_etag_and_304(tmp_path):
+    store = HeatmapStore(root=str(tmp_path))
+    store.write_bytes("1/20240101/a.jpg", b"jpeg")
+
+    async def scenario():
+        response = await store.serve("1/20240101/a.jpg")
+        etag = response.headers["etag"]
+        cached = await store.serve("1/20240101/a.jpg", FakeRequest(if_none_match=etag))
+        with pytest.raises(HTTPException) as missing:
+            await store.serve("1/20240101/missing.jpg")
+        return response, cached, missing.value
+
+    response, cached, missing = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert cached.status_code == 304
+    assert missing.status_code == 404
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import hourly_rollup
+from hourly_rollup import HourlyRollup
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def executemany(self, sql, records):
+        if self.pool.fail:
+            raise ConnectionError("db yok")
+        self.pool.batches.append(list(records))
+
+    async def fetchval(self, sql):
+        return self.pool.offset
+
+
+class FakePool:
+    """asyncpg pool yerine: UPSERT batch'lerini kaydeder, sabit saat farkı döner"""
+
+    def __init__(self, offset=timedelta(0), fail=False):
+        self.offset = offset
+        self.fail = fail
+        self.batches = []
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def by_key(records):
+    return {record[:3]: record[3:] for record in records}
+
+
+def test_analyses_in_same_hour_share_one_bucket():
+    pool = FakePool()
+    rollup = HourlyRollup(pool)
+    rollup.add(1, "Giriş", 3, 0.3, entries=2, exits=0, occupancy=2, now=datetime(2024, 5, 1, 10, 5))
+    rollup.add(1, "Giriş", 7, 0.7, entries=1, exits=1, occupancy=4, now=datetime(2024, 5, 1, 10, 55))
+    rollup.add(1, "Giriş", 5, 0.5, now=datetime(2024, 5, 1, 11, 0))
+    rollup.add(2, None, 1, 0.1, now=datetime(2024, 5, 1, 10, 30))
+
+    assert run(rollup.flush())
+    rows = by_key(pool.batches[0])
+    # count, person sum/min/max, density sum/min/max, entries, exits, occupancy_max
+    assert rows[(1, "Giriş", datetime(2024, 5, 1, 10))][:3] == (2, 10, 3)
+    assert rows[(1, "Giriş", datetime(2024, 5, 1, 10))][3:] == (7, pytest.approx(1.0), 0.3, 0.7, 3, 1, 4)
+    assert rows[(1, "Giriş", datetime(2024, 5, 1, 11))] == (1, 5, 5, 5, 0.5, 0.5, 0.5, 0, 0, None)
+    assert (2, "Unknown", datetime(2024, 5, 1, 10)) in rows
+    assert rollup.stats()["pending_rows"] == 0
+
+
+def test_each_flush_writes_only_the_delta():
+    pool = FakePool()
+    rollup = HourlyRollup(pool)
+    hour = datetime(2024, 5, 1, 10)
+    rollup.add(1, "A", 4, 0.4, now=hour)
+    run(rollup.flush())
+    rollup.add(1, "A", 6, 0.6, now=hour + timedelta(minutes=20))
+    run(rollup.flush())
+
+    # UPSERT toplar; ikinci flush yalnızca yeni analizi gönderir
+    assert [by_key(batch)[(1, "A", hour)][:2] for batch in pool.batches] == [(1, 4), (1, 6)]
+    assert run(rollup.flush()) is True
+    assert len(pool.batches) == 2
+
+
+def test_failed_flush_merges_with_later_analyses():
+    pool = FakePool(fail=True)
+    rollup = HourlyRollup(pool)
+    hour = datetime(2024, 5, 1, 10)
+    rollup.add(1, "A", 4, 0.4, entries=1, occupancy=3, now=hour)
+    assert run(rollup.flush()) is False
+
+    rollup.add(1, "A", 9, 0.9, exits=1, occupancy=2, now=hour + timedelta(minutes=1))
+    pool.fail = False
+    assert run(rollup.flush()) is True
+
+    row = by_key(pool.batches[0])[(1, "A", hour)]
+    assert row[:4] == (2, 13, 4, 9)
+    assert row[7:] == (1, 1, 3)
+    assert rollup.stats()["flush_errors"] == 1
+
+
+def test_live_bucket_uses_database_clock_offset(monkeypatch):
+    monkeypatch.setattr(hourly_rollup, "utc_now", lambda: datetime(2024, 5, 1, 21, 30))
+    pool = FakePool(offset=timedelta(hours=3))
+    rollup = HourlyRollup(pool)
+    run(rollup.sync_clock())
+    rollup.add(1, "A", 1, 0.1)
+
+    assert rollup.stats()["clock_offset_s"] == 3 * 3600
+    # UTC 21:30 + 3 saat = database saatiyle ertesi gün 00:00 kovası
+    assert list(rollup._partials) == [(1, "A", datetime(2024, 5, 2, 0))]
+
+
+def test_stop_flushes_remaining_partials():
+    pool = FakePool()
+
+    async def scenario():
+        rollup = HourlyRollup(pool, flush_interval=60)
+        await rollup.start()
+        rollup.add(1, "A", 2, 0.2, now=datetime(2024, 5, 1, 10))
+        await rollup.stop()
+
+    run(scenario())
+    assert len(pool.batches) == 1
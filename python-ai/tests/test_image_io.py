@@ -0,0 +1,73 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from image_io import decode_image, jpeg_size, read_frame, reduction_factor, scale_detections
+
+
+def jpeg(width, height, progressive=False):
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    params = [cv2.IMWRITE_JPEG_PROGRESSIVE, 1] if progressive else []
+    ok, data = cv2.imencode(".jpg", image, params)
+    assert ok
+    return data.tobytes()
+
+
+@pytest.mark.parametrize("progressive", [False, True])
+def test_jpeg_size_reads_header(progressive):
+    assert jpeg_size(jpeg(1600, 1200, progressive)) == (1600, 1200)
+
+
+def test_jpeg_size_rejects_other_data():
+    ok, png = cv2.imencode(".png", np.zeros((4, 4, 3), np.uint8))
+    assert jpeg_size(png.tobytes()) is None
+    assert jpeg_size(b"\xff\xd8") is None
+    assert jpeg_size(b"") is None
+
+
+@pytest.mark.parametrize("size,max_side,factor", [
+    ((1600, 1200), 640, 2),
+    ((1600, 1200), 400, 4),
+    ((1600, 1200), 200, 8),
+    ((1600, 1200), 1000, 1),
+    ((640, 480), 640, 1),
+    ((1600, 1200), 0, 1),
+])
+def test_reduction_factor_never_goes_below_max_side(size, max_side, factor):
+    assert reduction_factor(*size, max_side) == factor
+
+
+def test_decode_image_reduces_and_reports_original_size():
+    data = jpeg(1600, 1200)
+    image, original = decode_image(data, max_side=400)
+    assert image.shape == (300, 400, 3)
+    assert original == (1600, 1200)
+
+    full, original = decode_image(data, max_side=0)
+    assert full.shape == (1200, 1600, 3)
+    assert original == (1600, 1200)
+    assert decode_image(b"not a jpeg") == (None, None)
+    assert decode_image(b"") == (None, None)
+
+
+def test_scale_detections_to_original_coordinates():
+    detections = [{"bbox": [10, 20, 30, 60], "center": [20, 40], "area": 800, "confidence": 0.9}]
+    scaled = scale_detections(detections, 4, 4)
+
+    assert scaled == [{"bbox": [40, 80, 120, 240], "center": [80, 160], "area": 12800, "confidence": 0.9}]
+    assert scale_detections(detections, 1, 1) is detections
+
+
+def test_read_frame_prefers_multipart_file():
+    class Upload:
+        async def read(self):
+            return b"multipart"
+
+    class Request:
+        async def body(self):
+            return b"raw"
+
+    assert asyncio.run(read_frame(Request(), Upload())) == b"multipart"
+    assert asyncio.run(read_frame(Request())) == b"raw"
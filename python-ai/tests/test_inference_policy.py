@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from inference_policy import InferencePolicy, load_policy, merge_tile_detections, native_size, tile_grid
+
+
+def result(boxes, scores):
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4), np.asarray(scores, dtype=np.float32)
+
+
+EMPTY = result([], [])
+
+
+@pytest.mark.parametrize("width,height,tile", [(1920, 1080, 640), (3840, 2160, 960), (1280, 720, 640), (2000, 300, 480)])
+def test_tile_grid_covers_frame_with_overlap(width, height, tile):
+    tiles = tile_grid(width, height, tile, overlap=0.2, max_tiles=6)
+    assert 1 <= len(tiles) <= 6
+
+    covered = np.zeros((height, width), dtype=bool)
+    for x0, y0, x1, y1 in tiles:
+        assert 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+    # Yan yana parçalar örtüşür (kenardaki kişi bir parçada bütün görünür)
+    xs = sorted({(x0, x1) for x0, _, x1, _ in tiles})
+    for (_, left_end), (right_start, _) in zip(xs, xs[1:]):
+        assert right_start < left_end
+
+
+def test_tile_grid_small_frame_is_single_tile():
+    assert tile_grid(320, 240, 640) == [(0, 0, 320, 240)]
+
+
+def test_person_in_overlap_is_counted_once():
+    tiles = [(0, 0, 800, 800), (640, 0, 1440, 800)]
+    person = [660, 100, 740, 300]
+    tile_results = [
+        result([person], [0.9]),
+        result([[person[0] - 640, 100, person[2] - 640, 300]], [0.85]),
+    ]
+    full = result([[662, 98, 741, 302]], [0.7])
+
+    boxes, scores = merge_tile_detections(tiles, tile_results, full, 1440, 800)
+    assert len(boxes) == 1
+    assert boxes[0].tolist() == person
+    assert scores[0] == pytest.approx(0.9)
+
+
+def test_box_cut_at_inner_tile_edge_is_dropped_for_neighbours_whole_box():
+    tiles = [(0, 0, 800, 800), (640, 0, 1440, 800)]
+    tile_results = [
+        # Sol parçada kişinin yarısı: sağ kenara (800) değiyor
+        result([[760, 100, 800, 300]], [0.95]),
+        # Sağ parça aynı kişiyi bütün görür
+        result([[120, 100, 220, 300]], [0.8]),
+    ]
+
+    boxes, _ = merge_tile_detections(tiles, tile_results, EMPTY, 1440, 800)
+    assert boxes.tolist() == [[760, 100, 860, 300]]
+
+
+def test_frame_edge_boxes_and_distinct_people_are_kept():
+    tiles = [(0, 0, 800, 800), (640, 0, 1440, 800)]
+    tile_results = [
+        # Karenin kendi kenarına değen kutu kesik sayılmaz
+        result([[0, 100, 60, 300], [300, 100, 360, 300]], [0.9, 0.9]),
+        result([[740, 500, 800, 800]], [0.9]),
+    ]
+
+    boxes, _ = merge_tile_detections(tiles, tile_results, EMPTY, 1440, 800)
+    assert sorted(boxes.tolist()) == [[0, 100, 60, 300], [300, 100, 360, 300], [1380, 500, 1440, 800]]
+
+
+def test_plan_never_upscales_past_native_size():
+    policy = InferencePolicy(load_policy('{"default": {"imgsz": 960}}'), sizes=[320, 480, 640, 960])
+    plan = policy.plan(1, 320, 240)
+    assert plan.imgsz == native_size(320, 240) == 320
+    assert plan.reason == "native"
+
+
+def test_auto_size_follows_crowd():
+    policy = InferencePolicy(load_policy('{"default": {"imgsz": "auto"}}'), sizes=[320, 480, 640, 960, 1280])
+    first = policy.plan(1, 1920, 1080)
+    assert (first.imgsz, first.reason) == (640, "auto")
+
+    policy.observe(1, 0, [], first, 1920, 1080)
+    empty = policy.plan(1, 1920, 1080)
+    assert (empty.imgsz, empty.reason) == (320, "empty")
+
+    # Model girişinde 32px'den kısa kutular: uzaktaki kişiler, boyut büyür
+    small = [[x, 100, x + 10, 140] for x in range(0, 400, 40)]
+    policy = InferencePolicy(load_policy('{"default": {"imgsz": "auto"}}'), sizes=[320, 480, 640, 960, 1280])
+    policy.observe(2, len(small), small, first, 1920, 1080)
+    assert policy.plan(2, 1920, 1080).imgsz == 960
+
+
+def test_tiles_only_for_frames_much_larger_than_input():
+    policy = InferencePolicy(load_policy('{"default": {"imgsz": 640, "tiles": "on"}}'))
+    assert policy.plan(1, 1920, 1080).tiles
+    assert policy.plan(1, 800, 600).tiles is None
+
+
+def test_load_policy_validates_rules():
+    with pytest.raises(ValueError):
+        load_policy('{"5": {"imgsz": "big"}}')
+    with pytest.raises(ValueError):
+        load_policy('{"default": {"tiles": "maybe"}}')
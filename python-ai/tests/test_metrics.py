@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import metrics
+from metrics import Counter, FrameMetrics, Gauge, Histogram, MetricsRegistry, track_frames
+
+
+def test_counter_renders_escaped_labels():
+    counter = Counter("cityv_test_total", "Test", ("camera", "zone"))
+    counter.inc(camera=5, zone='Giriş "A"')
+    counter.inc(2, camera=5, zone='Giriş "A"')
+
+    assert counter.render() == [
+        "# HELP cityv_test_total Test",
+        "# TYPE cityv_test_total counter",
+        'cityv_test_total{camera="5",zone="Giriş \\"A\\""} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative_and_le_inclusive():
+    histogram = Histogram("cityv_test_seconds", "Test", ("stage",), buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value, stage="detect")
+
+    lines = histogram.render()[2:]
+    assert lines[:4] == [
+        'cityv_test_seconds_bucket{stage="detect",le="0.1"} 2',
+        'cityv_test_seconds_bucket{stage="detect",le="0.5"} 3',
+        'cityv_test_seconds_bucket{stage="detect",le="1.0"} 3',
+        'cityv_test_seconds_bucket{stage="detect",le="+Inf"} 4',
+    ]
+    assert lines[4].startswith('cityv_test_seconds_sum{stage="detect"} 2.45')
+    assert lines[5] == 'cityv_test_seconds_count{stage="detect"} 4'
+
+
+def test_gauge_function_is_read_at_render_time():
+    gauge = Gauge("cityv_test_frames", "Test", ("state",))
+    state = {"inflight": 1}
+    gauge.set_function(lambda: {("inflight",): state["inflight"]})
+    state["inflight"] = 3
+    assert gauge.render()[-1] == 'cityv_test_frames{state="inflight"} 3'
+
+    # Okuma hatası render'ı bozmaz
+    gauge.set_function(lambda: 1 / 0)
+    assert gauge.render() == gauge.header()
+
+
+def test_registry_returns_existing_metric_for_same_name():
+    registry = MetricsRegistry()
+    first = registry.counter("cityv_a_total", "A")
+    assert registry.counter("cityv_a_total", "A") is first
+    first.inc()
+    assert registry.render().endswith("cityv_a_total 1\n")
+
+
+def test_frame_metrics_accumulate_stages():
+    frame = FrameMetrics("test", None, "yolo")
+    with frame.stage("decode"):
+        pass
+    frame.add("detect", 12.5)
+    frame.add("detect", 7.5)
+    frame.finish("analyzed", person_count=3)
+
+    stages = frame.as_dict()
+    assert frame.camera == "0"
+    assert stages["detect"] == 20.0
+    assert set(stages) == {"decode", "detect", "total"}
+
+
+def test_track_frames_counts_inflight_and_errors():
+    service = "test-track"
+
+    @track_frames(service, "yolo")
+    async def analyze(contents, camera_id, location_zone):
+        assert metrics.INFLIGHT._values[(service,)] == 1
+        if contents == b"bad":
+            raise ValueError("decode")
+        return {"ok": True}
+
+    async def scenario():
+        await analyze(b"ok", "5", "Z")
+        with pytest.raises(ValueError):
+            await analyze(b"bad", "5", "Z")
+
+    asyncio.run(scenario())
+    assert metrics.INFLIGHT._values[(service,)] == 0
+    if metrics.METRICS_ENABLED:
+        assert metrics.ERRORS._values[(service, "5", "ValueError")] == 1
+        assert metrics.FRAMES._values[(service, "5", "yolo", "error")] == 1
@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+
+from motion_gate import MotionGate, bbox_xywh, merge_roi_detections, outside_roi
+
+
+def jpeg(image):
+    ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    return data.tobytes()
+
+
+def scene():
+    """Düz gri arka planlı 640x480 sahne"""
+    return np.full((480, 640, 3), 120, np.uint8)
+
+
+def primed_gate(**kwargs):
+    gate = MotionGate(**kwargs)
+    base = jpeg(scene())
+    decision = gate.probe(1, base)
+    gate.commit(1, decision, {"analysis": {"person_count": 2}})
+    return gate, base
+
+
+def test_first_frame_is_full_then_static_frame_is_reused():
+    gate, base = primed_gate()
+    decision = gate.probe(1, base)
+
+    assert decision.reused
+    assert decision.payload == {"analysis": {"person_count": 2}}
+    assert gate.stats()["full"] == 1
+    assert gate.stats()["reused"] == 1
+
+
+def test_small_change_yields_roi_around_it():
+    gate, _ = primed_gate()
+    image = scene()
+    image[40:120, 480:560] = 255
+    decision = gate.probe(1, jpeg(image))
+
+    assert not decision.reused
+    assert decision.roi is not None
+    x0, y0, x1, y1 = decision.roi_pixels(640, 480)
+    assert x0 <= 480 and y0 <= 40 and x1 >= 560 and y1 >= 120
+    assert (x1 - x0) * (y1 - y0) < 0.35 * 640 * 480
+    # ROI analizinde önceki sonuç bölge dışı tespitler için taşınır
+    assert decision.payload is not None
+
+
+def test_large_change_falls_back_to_full_frame():
+    gate, _ = primed_gate()
+    image = scene()
+    image[:, :400] = 255
+    decision = gate.probe(1, jpeg(image))
+
+    assert not decision.reused
+    assert decision.roi is None
+    assert decision.payload is None
+
+
+def test_stale_reference_forces_full_analysis():
+    gate, base = primed_gate(max_reuse_s=0.0)
+    decision = gate.probe(1, base)
+
+    assert not decision.reused
+    assert decision.roi is None
+
+
+def test_cameras_are_independent():
+    gate, base = primed_gate()
+    assert not gate.probe(2, base).reused
+
+
+def test_outside_roi_uses_half_open_box():
+    roi = (100, 100, 200, 200)
+    assert not outside_roi([100, 150], roi)
+    assert outside_roi([200, 150], roi)
+    assert outside_roi([50, 50], roi)
+
+
+def test_merge_roi_detections_replaces_boundary_duplicate():
+    kept = [
+        {"bbox": [10, 10, 60, 110], "id": "old-far"},
+        {"bbox": [190, 100, 240, 200], "id": "old-edge"},
+    ]
+    fresh = [
+        {"bbox": [192, 102, 242, 202], "id": "new-edge"},
+        {"bbox": [300, 100, 350, 200], "id": "new"},
+    ]
+    merged = merge_roi_detections(kept, fresh, bbox_xywh)
+
+    # Sınırdaki kişi bir kez sayılır ve yeni tespit kalır
+    assert [det["id"] for det in merged] == ["old-far", "new-edge", "new"]
+
+
+def test_merge_roi_detections_with_xywh_and_empty_sides():
+    kept = [[0, 0, 50, 100]]
+    fresh = [[2, 1, 50, 100], [400, 0, 50, 100]]
+    assert merge_roi_detections(kept, fresh) == fresh
+    assert merge_roi_detections([], fresh) == fresh
+    assert merge_roi_detections(kept, []) == kept
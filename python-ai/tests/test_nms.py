@@ -0,0 +1,80 @@
+import numpy as np
+
+from nms import non_max_suppression
+
+
+def reference_nms(boxes, scores, iou_threshold, score_threshold=0.0, containment_threshold=1.0):
+    """Skaler, karesel referans: skor sırasıyla her kutuyu tutulanlarla tek tek kıyaslar"""
+    def overlap(a, b):
+        ax2, ay2 = a[0] + a[2], a[1] + a[3]
+        bx2, by2 = b[0] + b[2], b[1] + b[3]
+        inter = max(0.0, min(ax2, bx2) - max(a[0], b[0])) * max(0.0, min(ay2, by2) - max(a[1], b[1]))
+        area_a = max(a[2], 0) * max(a[3], 0)
+        area_b = max(b[2], 0) * max(b[3], 0)
+        union = area_a + area_b - inter
+        smaller = min(area_a, area_b)
+        return (inter / union if union > 0 else 0.0), (inter / smaller if smaller > 0 else 0.0)
+
+    order = sorted((i for i in range(len(boxes)) if scores[i] >= score_threshold),
+                   key=lambda i: -scores[i])
+    keep = []
+    for i in order:
+        suppressed = False
+        for j in keep:
+            iou, contained = overlap(boxes[j], boxes[i])
+            if iou > iou_threshold or (containment_threshold < 1.0 and contained > containment_threshold):
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(i)
+    return keep
+
+
+def random_boxes(rng, n):
+    xy = rng.uniform(0, 600, size=(n, 2))
+    wh = rng.uniform(8, 160, size=(n, 2))
+    # float32 yuvarlama farkı olmasın diye tam sayı kutular
+    return np.round(np.hstack([xy, wh])).astype(np.float32), rng.permutation(n).astype(np.float32) / n
+
+
+def test_matches_quadratic_reference_on_random_boxes():
+    rng = np.random.default_rng(7)
+    for _ in range(30):
+        boxes, scores = random_boxes(rng, 60)
+        for iou_threshold, containment in ((0.4, 1.0), (0.3, 0.7), (0.6, 0.9)):
+            expected = reference_nms(boxes.tolist(), scores.tolist(), iou_threshold,
+                                     containment_threshold=containment)
+            kept = non_max_suppression(boxes, scores, iou_threshold=iou_threshold,
+                                       score_threshold=0.0, containment_threshold=containment)
+            assert kept.tolist() == expected
+
+
+def test_keeps_small_neighbours_the_old_offset_check_merged():
+    # Uzaktaki iki küçük kişi 20px arayla: eski 50px kontrolü birini silerdi
+    boxes = [[100, 100, 15, 30], [120, 105, 15, 30]]
+    kept = non_max_suppression(boxes, [0.9, 0.8], iou_threshold=0.4, containment_threshold=0.7)
+    assert sorted(kept.tolist()) == [0, 1]
+
+
+def test_merges_large_overlapping_boxes_the_old_offset_check_kept():
+    # Aynı kişinin iki büyük kutusu 60px kaymış: eski kontrol ikisini de sayardı
+    boxes = [[100, 100, 300, 600], [160, 130, 300, 600]]
+    kept = non_max_suppression(boxes, [0.9, 0.8], iou_threshold=0.4, containment_threshold=1.0)
+    assert kept.tolist() == [0]
+
+
+def test_contained_box_is_suppressed_by_containment():
+    fullbody = [100, 100, 100, 300]
+    upperbody = [110, 110, 80, 100]
+    scores = [0.9, 0.5]
+    assert non_max_suppression([fullbody, upperbody], scores, containment_threshold=0.7).tolist() == [0]
+    assert non_max_suppression([fullbody, upperbody], scores, containment_threshold=1.0).tolist() == [0, 1]
+
+
+def test_score_threshold_order_and_empty_input():
+    boxes = [[0, 0, 10, 10], [100, 0, 10, 10], [200, 0, 10, 10]]
+    kept = non_max_suppression(boxes, [0.2, 0.9, 0.5], score_threshold=0.3)
+    assert kept.tolist() == [1, 2]
+    # Eşit skorlarda giriş sırası korunur
+    assert non_max_suppression(boxes, [0.5, 0.5, 0.5]).tolist() == [0, 1, 2]
+    assert non_max_suppression([], []).tolist() == []
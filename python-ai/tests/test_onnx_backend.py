@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from onnx_backend import OnnxYolo, letterbox, rect_shape
+
+
+@pytest.mark.parametrize("image_shape,imgsz,expected", [
+    ((480, 640), 640, (480, 640)),
+    ((480, 640), 320, (256, 320)),
+    ((1080, 1920), 640, (384, 640)),
+    ((640, 640), 416, (416, 416)),
+])
+def test_rect_shape_keeps_aspect_on_stride(image_shape, imgsz, expected):
+    assert rect_shape(image_shape, imgsz) == expected
+
+
+def test_letterbox_centers_image_with_gray_padding():
+    image = np.zeros((480, 640, 3), np.uint8)
+    padded, scale, (pad_x, pad_y) = letterbox(image, (256, 320))
+
+    assert padded.shape == (256, 320, 3)
+    assert scale == 0.5
+    assert (pad_x, pad_y) == (0, 8)
+    assert (padded[:8] == 114).all() and (padded[-8:] == 114).all()
+    assert (padded[8:-8] == 0).all()
+
+
+class FakeSession:
+    """ONNX oturumu yerine: giriş boyutunu kaydeder, hazır tahmini döner"""
+
+    def __init__(self, prediction):
+        self.prediction = prediction
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        batch = feeds["images"]
+        self.batches.append(batch.shape)
+        return [np.stack([self.prediction] * len(batch))]
+
+
+def model(prediction, imgsz=320):
+    yolo = OnnxYolo.__new__(OnnxYolo)
+    yolo.session = FakeSession(prediction)
+    yolo.input_name = "images"
+    yolo.fixed_shape = None
+    yolo.max_batch = None
+    yolo.imgsz = imgsz
+    yolo.iou_threshold = 0.7
+    yolo.max_det = 300
+    return yolo
+
+
+def prediction(candidates):
+    """(cx, cy, w, h, kişi skoru, diğer sınıf skoru) adaylarından (6, N) YOLOv8 çıktısı"""
+    return np.asarray(candidates, dtype=np.float32).T
+
+
+def test_postprocess_maps_person_boxes_back_to_frame():
+    # 640x480 kare 320 girişte: ölçek 0.5, üstte 8px dolgu.
+    # Orijinal kişi kutusu (100, 50, 200, 250) -> girişte merkez (75, 83), 50x100
+    yolo = model(prediction([
+        [75, 83, 50, 100, 0.9, 0.05],    # kişi
+        [76, 84, 50, 100, 0.8, 0.05],    # aynı kişi, NMS ile elenir
+        [200, 100, 40, 80, 0.6, 0.9],    # en olası sınıf kişi değil
+        [250, 60, 30, 60, 0.1, 0.0],     # eşik altı
+        [318, 200, 20, 40, 0.5, 0.0],    # kare kenarından taşan kişi
+    ]))
+    image = np.zeros((480, 640, 3), np.uint8)
+    [(boxes, scores)] = yolo([image], conf=0.25)
+
+    assert yolo.session.batches == [(1, 3, 256, 320)]
+    assert scores.tolist() == pytest.approx([0.9, 0.5])
+    assert boxes[0].tolist() == pytest.approx([100, 50, 200, 250])
+    # Kırpılır: x2 en fazla kare genişliği
+    assert boxes[1][2] == 640
+
+
+def test_same_input_shape_frames_share_one_call():
+    yolo = model(prediction([[75, 83, 50, 100, 0.9, 0.0]]))
+    frames = [np.zeros((480, 640, 3), np.uint8), np.zeros((480, 640, 3), np.uint8),
+              np.zeros((640, 640, 3), np.uint8)]
+    results = yolo(frames)
+
+    assert sorted(yolo.session.batches) == [(1, 3, 320, 320), (2, 3, 256, 320)]
+    assert len(results) == 3
+
+
+def test_empty_result_shapes():
+    yolo = model(prediction([[75, 83, 50, 100, 0.1, 0.0]]))
+    [(boxes, scores)] = yolo([np.zeros((480, 640, 3), np.uint8)])
+    assert boxes.shape == (0, 4) and scores.shape == (0,)
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from readiness import Startup
+
+
+def test_ready_after_background_load_with_phases():
+    async def scenario():
+        startup = Startup("test")
+        release = asyncio.Event()
+
+        async def load():
+            with startup.phase("model"):
+                await release.wait()
+            with startup.phase("warmup"):
+                pass
+
+        startup.run(load)
+        await asyncio.sleep(0)
+        before = startup.readiness()
+        release.set()
+        await startup._task
+        return startup, before
+
+    startup, before = asyncio.run(scenario())
+    assert before.status_code == 503
+    assert before.headers["Retry-After"] == "1"
+    assert json.loads(before.body)["ready"] is False
+
+    status = startup.readiness()
+    assert status["ready"] is True
+    assert list(status["phases_ms"]) == ["model", "warmup"]
+    assert status["ready_after_ms"] >= status["phases_ms"]["model"]
+
+
+def test_failed_load_reports_error_and_stays_unready():
+    async def scenario():
+        startup = Startup("test")
+
+        async def load():
+            with startup.phase("model"):
+                raise FileNotFoundError("yolov8n.pt")
+
+        startup.run(load)
+        await startup._task
+        return startup
+
+    startup = asyncio.run(scenario())
+    assert startup.ready is False
+    assert startup.error == "FileNotFoundError: yolov8n.pt"
+    # Başarısız faz da süresiyle kaydedilir
+    assert "model" in startup.status()["phases_ms"]
+    assert startup.not_ready().status_code == 503
+
+
+def test_stop_cancels_pending_load():
+    async def scenario():
+        startup = Startup("test")
+        startup.run(lambda: asyncio.sleep(60))
+        await asyncio.sleep(0)
+        await startup.stop()
+        return startup
+
+    startup = asyncio.run(scenario())
+    assert startup.ready is False
+    assert startup.error is None
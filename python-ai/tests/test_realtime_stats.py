@@ -0,0 +1,80 @@
+import pytest
+
+from realtime_stats import RealtimeStats, RingWindow
+
+T0 = 1_700_000_000.0
+
+
+def test_ring_window_aggregates_recent_buckets():
+    window = RingWindow(slots=60, resolution=1)
+    window.add(T0, 2, 0.2)
+    window.add(T0 + 0.5, 6, 0.6)
+    window.add(T0 + 30, 4, 0.1)
+
+    summary = window.summary(T0 + 30)
+    assert summary["analysis_count"] == 3
+    assert summary["avg_person_count"] == 4.0
+    assert summary["max_person_count"] == 6
+    assert summary["avg_crowd_density"] == pytest.approx(0.3)
+    assert summary["max_crowd_density"] == 0.6
+
+
+def test_ring_window_expires_old_buckets_without_deleting():
+    window = RingWindow(slots=60, resolution=1)
+    window.add(T0, 10, 1.0)
+    window.add(T0 + 45, 2, 0.2)
+
+    assert window.summary(T0 + 59)["analysis_count"] == 2
+    # İlk kare pencereden çıktı
+    assert window.summary(T0 + 61)["max_person_count"] == 2
+    assert window.summary(T0 + 200)["analysis_count"] == 0
+    assert window.summary(T0 + 200)["avg_person_count"] is None
+
+
+def test_reused_slot_resets_previous_round():
+    window = RingWindow(slots=60, resolution=1)
+    window.add(T0, 10, 1.0)
+    # Aynı halka dilimi bir tur sonra: eski değerler sıfırlanır
+    window.add(T0 + 60, 1, 0.1)
+    assert window.summary(T0 + 60) == {
+        "analysis_count": 1, "avg_person_count": 1.0, "max_person_count": 1,
+        "avg_crowd_density": 0.1, "max_crowd_density": 0.1,
+    }
+
+
+def test_snapshot_windows_per_camera_and_zone():
+    stats = RealtimeStats()
+    stats.record(1, "Giris", 10, 0.5, now=T0)
+    stats.record(1, "Giris", 4, 0.2, now=T0 + 200)
+    stats.record(2, "Giris", 2, 0.1, now=T0 + 230)
+    stats.record(3, None, 1, 0.05, now=T0 + 230)
+
+    snapshot = stats.snapshot(now=T0 + 240)
+    camera = next(c for c in snapshot["cameras"] if c["camera_id"] == "1")
+    # 1m penceresinde sadece son kare, 5m ve 1h'de ikisi de var
+    assert camera["windows"]["1m"]["max_person_count"] == 4
+    assert camera["windows"]["5m"]["analysis_count"] == 2
+    assert camera["windows"]["1h"]["analysis_count"] == 2
+    # current_* v_ai_realtime_stats gibi 5 dakikalık ortalamadır
+    assert camera["current_person_count"] == 7
+    assert camera["last_person_count"] == 4
+
+    zone = next(z for z in snapshot["zones"] if z["location_zone"] == "Giris")
+    assert zone["windows"]["1h"]["analysis_count"] == 3
+    assert {z["location_zone"] for z in snapshot["zones"]} == {"Giris", "Unknown"}
+
+
+def test_snapshot_filters_and_idle_eviction():
+    stats = RealtimeStats(idle_s=600)
+    stats.record(1, "A", 3, 0.3, now=T0)
+    stats.record(2, "B", 5, 0.5, now=T0 + 500)
+
+    filtered = stats.snapshot(camera_id=2, now=T0 + 510)
+    assert [c["camera_id"] for c in filtered["cameras"]] == ["2"]
+    # Kamera filtresinde bölge özeti dönmez
+    assert filtered["zones"] == []
+    assert [z["location_zone"] for z in stats.snapshot(location_zone="A", now=T0 + 510)["zones"]] == ["A"]
+
+    later = stats.snapshot(now=T0 + 700)
+    assert [c["camera_id"] for c in later["cameras"]] == ["2"]
+    assert [z["location_zone"] for z in later["zones"]] == ["B"]
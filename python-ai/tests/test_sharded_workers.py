@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sharded_workers import HashRing, ShardedInference, _Shard
+
+
+def test_hash_ring_is_stable_and_balanced():
+    ring = HashRing(range(4))
+    keys = [str(camera_id) for camera_id in range(4000)]
+    owners = [ring.node_for(key) for key in keys]
+
+    # Aynı kamera her zaman aynı worker'a gider (yeni halka dahil)
+    assert owners == [HashRing(range(4)).node_for(key) for key in keys]
+    counts = Counter(owners)
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 0.5 * len(keys) / 4
+
+
+def test_adding_a_worker_moves_about_one_nth_of_cameras():
+    keys = [str(camera_id) for camera_id in range(4000)]
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+
+    moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+    # Taşınan kameralar yalnızca yeni worker'a gider
+    assert {after.node_for(key) for key in moved} == {4}
+    assert 0.1 < len(moved) / len(keys) < 0.3
+
+
+class FakeProcess:
+    def is_alive(self):
+        return True
+
+
+def test_cancelled_submit_returns_slot_after_copy_finishes():
+    copy_started = threading.Event()
+    release_copy = threading.Event()
+
+    async def scenario():
+        inference = ShardedInference("yolo", workers=1, slots=1, slot_mb=1)
+        inference._loop = asyncio.get_running_loop()
+        shard = _Shard(0, FakeProcess(), None, None, 1)
+        inference._shards = [shard]
+
+        def slow_write(shard, slot, images):
+            copy_started.set()
+            release_copy.wait(5)
+            return []
+
+        inference._write_slot = slow_write
+        submit = asyncio.ensure_future(inference.submit_many([np.zeros((8, 8, 3), np.uint8)], camera_id=1))
+        while not copy_started.is_set():
+            await asyncio.sleep(0.005)
+
+        submit.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await submit
+        # Kopyalama sürerken slot başka işe verilmez
+        assert shard.free.empty()
+
+        release_copy.set()
+        slot = await asyncio.wait_for(shard.free.get(), 5)
+        return slot, inference.queue_depth()
+
+    assert asyncio.run(scenario()) == (0, 0)
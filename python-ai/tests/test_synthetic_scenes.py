@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+
+from synthetic_scenes import RESOLUTIONS, encode_jpeg, generate_scene, scene_set
+
+
+def test_same_inputs_give_identical_scene():
+    first, first_boxes = generate_scene(320, 240, 5, seed=7, index=2)
+    second, second_boxes = generate_scene(320, 240, 5, seed=7, index=2)
+    other, _ = generate_scene(320, 240, 5, seed=7, index=3)
+
+    assert np.array_equal(first, second)
+    assert first_boxes == second_boxes
+    assert not np.array_equal(first, other)
+
+
+@pytest.mark.parametrize("count", [0, 1, 20])
+def test_boxes_match_count_and_stay_in_frame(count):
+    width, height = RESOLUTIONS["CIF"]
+    image, boxes = generate_scene(width, height, count, seed=1)
+
+    assert image.shape == (height, width, 3) and image.dtype == np.uint8
+    assert len(boxes) == count
+    for x1, y1, x2, y2 in boxes:
+        assert 0 <= x1 < x2 <= width
+        assert 0 <= y1 < y2 <= height
+
+
+def test_people_are_ordered_far_to_near():
+    _, boxes = generate_scene(640, 480, 10, seed=3)
+    # Uzaktakiler önce çizilir: ayak noktası aşağı indikçe figür büyür
+    feet = [box[3] for box in boxes]
+    heights = [box[3] - box[1] for box in boxes]
+    assert feet == sorted(feet)
+    assert heights[-1] > heights[0]
+
+
+def test_scene_set_combinations_and_jpeg():
+    scenes = scene_set(["QVGA", "VGA"], [0, 3], per_combination=2, seed=5)
+
+    assert len(scenes) == 8
+    assert {(s["resolution"], s["person_count"]) for s in scenes} == {
+        ("QVGA", 0), ("QVGA", 3), ("VGA", 0), ("VGA", 3)}
+    decoded = cv2.imdecode(np.frombuffer(scenes[-1]["jpeg"], np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (480, 640, 3)
+    assert encode_jpeg(scenes[-1]["image"]) == scenes[-1]["jpeg"]
+
+
+def test_unknown_resolution_is_rejected():
+    with pytest.raises(ValueError):
+        scene_set(["4K"], [1])
@@ -0,0 +1,91 @@
+import pytest
+
+import tracker as tracker_module
+from tracker import TrackerRegistry, load_counting_lines
+
+WIDTH, HEIGHT = 640, 480
+# Dikey çizgi karenin ortasında, sağ taraf mekanın içi
+LINE = {"5": ([0.5, 0.0, 0.5, 1.0], [0.9, 0.5])}
+
+
+@pytest.fixture(autouse=True)
+def tracker_defaults(monkeypatch):
+    monkeypatch.setattr(tracker_module, "TRACKER_MIN_HITS", 2)
+    monkeypatch.setattr(tracker_module, "TRACKER_MAX_MISSED", 2)
+    monkeypatch.setattr(tracker_module, "TRACKER_IOU_THRESHOLD", 0.3)
+    monkeypatch.setattr(tracker_module, "TRACKER_MAX_DISTANCE", 1.0)
+
+
+def person(x, y=200):
+    return [x, y, x + 40, y + 100]
+
+
+def walk(registry, camera_id, xs, y=200):
+    results = [registry.update(camera_id, [person(x, y)], WIDTH, HEIGHT) for x in xs]
+    return [ids for ids, _ in results], [summary for _, summary in results]
+
+
+def test_crossing_line_inward_counts_one_entry():
+    registry = TrackerRegistry(lines=LINE)
+    ids, summaries = walk(registry, "5", range(200, 481, 40))
+
+    # Kişi boyunca aynı track_id'yi korur
+    assert len({track_ids[0] for track_ids in ids}) == 1
+    assert sum(s["entry_count"] for s in summaries) == 1
+    assert sum(s["exit_count"] for s in summaries) == 0
+    assert summaries[-1]["current_occupancy"] == 1
+
+
+def test_crossing_back_counts_exit_and_occupancy_returns_to_zero():
+    registry = TrackerRegistry(lines=LINE)
+    walk(registry, "5", range(200, 481, 40))
+    _, summaries = walk(registry, "5", range(440, 159, -40))
+
+    assert sum(s["exit_count"] for s in summaries) == 1
+    tracking = summaries[-1]["tracking"]
+    assert (tracking["total_entries"], tracking["total_exits"]) == (1, 1)
+    assert summaries[-1]["current_occupancy"] == 0
+
+
+def test_staying_on_one_side_counts_nothing():
+    registry = TrackerRegistry(lines=LINE)
+    _, summaries = walk(registry, "5", range(380, 561, 30))
+    assert sum(s["entry_count"] + s["exit_count"] for s in summaries) == 0
+
+
+def test_two_people_crossing_in_opposite_directions():
+    registry = TrackerRegistry(lines=LINE)
+    entries = exits = 0
+    for step in range(8):
+        boxes = [person(200 + 40 * step, 50), person(440 - 40 * step, 300)]
+        track_ids, summary = registry.update("5", boxes, WIDTH, HEIGHT)
+        entries += summary["entry_count"]
+        exits += summary["exit_count"]
+
+    assert track_ids == [1, 2]
+    assert (entries, exits) == (1, 1)
+
+
+def test_without_line_confirmed_tracks_enter_and_expire_as_exits():
+    registry = TrackerRegistry(lines={})
+    _, first = registry.update("1", [person(100)], WIDTH, HEIGHT)
+    _, second = registry.update("1", [person(105)], WIDTH, HEIGHT)
+    assert (first["entry_count"], second["entry_count"]) == (0, 1)
+    assert second["current_occupancy"] == 1
+
+    exits = 0
+    for _ in range(3):
+        _, summary = registry.update("1", [], WIDTH, HEIGHT)
+        exits += summary["exit_count"]
+    assert exits == 1
+    assert summary["current_occupancy"] == 0
+
+
+def test_load_counting_lines_validates_input():
+    lines = load_counting_lines('{"5": {"line": [0.5, 0, 0.5, 1], "inside": [0.9, 0.5]}}')
+    assert lines == {"5": ([0.5, 0.0, 0.5, 1.0], [0.9, 0.5])}
+    assert load_counting_lines("") == {}
+    with pytest.raises(ValueError):
+        load_counting_lines("{not json")
+    with pytest.raises(ValueError):
+        load_counting_lines('{"5": {"line": [0.5, 0, 0.5, 1], "inside": [0.5, 0.5]}}')
@@ -0,0 +1,120 @@
+import asyncio
+
+from write_behind import WriteBehindBuffer
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.pool.fail:
+            raise ConnectionError("db yok")
+        self.pool.copies.append((table, list(records), list(columns)))
+
+
+class FakePool:
+    """asyncpg pool yerine: COPY çağrılarını kaydeder"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.copies = []
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+    def rows(self):
+        return [row for _, records, _ in self.copies for row in records]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_flushes_when_batch_size_is_reached():
+    pool = FakePool()
+
+    async def scenario():
+        buffer = WriteBehindBuffer(pool, "iot_ai_analysis", ["a", "b"],
+                                   batch_size=3, flush_interval_ms=60_000)
+        await buffer.start()
+        for i in range(3):
+            buffer.add((i, str(i)))
+        # Zamanlayıcı 60 sn; yazma yalnızca boyut tetiklemesiyle olabilir
+        for _ in range(50):
+            if pool.copies:
+                break
+            await asyncio.sleep(0.01)
+        copies = list(pool.copies)
+        await buffer.stop()
+        return copies
+
+    copies = run(scenario())
+    assert copies == [("iot_ai_analysis", [(0, "0"), (1, "1"), (2, "2")], ["a", "b"])]
+
+
+def test_flushes_on_interval_below_batch_size():
+    pool = FakePool()
+
+    async def scenario():
+        buffer = WriteBehindBuffer(pool, "t", ["a"], batch_size=100, flush_interval_ms=20)
+        await buffer.start()
+        buffer.add((1,))
+        await asyncio.sleep(0.1)
+        rows = pool.rows()
+        await buffer.stop()
+        return rows
+
+    assert run(scenario()) == [(1,)]
+
+
+def test_stop_writes_remaining_rows_in_batches():
+    pool = FakePool()
+
+    async def scenario():
+        buffer = WriteBehindBuffer(pool, "t", ["a"], batch_size=2, flush_interval_ms=60_000)
+        buffer.add((1,))
+        buffer.add((2,))
+        buffer.add((3,))
+        await buffer.start()
+        await buffer.stop()
+        return buffer
+
+    buffer = run(scenario())
+    assert pool.rows() == [(1,), (2,), (3,)]
+    assert [len(records) for _, records, _ in pool.copies] == [2, 1]
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["flushed_total"] == 3
+
+
+def test_failed_flush_keeps_rows_in_order():
+    pool = FakePool(fail=True)
+    buffer = WriteBehindBuffer(pool, "t", ["a"], batch_size=2, flush_interval_ms=60_000)
+    for i in range(3):
+        buffer.add((i,))
+
+    assert run(buffer.flush()) is False
+    assert buffer.stats()["flush_errors"] == 1
+
+    pool.fail = False
+    assert run(buffer.flush()) is True
+    assert pool.rows() == [(0,), (1,), (2,)]
+
+
+def test_full_buffer_drops_oldest_rows():
+    buffer = WriteBehindBuffer(FakePool(), "t", ["a"], batch_size=2, max_rows=3)
+    for i in range(5):
+        buffer.add((i,))
+
+    assert list(buffer._rows) == [(2,), (3,), (4,)]
+    assert buffer.stats()["dropped_total"] == 2
+    assert buffer.stats()["queued_total"] == 5
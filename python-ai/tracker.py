@@ -0,0 +1,292 @@
+"""
+🚶 Kamera başına çoklu kişi takibi ve giriş/çıkış sayımı
+Her karedeki tespitler izlerin (track) sabit hızla tahmin edilen konumlarıyla
+eşleştirilir: önce IoU, eşleşmeyenler için kutu boyutuna göre normalize edilmiş
+merkez uzaklığı.
+Her iz kalıcı bir `track_id` alır.
+
+Sayım:
+- Kameraya sanal sayım çizgisi tanımlıysa (COUNTING_LINES) onaylı bir izin merkezi
+  çizgiyi iç tarafa geçince giriş, dış tarafa geçince çıkış sayılır;
+  current_occupancy = toplam giriş - toplam çıkış.
+- Çizgi yoksa onaylanan yeni iz giriş, kaybolan onaylı iz çıkış sayılır;
+  current_occupancy = sahnedeki onaylı iz sayısı.
+
+COUNTING_LINES örneği (koordinatlar kareye oranla 0-1):
+    {"5": {"line": [0.5, 0, 0.5, 1], "inside": [0.9, 0.5]}}
+"inside" çizginin iç (mekan) tarafında kalan herhangi bir noktadır.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+TRACKER_ENABLED = os.getenv("TRACKER", "on") == "on"
+TRACKER_IOU_THRESHOLD = float(os.getenv("TRACKER_IOU_THRESHOLD", "0.3"))
+# IoU eşleşmeyen izler için: merkez uzaklığı / iz kutusu köşegeni
+TRACKER_MAX_DISTANCE = float(os.getenv("TRACKER_MAX_DISTANCE", "1.0"))
+# İz bu kadar kare görünmezse silinir
+TRACKER_MAX_MISSED = int(os.getenv("TRACKER_MAX_MISSED", "5"))
+# Sayıma katılmak için izin en az kaç karede görülmesi gerektiği
+TRACKER_MIN_HITS = int(os.getenv("TRACKER_MIN_HITS", "2"))
+# Bu kadar saniye kare gelmeyen kameranın izleri sıfırlanır
+TRACKER_IDLE_RESET_S = float(os.getenv("TRACKER_IDLE_RESET_S", "300"))
+
+
+def load_counting_lines(raw=None):
+    """COUNTING_LINES JSON'unu {camera_id: (line, inside)} sözlüğüne çevir"""
+    raw = os.getenv("COUNTING_LINES", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+    try:
+        config = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"COUNTING_LINES geçerli JSON değil: {e}")
+
+    lines = {}
+    for camera_id, spec in config.items():
+        line = [float(v) for v in spec["line"]]
+        inside = [float(v) for v in spec["inside"]]
+        if len(line) != 4 or len(inside) != 2:
+            raise ValueError(f"COUNTING_LINES[{camera_id}]: line 4, inside 2 sayı olmalı")
+        if _side(line, inside) == 0:
+            raise ValueError(f"COUNTING_LINES[{camera_id}]: inside noktası çizginin üzerinde")
+        lines[str(camera_id)] = (line, inside)
+    return lines
+
+
+def _side(line, point):
+    """Noktanın çizginin hangi tarafında olduğu: 1, -1 veya 0"""
+    x1, y1, x2, y2 = line
+    cross = (x2 - x1) * (point[1] - y1) - (y2 - y1) * (point[0] - x1)
+    return int(np.sign(cross))
+
+
+def iou_matrix(a, b):
+    """a: Nx4, b: Mx4 [x1, y1, x2, y2] -> NxM IoU"""
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _greedy_pairs(score, valid, descending):
+    """Skor matrisinde en iyi çiftten başlayarak bire bir eşleştir"""
+    pairs = []
+    if score.size == 0:
+        return pairs
+    rows, cols = np.nonzero(valid)
+    order = np.argsort(-score[rows, cols] if descending else score[rows, cols], kind="stable")
+    used_rows, used_cols = set(), set()
+    for k in order:
+        r, c = rows[k], cols[k]
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+class Track:
+    __slots__ = ("track_id", "box", "velocity", "hits", "missed", "side", "counted")
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = (0.0, 0.0)
+        self.hits = 1
+        self.missed = 0
+        self.side = 0
+        self.counted = False
+
+    @property
+    def center(self):
+        return ((self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2)
+
+    def predicted(self):
+        """Sabit hız varsayımıyla bir sonraki karedeki kutu (kaçırılan kareler dahil)"""
+        steps = self.missed + 1
+        dx, dy = self.velocity[0] * steps, self.velocity[1] * steps
+        return [self.box[0] + dx, self.box[1] + dy, self.box[2] + dx, self.box[3] + dy]
+
+    def move_to(self, box):
+        old_x, old_y = self.center
+        steps = self.missed + 1
+        self.box = box
+        new_x, new_y = self.center
+        # Hız yumuşatılır; tek karelik sıçramalar tahmini bozmasın
+        self.velocity = (
+            0.5 * self.velocity[0] + 0.5 * (new_x - old_x) / steps,
+            0.5 * self.velocity[1] + 0.5 * (new_y - old_y) / steps,
+        )
+
+
+class CameraTracker:
+    """Tek kameranın izleri ve sayaçları"""
+
+    def __init__(self, line=None, inside=None):
+        self.line = line
+        self.inside_side = _side(line, inside) if line else 0
+        self.tracks = []
+        self.next_id = 1
+        self.total_entries = 0
+        self.total_exits = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _line_side(self, track, width, height):
+        cx, cy = track.center
+        return _side(self.line, (cx / width, cy / height))
+
+    def update(self, boxes, width, height):
+        """
+        boxes: [x1, y1, x2, y2] listesi (kare piksel koordinatları).
+        Her kutunun track_id'si ve bu karedeki giriş/çıkış sayıları döner.
+        """
+        now = time.monotonic()
+        if now - self.last_seen > TRACKER_IDLE_RESET_S:
+            self.tracks = []
+        self.last_seen = now
+
+        detections = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        track_boxes = np.asarray([t.predicted() for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        entries = exits = 0
+
+        # 1) IoU eşleştirme
+        iou = iou_matrix(track_boxes, detections)
+        pairs = _greedy_pairs(iou, iou >= TRACKER_IOU_THRESHOLD, descending=True)
+
+        # 2) Kalanlar için merkez uzaklığı (seyrek karelerde hızlı hareket)
+        paired_tracks = {r for r, _ in pairs}
+        paired_dets = {c for _, c in pairs}
+        free_tracks = [i for i in range(len(self.tracks)) if i not in paired_tracks]
+        free_dets = [j for j in range(len(detections)) if j not in paired_dets]
+        if free_tracks and free_dets:
+            t = track_boxes[free_tracks]
+            d = detections[free_dets]
+            t_center = (t[:, :2] + t[:, 2:]) / 2
+            d_center = (d[:, :2] + d[:, 2:]) / 2
+            diagonal = np.hypot(t[:, 2] - t[:, 0], t[:, 3] - t[:, 1])
+            dist = np.linalg.norm(t_center[:, None] - d_center[None], axis=2) / np.maximum(diagonal[:, None], 1)
+            for r, c in _greedy_pairs(dist, dist <= TRACKER_MAX_DISTANCE, descending=False):
+                pairs.append((free_tracks[r], free_dets[c]))
+
+        track_ids = [None] * len(detections)
+        matched_tracks = set()
+        for r, c in pairs:
+            track = self.tracks[r]
+            track.move_to(detections[c].tolist())
+            track.hits += 1
+            track.missed = 0
+            matched_tracks.add(r)
+            track_ids[c] = track.track_id
+
+            if self.line:
+                side = self._line_side(track, width, height)
+                if side != 0 and track.side != 0 and side != track.side and track.hits >= TRACKER_MIN_HITS:
+                    if side == self.inside_side:
+                        entries += 1
+                    else:
+                        exits += 1
+                if side != 0:
+                    track.side = side
+            elif not track.counted and track.hits >= TRACKER_MIN_HITS:
+                track.counted = True
+                entries += 1
+
+        # 3) Eşleşmeyen tespitler yeni iz
+        for j in range(len(detections)):
+            if track_ids[j] is None:
+                track = Track(self.next_id, detections[j].tolist())
+                self.next_id += 1
+                if self.line:
+                    track.side = self._line_side(track, width, height)
+                self.tracks.append(track)
+                matched_tracks.add(len(self.tracks) - 1)
+                track_ids[j] = track.track_id
+                if not self.line and TRACKER_MIN_HITS <= 1:
+                    track.counted = True
+                    entries += 1
+
+        # 4) Görünmeyen izler yaşlanır, süresi dolan onaylı izler çıkış sayılır (çizgi yoksa)
+        alive = []
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track.missed += 1
+                if track.missed > TRACKER_MAX_MISSED:
+                    if not self.line and track.counted:
+                        exits += 1
+                    continue
+            alive.append(track)
+        self.tracks = alive
+
+        self.total_entries += entries
+        self.total_exits += exits
+        return track_ids, entries, exits
+
+    def occupancy(self):
+        if self.line:
+            return max(0, self.total_entries - self.total_exits)
+        return sum(1 for t in self.tracks if t.counted)
+
+
+class TrackerRegistry:
+    """X-Camera-ID -> CameraTracker"""
+
+    def __init__(self, lines=None):
+        self.lines = load_counting_lines() if lines is None else lines
+        self._cameras = {}
+        self._lock = threading.Lock()
+
+    def _camera(self, camera_id):
+        camera_id = str(camera_id)
+        with self._lock:
+            tracker = self._cameras.get(camera_id)
+            if tracker is None:
+                line, inside = self.lines.get(camera_id, (None, None))
+                tracker = self._cameras[camera_id] = CameraTracker(line, inside)
+            return tracker
+
+    def update(self, camera_id, boxes, width, height):
+        """
+        Kameranın izlerini güncelle.
+        (track_ids, sayım sözlüğü) döner; sözlük analiz yanıtına eklenir.
+        """
+        tracker = self._camera(camera_id)
+        with tracker.lock:
+            track_ids, entries, exits = tracker.update(boxes, width, height)
+            return track_ids, self._summary(tracker, entries, exits)
+
+    def snapshot(self, camera_id):
+        """İz güncellenmeden (ör. yeniden kullanılan karede) güncel durum; bu karede sayım 0"""
+        tracker = self._camera(camera_id)
+        with tracker.lock:
+            return self._summary(tracker, 0, 0)
+
+    @staticmethod
+    def _summary(tracker, entries, exits):
+        return {
+            "entry_count": entries,
+            "exit_count": exits,
+            "current_occupancy": tracker.occupancy(),
+            "tracking": {
+                "total_entries": tracker.total_entries,
+                "total_exits": tracker.total_exits,
+                "active_tracks": len(tracker.tracks),
+                "counting_line": tracker.line is not None,
+            },
+        }
+
+    def stats(self):
+        with self._lock:
+            cameras = dict(self._cameras)
+        return {camera_id: self._summary(tracker, 0, 0) for camera_id, tracker in cameras.items()}
@@ -0,0 +1,121 @@
+"""
+📦 Write-behind analiz kaydı
+Analiz satırları bellekte sınırlı bir tamponda toplanır ve tampon dolduğunda
+veya zamanlayıcı tetiklendiğinde `copy_records_to_table` ile toplu yazılır.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+DB_WRITE_FLUSH_INTERVAL_MS = float(os.getenv("DB_WRITE_FLUSH_INTERVAL_MS", "2000"))
+# Database erişilemezken tamponda tutulacak en fazla satır; aşılırsa en eski satır düşer
+DB_WRITE_BUFFER_MAX = int(os.getenv("DB_WRITE_BUFFER_MAX", "20000"))
+
+
+class WriteBehindBuffer:
+    """
+    Satırları `table` tablosuna `columns` sırasıyla toplu yazar.
+    Tek bir arka plan görevi flush eder; kapanışta kalan satırlar yazılır.
+    """
+
+    def __init__(self, db_pool, table, columns, batch_size=DB_WRITE_BATCH_SIZE,
+                 flush_interval_ms=DB_WRITE_FLUSH_INTERVAL_MS, max_rows=DB_WRITE_BUFFER_MAX):
+        self.db_pool = db_pool
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_rows = max(self.batch_size, max_rows)
+        self._rows = deque()
+        self._wakeup = None
+        self._task = None
+        self._stopping = False
+
+        # Metrikler
+        self.queued_total = 0
+        self.flushed_total = 0
+        self.dropped_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+
+    def add(self, record):
+        """Satırı tampona ekle (await gerektirmez, request path'i bekletmez)"""
+        if len(self._rows) >= self.max_rows:
+            self._rows.popleft()
+            self.dropped_total += 1
+        self._rows.append(tuple(record))
+        self.queued_total += 1
+        if len(self._rows) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush görevini durdur ve tamponda kalanları yaz"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+        # Kapanış: tampon boşalana (veya yazma hata verene) kadar flush et
+        while self._rows:
+            if not await self.flush():
+                print(f"⚠️ Kapanışta {len(self._rows)} analiz satırı yazılamadı")
+                break
+
+    async def flush(self):
+        """Tampondaki satırları batch'ler halinde COPY ile yaz"""
+        while self._rows:
+            count = min(len(self._rows), self.batch_size)
+            batch = [self._rows.popleft() for _ in range(count)]
+            started = time.perf_counter()
+            try:
+                async with self.db_pool.acquire() as conn:
+                    await conn.copy_records_to_table(self.table, records=batch, columns=self.columns)
+            except Exception as e:
+                # Satırları geri koy, bir sonraki turda tekrar denensin
+                self._rows.extendleft(reversed(batch))
+                while len(self._rows) > self.max_rows:
+                    self._rows.popleft()
+                    self.dropped_total += 1
+                self.flush_errors += 1
+                print(f"❌ Write-behind flush hatası ({count} satır): {e}")
+                return False
+
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.flushed_total += count
+            self.flush_count += 1
+        return True
+
+    def stats(self):
+        return {
+            "pending": len(self._rows),
+            "batch_size": self.batch_size,
+            "max_rows": self.max_rows,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "queued_total": self.queued_total,
+            "flushed_total": self.flushed_total,
+            "dropped_total": self.dropped_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }